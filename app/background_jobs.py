@@ -0,0 +1,185 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import itertools
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Uzun işler (metadata toplama, plan alma, ölçüm, workload taraması) arayüz thread'i dışında çalışır.
+# Süreç başına tek bir yönetici tüm oturumlarca paylaşılır; aynı anda çalışan iş sayısı sınırlıdır.
+# Long operations (metadata harvest, plan fetch, measurement, workload scan) run off the UI thread.
+# One manager per process is shared by every session; the number of concurrently running jobs is bounded.
+DEFAULT_MAX_WORKERS = int(os.environ.get("SQL_ANALYZER_UI_WORKERS", "4"))
+DEFAULT_KEEP_FINISHED = 200
+MAX_LOG_LINES = 200
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+# İş fonksiyonu job.check_cancelled() çağırdığında iptal istenmişse fırlatılır
+# Raised by job.check_cancelled() when the job function polls a requested cancellation
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    __slots__ = ("job_id", "kind", "key", "owner", "label", "status", "progress", "message", "log", "result",
+                 "error", "submitted", "started", "finished", "cancel_requested", "cancellable")
+
+    # cancellable=False: iş job.check_cancelled() yoklamaz (tek uzun sunucu çağrısı), arayüz iptal sunmaz
+    # cancellable=False: the job never polls job.check_cancelled() (one long server call), the UI offers no cancel
+    def __init__(self, job_id, kind, key=None, owner=None, label=None, cancellable=True):
+        self.job_id = job_id
+        self.kind = kind
+        self.key = key
+        self.owner = owner
+        self.label = label or kind
+        self.status = PENDING
+        self.progress = None
+        self.message = ""
+        self.log = deque(maxlen=MAX_LOG_LINES)
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self.cancellable = cancellable
+
+    # İş thread'inden çağrılır; arayüz bir sonraki yoklamada okur
+    # Called from the job thread; the UI picks it up on the next poll
+    def report(self, fraction=None, message=None):
+        if fraction is not None:
+            self.progress = max(0.0, min(1.0, float(fraction)))
+        if message is not None:
+            self.message = message
+
+    def append_log(self, line):
+        self.log.append(line)
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    @property
+    def is_finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed_s(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def as_dict(self):
+        return {
+            "job_id": self.job_id, "kind": self.kind, "label": self.label, "owner": self.owner,
+            "status": self.status, "progress": self.progress, "message": self.message,
+            "error": self.error, "submitted": self.submitted, "elapsed_s": round(self.elapsed_s, 2)
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, keep_finished=DEFAULT_KEEP_FINISHED):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="ui-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self.keep_finished = keep_finished
+
+    # func(job, *args, **kwargs) arka planda çalışır. Aynı key ile çalışan bir iş varsa yenisi açılmaz,
+    # o iş döner; reuse_finished=True ise başarıyla bitmiş iş de yeniden kullanılır (sonuç önbelleği).
+    # func(job, *args, **kwargs) runs in the background. If a job with the same key is still running, no new job
+    # is started and that job is returned; with reuse_finished=True a successfully finished job is reused too (result cache).
+    def submit(self, kind, func, *args, key=None, owner=None, label=None, reuse_finished=False, cancellable=True,
+               **kwargs):
+        with self._lock:
+            if key is not None:
+                existing = self._jobs.get(self._by_key.get(key))
+                if existing is not None and (not existing.is_finished or (reuse_finished and existing.status == DONE)):
+                    return existing
+            job = Job(f"{kind}-{next(self._ids)}", kind, key, owner, label, cancellable)
+            self._jobs[job.job_id] = job
+            if key is not None:
+                self._by_key[key] = job.job_id
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished = time.time()
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            print(f"Background job {job.job_id} failed:", e)
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            self._prune()
+
+    # En eski bitmiş işler atılır; çalışanlara dokunulmaz
+    # The oldest finished jobs are dropped; running ones are never touched
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+            for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+                job = self._jobs.pop(job_id)
+                if job.key is not None and self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # İptal işbirlikçidir: bekleyen iş hiç başlamaz, çalışan iş job.check_cancelled() ile durur
+    # Cancellation is cooperative: a pending job never starts, a running job stops at job.check_cancelled()
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and job.cancellable and not job.is_finished:
+            job.cancel_requested = True
+        return job
+
+    def jobs(self, owner=None, active_only=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs
+                if (owner is None or job.owner == owner) and (not active_only or not job.is_finished)]
+
+    def stats(self):
+        jobs = self.jobs()
+        return {
+            "running": sum(1 for job in jobs if job.status == RUNNING),
+            "pending": sum(1 for job in jobs if job.status == PENDING),
+            "finished": sum(1 for job in jobs if job.is_finished)
+        }
+
+    def shutdown(self, wait=False):
+        for job in self.jobs(active_only=True):
+            job.cancel_requested = True
+        self._executor.shutdown(wait=wait)
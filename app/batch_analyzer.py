@@ -0,0 +1,362 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import json
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from sql_parser import query_hash
+
+# Bellek sınırı: aynı anda en fazla bu kadar sorgu işlenir
+# Memory bound: at most this many queries are in flight at once
+DEFAULT_WINDOW_SIZE = 2000
+DEFAULT_CHUNK_SIZE = 50
+# Özette tutulan iş yükü geneli index önerisi sayısı
+# Number of workload-wide index suggestions kept in the summary
+MAX_INDEX_RECOMMENDATIONS = 50
+
+_GO_RE = re.compile(r"^\s*go\s*(?:\d+)?\s*$", re.IGNORECASE)
+QUERY_FIELDS = ("query", "sql", "text", "query_text")
+
+
+# ---------------------------------------------------------------------------
+# Girdi okuyucular (akış halinde) / input readers (streaming)
+# ---------------------------------------------------------------------------
+
+def _read_jsonl(f):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            # Bozuk satır işi durdurmaz; diğer sorgu hataları gibi kayıt olarak raporlanır
+            # A broken line does not stop the run; it is reported as a record like other query failures
+            yield {"id": line_no, "query": line, "error": f"Invalid JSON on line {line_no}: {e.msg} (column {e.colno})"}
+            continue
+        if isinstance(record, str):
+            yield {"id": line_no, "query": record}
+            continue
+        if not isinstance(record, dict):
+            record = {}
+        query = next((record[field] for field in QUERY_FIELDS if record.get(field)), None)
+        if not query:
+            # Sorgu alanı olmayan kayıt da sessizce atlanmaz / a record without a query field is not dropped silently
+            yield {"id": record.get("id", line_no), "query": line,
+                   "error": f"No query on line {line_no}: expected one of {', '.join(QUERY_FIELDS)}"}
+            continue
+        yield {"id": record.get("id", line_no), "query": query}
+
+def _read_sql_batches(f):
+    # .sql dosyası GO satırlarından bölünür
+    # .sql files are split on GO lines
+    lines = []
+    batch_no = 0
+    for line in f:
+        if _GO_RE.match(line):
+            if "".join(lines).strip():
+                batch_no += 1
+                yield {"id": batch_no, "query": "".join(lines).strip()}
+            lines = []
+        else:
+            lines.append(line)
+    if "".join(lines).strip():
+        yield {"id": batch_no + 1, "query": "".join(lines).strip()}
+
+
+def _read_lines(f):
+    for line_no, line in enumerate(f, 1):
+        if line.strip():
+            yield {"id": line_no, "query": line.strip()}
+
+
+def read_workload(path):
+    lower = path.lower()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if lower.endswith((".jsonl", ".ndjson")):
+            yield from _read_jsonl(f)
+        elif lower.endswith(".sql"):
+            yield from _read_sql_batches(f)
+        else:
+            yield from _read_lines(f)
+
+
+# ---------------------------------------------------------------------------
+# Çıktı yazıcılar (artımlı) / output writers (incremental)
+# ---------------------------------------------------------------------------
+
+class JsonlResultWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write_many(self, records):
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+            self._file.write("\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    def __init__(self, path):
+        # pyarrow opsiyonel bağımlılıktır
+        # pyarrow is an optional dependency
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._schema = pa.schema([
+            ("id", pa.string()),
+            ("query_hash", pa.string()),
+            ("query", pa.string()),
+            ("status", pa.string()),
+            ("error", pa.string()),
+            ("tables", pa.list_(pa.string())),
+            ("structure_findings", pa.list_(pa.string())),
+            ("recommendations", pa.list_(pa.string())),
+            ("large_tables", pa.list_(pa.string())),
+            ("perf_status", pa.string()),
+            ("duration_ms", pa.int64()),
+            ("row_count", pa.int64()),
+            ("perf_error", pa.string())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write_many(self, records):
+        if not records:
+            return
+        rows = []
+        for record in records:
+            perf = record.get("performance") or {}
+            rows.append({
+                "id": str(record["id"]),
+                "query_hash": record["query_hash"],
+                "query": record["query"],
+                "status": record["status"],
+                "error": record.get("error"),
+                "tables": record.get("tables"),
+                "structure_findings": record.get("structure_findings"),
+                "recommendations": record.get("recommendations"),
+                "large_tables": record.get("large_tables"),
+                "perf_status": perf.get("status"),
+                "duration_ms": perf.get("duration_ms"),
+                "row_count": perf.get("row_count"),
+                "perf_error": perf.get("error")
+            })
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_result_writer(path):
+    if path.lower().endswith(".parquet"):
+        return ParquetResultWriter(path)
+    return JsonlResultWriter(path)
+
+
+# ---------------------------------------------------------------------------
+# Worker süreçleri / worker processes
+# ---------------------------------------------------------------------------
+
+_worker_state = {}
+
+
+# Initializer hata fırlatmamalı: multiprocessing.Pool ölen işçiyi durmadan yeniden başlatır ve çalışma asılı kalır.
+# Hata kaydedilir, her sorgu kaydı bu hatayla döner.
+# The initializer must never raise: multiprocessing.Pool keeps respawning the dying worker and the run hangs.
+# The error is kept and every query record is returned with it.
+def _init_worker(metadata_path, default_db, stats_source=None):
+    from metadata_catalog import MetadataCatalog
+    from metadata_store import load_metadata_columns
+
+    _worker_state["init_error"] = None
+    _worker_state["catalog"] = MetadataCatalog()
+    _worker_state["default_db"] = default_db
+    _worker_state["column_stats"] = None
+    # Her süreç kataloğu bir kez yükler
+    # Every process loads the catalog once
+    try:
+        if metadata_path:
+            _worker_state["catalog"] = MetadataCatalog.from_columns(load_metadata_columns(metadata_path))
+    except Exception as e:
+        _worker_state["init_error"] = f"Metadata could not be loaded: {e}"
+        return
+    # stats_source: (server, database) -> kolon istatistikleri yerel cache'ten okunur;
+    # okunamazsa sorgular tahminsiz analiz edilir
+    # stats_source: (server, database) -> column statistics are read from the local cache;
+    # when they cannot be read the queries are analyzed without an estimate
+    if stats_source:
+        try:
+            from table_stats_cache import load_column_statistics
+            _worker_state["column_stats"] = load_column_statistics(*stats_source)
+        except Exception as e:
+            print("Column statistics could not be loaded, estimates are disabled:", e)
+
+
+def _analyze_item(item):
+    from index_advisor import extract_index_candidates
+    from query_analyzer import analyze_query_offline
+
+    query = item["query"]
+    record = {
+        "id": item["id"],
+        "query_hash": query_hash(query).hex(),
+        "query": query
+    }
+    try:
+        if _worker_state["init_error"]:
+            raise RuntimeError(_worker_state["init_error"])
+        if item.get("error"):
+            raise ValueError(item["error"])
+        result = analyze_query_offline(query, _worker_state["catalog"], _worker_state["default_db"])
+        record.update({
+            "status": "analyzed",
+            "tables": result["tables"],
+            "structure_findings": result["structure_findings"],
+            "recommendations": result["recommendations"],
+            "index_recommendations": result["index_recommendations"],
+            # Ana süreç iş yükü genelindeki index önerileri için toplar
+            # Collected by the main process for workload-wide index suggestions
+            "index_candidates": extract_index_candidates(query),
+            "large_tables": [t["table"] for t in result["table_metadata"] if t["row_count"] > 1_000_000]
+        })
+        if _worker_state["column_stats"] is not None:
+            from selectivity_estimator import estimate_query
+
+            estimate = estimate_query(query, _worker_state["catalog"], _worker_state["column_stats"],
+                                      _worker_state["default_db"])
+            record["estimate"] = {key: estimate[key] for key in
+                                  ("verdict", "estimated_rows", "rows_scanned", "pages_scanned", "reasons")}
+            record["recommendations"].extend(estimate["findings"])
+    except Exception as e:
+        record.update({"status": "error", "error": str(e)})
+    return record
+
+
+# ---------------------------------------------------------------------------
+# Opsiyonel, sınırlı paralellikte çalıştırma / optional bounded execution
+# ---------------------------------------------------------------------------
+
+class _BoundedExecutor:
+    def __init__(self, connect, max_executions, workers):
+        self.connect = connect
+        self.remaining = max_executions
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-exec")
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def _measure(self, record):
+        from measure_query_duration import measure_query_duration_v3
+        from query_analyzer import duration_recommendation
+
+        conn = self._connection()
+        if conn is None:
+            record["performance"] = {"status": "error", "error": "Connection failed."}
+            return record
+        perf = measure_query_duration_v3(conn, record["query"])
+        record["performance"] = perf
+        if perf["status"] == "success":
+            record["recommendations"].append(duration_recommendation(perf["duration_ms"]))
+        return record
+
+    # Pencere içindeki analiz edilmiş kayıtlardan kota kadarını çalıştırır
+    # Executes analyzed records from the window until the quota is used up
+    # Tahmini olan kayıtlardan sadece tahminin karar veremedikleri çalıştırılır
+    # Of the records with an estimate, only those the estimator could not judge are executed
+    def run(self, records):
+        selected = []
+        for record in records:
+            if self.remaining <= 0:
+                break
+            if record.get("status") == "analyzed" and record.get("estimate", {}).get("verdict", "unknown") == "unknown":
+                selected.append(record)
+                self.remaining -= 1
+        list(self.pool.map(self._measure, selected))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for conn in self.connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+# İş yükünü akış halinde analiz eder, sonuçları pencere pencere yazar.
+# Streams the workload through the analysis and writes results window by window.
+# connect: sadece max_executions > 0 ise gerekir / only needed when max_executions > 0
+# stats_source: (server, database) verilirse her sorgu histogramlardan tahmin edilir
+# stats_source: when (server, database) is given, every query is estimated from the histograms
+def run_batch_analysis(input_path, output_path, metadata_path=None, default_db=None, processes=None,
+                       window_size=DEFAULT_WINDOW_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                       connect=None, max_executions=0, execute_workers=4, on_progress=None, stats_source=None):
+    from index_advisor import IndexAdvisor
+    from metadata_catalog import MetadataCatalog
+    from metadata_store import load_metadata_columns
+
+    started = time.perf_counter()
+    summary = {"analyzed": 0, "errors": 0, "executed": 0, "flagged": 0, "estimated_expensive": 0}
+    catalog = MetadataCatalog.from_columns(load_metadata_columns(metadata_path)) if metadata_path else None
+    index_advisor = IndexAdvisor(catalog, default_db)
+    writer = open_result_writer(output_path)
+    executor = _BoundedExecutor(connect, max_executions, execute_workers) if connect and max_executions > 0 else None
+    items = read_workload(input_path)
+
+    try:
+        with multiprocessing.Pool(processes=processes, initializer=_init_worker,
+                                  initargs=(metadata_path, default_db, stats_source)) as pool:
+            while True:
+                window = list(islice(items, window_size))
+                if not window:
+                    break
+                records = pool.map(_analyze_item, window, chunksize=chunk_size)
+                if executor is not None:
+                    executor.run(records)
+
+                for record in records:
+                    if record["status"] == "error":
+                        summary["errors"] += 1
+                    else:
+                        summary["analyzed"] += 1
+                        index_advisor.add_candidates(record.pop("index_candidates"), query_id=record["id"])
+                        if record["large_tables"] or any(not f.startswith("✅") for f in record["structure_findings"]):
+                            summary["flagged"] += 1
+                    if "performance" in record:
+                        summary["executed"] += 1
+                    if record.get("estimate", {}).get("verdict") == "expensive":
+                        summary["estimated_expensive"] += 1
+
+                writer.write_many(records)
+                if on_progress:
+                    on_progress(summary)
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.close()
+
+    summary["index_recommendations"] = index_advisor.recommendations(top=MAX_INDEX_RECOMMENDATIONS)
+    summary["elapsed_s"] = time.perf_counter() - started
+    return summary
@@ -0,0 +1,503 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import base64
+import datetime
+import decimal
+import gzip
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+import weakref
+
+# Arşiv: gzip'li JSON satırları. İlk satır başlık, sonra "exchange" (bir execute çağrısı) ve "info" (getinfo) kayıtları
+# Archive: gzipped JSON lines. The first line is the header, followed by "exchange" (one execute call) and "info" (getinfo) records
+CAPTURE_FORMAT_VERSION = 1
+CAPTURE_EXTENSION = ".capture.jsonl.gz"
+
+_RUN_AND_MEASURE_RE = re.compile(r"^\s*EXEC\s+.*RunAndMeasure\b", re.IGNORECASE)
+_STATISTICS_XML_ON_RE = re.compile(r"SET\s+STATISTICS\s+XML\s+ON", re.IGNORECASE)
+
+
+class ReplayMissError(Exception):
+    pass
+
+
+# Kayıt sırasında sunucunun döndürdüğü hata; mesajı aynen taşır
+# An error the server returned during recording; carries the same message
+class ReplayedError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Değer kodlama: JSON'da olmayan tipler tek anahtarlı etiketli sözlüklere çevrilir
+# Value encoding: types JSON lacks become single-key tagged dicts
+# ---------------------------------------------------------------------------
+
+_TYPES = {
+    "int": int, "float": float, "str": str, "bool": bool, "bytes": bytes, "bytearray": bytearray,
+    "datetime": datetime.datetime, "date": datetime.date, "time": datetime.time,
+    "Decimal": decimal.Decimal, "UUID": uuid.UUID
+}
+
+
+def _encode_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"t": value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {"n": str(value)}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"b": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    return str(value)
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    (tag, text), = value.items()
+    if tag == "dt":
+        return datetime.datetime.fromisoformat(text)
+    if tag == "d":
+        return datetime.date.fromisoformat(text)
+    if tag == "t":
+        return datetime.time.fromisoformat(text)
+    if tag == "n":
+        return decimal.Decimal(text)
+    if tag == "b":
+        return base64.b64decode(text)
+    if tag == "u":
+        return uuid.UUID(text)
+    raise ValueError(f"Unknown capture value tag: {tag}")
+
+
+def _encode_description(description):
+    if description is None:
+        return None
+    return [[column[0], getattr(column[1], "__name__", None)] + [_encode_value(v) for v in column[2:7]]
+            for column in description]
+
+
+def _decode_description(description):
+    if description is None:
+        return None
+    return [(column[0], _TYPES.get(column[1], str)) + tuple(column[2:]) for column in description]
+
+
+def _encode_messages(messages):
+    return [[_encode_value(part) for part in message] for message in messages or []]
+
+
+def _normalize_params(params):
+    # execute(sql, a, b) ve execute(sql, [a, b]) aynıdır / execute(sql, a, b) equals execute(sql, [a, b])
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    return [_encode_value(param) for param in params]
+
+
+def _exchange_key(sql, encoded_params):
+    return " ".join(sql.split()) + "\x00" + json.dumps(encoded_params, separators=(",", ":"))
+
+
+# ---------------------------------------------------------------------------
+# Kayıt / recording
+# ---------------------------------------------------------------------------
+
+# Birden fazla bağlantı ve thread aynı arşive yazabilir
+# Several connections and threads may write into the same archive
+class CaptureArchive:
+    def __init__(self, path, info=None):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._cursor_ids = itertools.count()
+        self._info_keys = set()
+        self._cursors = weakref.WeakSet()
+        self.closed = False
+        self._write({"type": "header", "version": CAPTURE_FORMAT_VERSION, "created_at": time.time(),
+                     "info": info or {}})
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if not self.closed:
+                self._file.write(line + "\n")
+
+    def wrap(self, connection):
+        return RecordingConnection(connection, self)
+
+    def record_info(self, key, value):
+        with self._lock:
+            if key in self._info_keys:
+                return
+            self._info_keys.add(key)
+        self._write({"type": "info", "key": str(key), "value": _encode_value(value)})
+
+    def begin_exchange(self, cursor, sql, params):
+        self._cursors.add(cursor)
+        return {"type": "exchange", "seq": next(self._sequence), "cursor": cursor.cursor_id, "sql": sql,
+                "params": _normalize_params(params), "elapsed_ms": None, "error": None, "cancelled": False,
+                "steps": []}
+
+    def write_exchange(self, exchange):
+        self._write(exchange)
+
+    def new_cursor_id(self):
+        return next(self._cursor_ids)
+
+    def close(self):
+        # Açık kalan cursor'ların yarım exchange'leri de yazılır
+        # Half-finished exchanges of cursors still open are written too
+        for cursor in list(self._cursors):
+            cursor.finish()
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# pyodbc cursor'ı sarar: tüketilen satırlar, mesajlar ve hatalar olduğu gibi kaydedilir.
+# Wraps a pyodbc cursor: the rows actually consumed, the messages and the errors are recorded as they happen.
+# Okunmayan satırlar (ör. max_rows ile iptal) kaydedilmez; replay analizcinin gördüğünün aynısını verir
+# Rows that were never read (e.g. cancelled by max_rows) are not recorded; replay serves exactly what the analyzer saw
+class RecordingCursor:
+    def __init__(self, cursor, archive):
+        self._cursor = cursor
+        self._archive = archive
+        self.cursor_id = archive.new_cursor_id()
+        self._exchange = None
+        self._step = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def messages(self):
+        return self._cursor.messages
+
+    def _new_step(self, has_set, error=None):
+        self._step = {
+            "has_set": has_set,
+            "description": _encode_description(self._cursor.description) if has_set else None,
+            "rowcount": self._cursor.rowcount,
+            "messages": _encode_messages(getattr(self._cursor, "messages", None)),
+            "rows": [],
+            "error": error
+        }
+        self._exchange["steps"].append(self._step)
+
+    def _record_rows(self, rows):
+        if self._step is not None:
+            self._step["rows"].extend([_encode_value(value) for value in row] for row in rows)
+
+    def execute(self, sql, *params):
+        self.finish()
+        exchange = self._archive.begin_exchange(self, sql, params)
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, *params)
+        except Exception as e:
+            exchange["error"] = [type(e).__name__, str(e)]
+            exchange["elapsed_ms"] = (time.perf_counter() - started) * 1000
+            self._archive.write_exchange(exchange)
+            raise
+        exchange["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        self._exchange = exchange
+        self._new_step(True)
+        return self
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._record_rows((row,))
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self._record_rows(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._record_rows(rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def nextset(self):
+        try:
+            more = self._cursor.nextset()
+        except Exception as e:
+            if self._exchange is not None:
+                self._new_step(False, [type(e).__name__, str(e)])
+            raise
+        if self._exchange is not None:
+            self._new_step(bool(more))
+        return more
+
+    def cancel(self):
+        if self._exchange is not None:
+            self._exchange["cancelled"] = True
+        return self._cursor.cancel()
+
+    # Exchange arşive yazılır; bir sonraki execute, close veya arşiv kapanışında çağrılır
+    # Writes the exchange into the archive; called on the next execute, on close or when the archive closes
+    def finish(self):
+        exchange, self._exchange, self._step = self._exchange, None, None
+        if exchange is not None:
+            self._archive.write_exchange(exchange)
+
+    def close(self):
+        self.finish()
+        return self._cursor.close()
+
+    def __del__(self):
+        try:
+            self.finish()
+        except Exception:
+            pass
+
+
+class RecordingConnection:
+    def __init__(self, connection, archive):
+        self._connection = connection
+        self.archive = archive
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self):
+        return RecordingCursor(self._connection.cursor(), self.archive)
+
+    def getinfo(self, key):
+        value = self._connection.getinfo(key)
+        self.archive.record_info(key, value)
+        return value
+
+    def close(self):
+        return self._connection.close()
+
+
+# ---------------------------------------------------------------------------
+# Tekrar oynatma / replay
+# ---------------------------------------------------------------------------
+
+def _decode_step(step):
+    return {
+        "has_set": step["has_set"],
+        "description": _decode_description(step["description"]),
+        "rowcount": step["rowcount"],
+        "messages": [tuple(_decode_value(part) for part in message) for message in step["messages"]],
+        "rows": [tuple(_decode_value(value) for value in row) for row in step["rows"]],
+        "error": step.get("error")
+    }
+
+
+# Arşivi belleğe yükler; satırlar bir kez çözülür, replay sırasında kopyalanmadan paylaşılır
+# Loads an archive into memory; rows are decoded once and shared without copying during replay
+def load_capture_archive(path):
+    header = None
+    info = {}
+    exchanges = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == "header":
+                if record.get("version") != CAPTURE_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported capture format: {record.get('version')}")
+                header = record
+            elif kind == "info":
+                info[record["key"]] = _decode_value(record["value"])
+            elif kind == "exchange":
+                record["steps"] = [_decode_step(step) for step in record["steps"]]
+                exchanges.append(record)
+    if header is None:
+        raise ValueError(f"{path} is not a capture archive")
+    exchanges.sort(key=lambda exchange: exchange["seq"])
+    return {"header": header, "info": info, "exchanges": exchanges}
+
+
+# Yüklenmiş arşivin paylaşılan replay durumu; her connect() aynı kuyrukları kullanır (thread güvenli).
+# Shared replay state of a loaded archive; every connect() uses the same queues (thread-safe).
+# loop=True: bir SQL'in kayıtları bitince baştan tekrar edilir (throughput testleri için)
+# loop=True: once the recordings of a SQL text run out they start over (for throughput tests)
+class CaptureReplay:
+    def __init__(self, source, loop=True):
+        self.archive = load_capture_archive(source) if isinstance(source, str) else source
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._positions = {}
+        for exchange in self.archive["exchanges"]:
+            self._queues.setdefault(_exchange_key(exchange["sql"], exchange["params"]), []).append(exchange)
+
+    def connect(self):
+        return ReplayConnection(self)
+
+    def next_exchange(self, sql, params):
+        key = _exchange_key(sql, _normalize_params(params))
+        queue = self._queues.get(key)
+        if not queue:
+            raise ReplayMissError(f"No recorded response for: {' '.join(sql.split())[:200]}")
+        with self._lock:
+            position = self._positions.get(key, 0)
+            if position >= len(queue):
+                if not self.loop:
+                    raise ReplayMissError(f"Recorded responses exhausted for: {' '.join(sql.split())[:200]}")
+                position = 0
+            self._positions[key] = position + 1
+        return queue[position]
+
+    def getinfo(self, key):
+        try:
+            return self.archive["info"][str(key)]
+        except KeyError:
+            raise ReplayMissError(f"No recorded getinfo value for {key}")
+
+    # Arşivdeki analizleri (ölçüm modu, sorgu) olarak döndürür; SP ve tek çalıştırma çağrılarından çıkarılır.
+    # Returns the analyses in the archive as (measure mode, query); derived from the SP and single-execution calls.
+    def recorded_analyses(self):
+        analyses = []
+        seen = set()
+        previous = {}
+        for exchange in self.archive["exchanges"]:
+            sql = exchange["sql"]
+            analysis = None
+            if _RUN_AND_MEASURE_RE.match(sql) and exchange["params"]:
+                analysis = ("sp", _decode_value(exchange["params"][0]))
+            elif _STATISTICS_XML_ON_RE.search(previous.get(exchange["cursor"], "")):
+                analysis = ("single", sql)
+            previous[exchange["cursor"]] = sql
+            if analysis is not None and analysis not in seen:
+                seen.add(analysis)
+                analyses.append(analysis)
+        return analyses
+
+
+# pyodbc bağlantısının yerine geçer; sunucu olmadan kayıtlı yanıtları tam hızda döndürür
+# Stands in for a pyodbc connection; serves the recorded responses at full speed without a server
+class ReplayConnection:
+    def __init__(self, source, loop=True):
+        self.replay = source if isinstance(source, CaptureReplay) else CaptureReplay(source, loop)
+
+    def cursor(self):
+        return ReplayCursor(self.replay)
+
+    def getinfo(self, key):
+        return self.replay.getinfo(key)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayCursor:
+    def __init__(self, replay):
+        self._replay = replay
+        self._steps = []
+        self._step_index = 0
+        self._rows = ()
+        self._row_index = 0
+        self.description = None
+        self.rowcount = -1
+        self.messages = []
+
+    def _activate(self, step):
+        self.description = step["description"]
+        self.rowcount = step["rowcount"]
+        self.messages = list(step["messages"])
+        self._rows = step["rows"]
+        self._row_index = 0
+
+    def execute(self, sql, *params):
+        exchange = self._replay.next_exchange(sql, params)
+        if exchange["error"]:
+            self._steps = []
+            raise ReplayedError(exchange["error"][1])
+        self._steps = exchange["steps"]
+        self._step_index = 0
+        self._activate(self._steps[0])
+        return self
+
+    def fetchone(self):
+        if self._row_index >= len(self._rows):
+            return None
+        self._row_index += 1
+        return self._rows[self._row_index - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._row_index:self._row_index + size]
+        self._row_index += len(rows)
+        return list(rows)
+
+    def fetchall(self):
+        rows = self._rows[self._row_index:]
+        self._row_index = len(self._rows)
+        return list(rows)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def nextset(self):
+        self._step_index += 1
+        if self._step_index >= len(self._steps):
+            self._activate({"description": None, "rowcount": -1, "messages": [], "rows": ()})
+            return False
+        step = self._steps[self._step_index]
+        if step["error"]:
+            raise ReplayedError(step["error"][1])
+        self._activate(step)
+        return step["has_set"]
+
+    def cancel(self):
+        self._steps = self._steps[:self._step_index + 1]
+
+    def close(self):
+        pass
@@ -9,15 +9,50 @@ Description:
 """
 import pyodbc
 
-def connect_to_sql_server(server, database):
+from instrumentation import timed
+
+ODBC_DRIVER = "ODBC Driver 18 for SQL Server"
+# Oturumun APP_NAME() değeri; RunAndMeasure log satırları bununla etiketlenir (log_ingester uygulamanın
+# kendi kaydettiği çalıştırmaları tekrar aktarmaz)
+# The session's APP_NAME(); RunAndMeasure log rows are tagged with it (log_ingester does not import
+# again the runs the app already recorded itself)
+APP_NAME = "SQL Query Analyzer"
+
+
+# Uygulamanın tek bağlantı dizesi üreticisi (Windows veya SQL Server kimlik doğrulaması)
+# The single connection string builder of the app (Windows or SQL Server authentication)
+def build_connection_string(server, database, username=None, password=None):
+    conn_str = (
+        f"DRIVER={{{ODBC_DRIVER}}};"
+        f"SERVER={server};"
+        f"DATABASE={database};"
+        f"APP={APP_NAME};"
+    )
+    if username and password:
+        conn_str += f"UID={username};PWD={password};"
+    else:
+        conn_str += "Trusted_Connection=yes;"
+    conn_str += (
+        "Encrypt=yes;"
+        "TrustServerCertificate=yes;"
+        "MARS_Connection=Yes;"
+    )
+    return conn_str
+
+
+# Hata durumunda exception fırlatır (havuz bunu kullanır)
+# Raises on failure (used by the connection pool)
+# autocommit: RunAndMeasure log kayıtları hemen kalıcı olur; açık örtük transaction kilit tutmaz
+# autocommit: RunAndMeasure log rows are committed at once; no open implicit transaction holds locks
+@timed("connection.open")
+def open_connection(server, database, username=None, password=None, timeout=0):
+    return pyodbc.connect(build_connection_string(server, database, username, password), timeout=timeout,
+                          autocommit=True)
+
+
+def connect_to_sql_server(server, database, username=None, password=None):
     try:
-        conn_str = (
-            f'DRIVER={{ODBC Driver 18 for SQL Server}};'
-            f'SERVER={server};DATABASE={database};'
-            f'Trusted_Connection=yes;'
-            f'MARS_Connection=Yes;'
-        )
-        conn = pyodbc.connect(conn_str)
+        conn = open_connection(server, database, username, password)
         print("Connection successful!")
         return conn
     except Exception as e:
@@ -0,0 +1,253 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from connection import open_connection
+from instrumentation import timed
+
+DEFAULT_MIN_SIZE = 0
+DEFAULT_MAX_SIZE = 8
+DEFAULT_IDLE_TIMEOUT_S = 300
+DEFAULT_BORROW_TIMEOUT_S = 30
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+# Sunucu/veritabanı/kimlik bazında yeniden kullanılan bağlantılar.
+# Connections reused per server/database/auth.
+# Ödünç alırken doğrulama (SELECT 1), boşta kalanların tahliyesi ve ödünç süresi ölçümü yapılır.
+# Validation on borrow (SELECT 1), idle eviction and per-borrow timing are built in.
+class ConnectionPool:
+    def __init__(self, factory, min_size=DEFAULT_MIN_SIZE, max_size=DEFAULT_MAX_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT_S, validate_on_borrow=True, name="pool", key=None):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.validate_on_borrow = validate_on_borrow
+        self.name = name
+        # get_pool anahtarı (sunucu, veritabanı, kullanıcı, parola özeti); paylaşılan işleri kimliğe göre ayırır
+        # The get_pool key (server, database, user, password digest); separates shared jobs by identity
+        self.key = key
+        self._idle = []           # [(conn, last_used_at)]
+        self._in_use = {}         # id(conn) -> borrowed_at
+        self._lock = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "created": 0, "borrows": 0, "discarded": 0, "validation_failures": 0, "evicted": 0,
+            "wait_ms_total": 0.0, "wait_ms_max": 0.0, "hold_ms_total": 0.0, "hold_ms_max": 0.0,
+            "connect_ms_total": 0.0
+        }
+        for _ in range(min_size):
+            self._idle.append((self._create(), time.monotonic()))
+
+    def _create(self):
+        started = time.perf_counter()
+        conn = self.factory()
+        with self._lock:
+            self._stats["connect_ms_total"] += (time.perf_counter() - started) * 1000
+            self._stats["created"] += 1
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset_session(conn):
+        # Analiz edilen sorgunun açık bıraktığı transaction (BEGIN TRAN, örtük transaction) ve kilitleri
+        # sonraki ödünç alana geçmez
+        # A transaction left open by the analyzed query (BEGIN TRAN, implicit transaction) and its locks
+        # must not pass to the next borrower
+        try:
+            cursor = conn.cursor()
+            cursor.execute("IF @@TRANCOUNT > 0 ROLLBACK TRANSACTION;")
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        # Kilit tutulurken çağrılır / called with the lock held
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout and len(keep) + len(self._in_use) >= self.min_size:
+                self._close_quietly(conn)
+                self._stats["evicted"] += 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    @timed("connection.acquire")
+    def acquire(self, timeout=DEFAULT_BORROW_TIMEOUT_S):
+        started = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reservation = ("reserved", object())
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool '{self.name}' is closed.")
+                self._evict_idle()
+                conn = None
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                elif len(self._in_use) >= self.max_size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No free connection in pool '{self.name}' after {timeout} s (max_size={self.max_size})."
+                        )
+                    self._lock.wait(remaining)
+                    continue
+                # Yer kilit bırakılmadan ayrılır: doğrulama ve bağlantı açma kilit dışında yapılır
+                # The slot is reserved before the lock is released: validation and connecting run outside it
+                self._in_use[reservation] = started
+                break
+
+        try:
+            if conn is not None and self.validate_on_borrow and not self._is_alive(conn):
+                with self._lock:
+                    self._stats["validation_failures"] += 1
+                    self._stats["discarded"] += 1
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self._create()
+        except BaseException:
+            with self._lock:
+                self._in_use.pop(reservation, None)
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            now = time.perf_counter()
+            wait_ms = (now - started) * 1000
+            # Ayrılan yer bağlantıya devredilir / the reserved slot is handed over to the connection
+            self._in_use.pop(reservation, None)
+            self._in_use[id(conn)] = now
+            self._stats["borrows"] += 1
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+        return conn
+
+    def release(self, conn, discard=False):
+        # Sıfırlanamayan bağlantı havuza dönmez / a connection that cannot be reset is not pooled again
+        if not discard and not self._closed and not self._reset_session(conn):
+            discard = True
+        with self._lock:
+            borrowed_at = self._in_use.pop(id(conn), None)
+            if borrowed_at is not None:
+                hold_ms = (time.perf_counter() - borrowed_at) * 1000
+                self._stats["hold_ms_total"] += hold_ms
+                self._stats["hold_ms_max"] = max(self._stats["hold_ms_max"], hold_ms)
+            if discard or self._closed:
+                self._stats["discarded"] += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=DEFAULT_BORROW_TIMEOUT_S):
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            # Hatalı işlemden sonra bağlantı durumu belirsizdir
+            # After a failed operation the session state is unknown
+            discard = not self._is_alive(conn)
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+            borrows = stats["borrows"] or 1
+            stats["wait_ms_avg"] = stats["wait_ms_total"] / borrows
+            stats["hold_ms_avg"] = stats["hold_ms_total"] / borrows
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._idle = []
+            self._lock.notify_all()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(server, database, username, password):
+    secret = hashlib.sha256((password or "").encode("utf-8")).hexdigest() if password else ""
+    return ((server or "").lower(), (database or "").lower(), (username or "").lower(), secret)
+
+
+# Aynı sunucu/veritabanı/kimlik için her zaman aynı havuz döner
+# Always returns the same pool for the same server/database/auth
+def get_pool(server, database, username=None, password=None, **pool_options):
+    key = _pool_key(server, database, username, password)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(
+                lambda: open_connection(server, database, username, password),
+                name=f"{server}/{database}",
+                key=key,
+                **pool_options
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# Bağlantı veya havuz kabul eder; havuzdan ödünç alıp geri verir.
+# Accepts a connection or a pool; borrows from and returns to the pool.
+@contextmanager
+def borrowed_connection(connection_or_pool):
+    if isinstance(connection_or_pool, ConnectionPool):
+        with connection_or_pool.connection() as conn:
+            yield conn
+    else:
+        yield connection_or_pool
@@ -7,43 +7,300 @@ Description:
     This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
     Created using Python 3.x and Streamlit.
 """
-import xml.etree.ElementTree as ET
+import hashlib
+import heapq
+import math
+import os
+import shutil
+import subprocess
+import threading
 
+from plan_analyzer import parse_showplan
+from plan_diff import ADDED, CHANGED, REMOVED, UNCHANGED, diff_plans
+from instrumentation import count, timed
+
+DIFF_COLORS = {UNCHANGED: "white", CHANGED: "#ffe08a", ADDED: "#b7e4c7", REMOVED: "#f4b6b6"}
+
+# Büyük planlar için görünüm: en pahalı alt ağaçlar açılır, ucuz alt ağaçlar tek kutuya katlanır
+# View for large plans: the most expensive subtrees are opened, cheap subtrees are folded into one box
+DEFAULT_VIEW_MAX_NODES = 150
+DEFAULT_VIEW_MIN_COST_PCT = 1.0
+# Katlanmış bölgeler için en fazla bu kadar açılabilir operatör listelenir
+# At most this many expandable operators are listed for the collapsed regions
+MAX_COLLAPSED_ENTRIES = 200
+
+# SVG sunucu tarafında Graphviz'in dot programıyla üretilir ve DOT metninin özetiyle diskte saklanır.
+# DOT metni planı ve görünüm ayarlarını birlikte içerdiği için aynı plan + görünüm aynı dosyaya düşer.
+# The SVG is produced server side by Graphviz's dot program and stored on disk under the digest of the DOT text.
+# The DOT text carries both the plan and the view settings, so the same plan + view lands in the same file.
+DEFAULT_SVG_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".sql_performance_analyzer", "svg_cache")
+DEFAULT_MAX_SVG_CACHE_BYTES = 64 * 1024 * 1024
+SVG_RENDER_TIMEOUT_S = 60
+DOT_EXECUTABLE_ENV = "SQL_ANALYZER_DOT"
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _operator_label(op, total):
+    label = f"{op.physical_op}\n{op.logical_op}\nRows: {op.estimate_rows:g}"
+    if op.actual_rows is not None:
+        label += f" (actual {op.actual_rows:g})"
+    label += f"\nCost: {100 * op.own_cost / total:.1f}%"
+    if op.object:
+        label += f"\n{op.object}"
+    return label
+
+
+def plan_to_dot(plan):
+    total = plan.total_cost() or 1.0
+    # DOT metni parça listesiyle kurulur; += ile büyüyen string binlerce operatörde karesel maliyetlidir
+    # The DOT text is built from a list of parts; growing a string with += is quadratic for thousands of operators
+    lines = ["digraph ExecutionPlan {"]
+    for op in plan.operators:
+        lines.append(f'  "n{op.index}" [label="{_escape(_operator_label(op, total))}", shape=box];')
+    for op in plan.operators:
+        for child in op.children:
+            lines.append(f'  "n{op.index}" -> "n{child}";')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+# Önceki plan solda, şimdiki plan sağda; değişen operatörler kesikli çizgiyle eşine bağlanır
+# The previous plan on the left, the current plan on the right; changed operators are linked to their match
+def plan_diff_to_dot(diff):
+    lines = ["digraph PlanDiff {", "  node [shape=box, style=filled];"]
+    changed_rows = {row["new_node"]: row for row in diff["operators"] if row["status"] == CHANGED}
+    for prefix, title, plan, statuses in (
+            ("o", "Previous plan", diff["old_plan"], diff["old_status"]),
+            ("n", "Current plan", diff["new_plan"], diff["new_status"])):
+        total = plan.total_cost() or 1.0
+        lines.append(f"  subgraph cluster_{prefix} {{")
+        lines.append(f'    label="{title} (cost {plan.total_cost():.4f})";')
+        for op in plan.operators:
+            label = _operator_label(op, total)
+            row = changed_rows.get(op.index) if prefix == "n" else None
+            if row is not None:
+                label += f"\n{', '.join(row['changes'])}"
+                if row["cost_pct_delta"]:
+                    label += f" ({row['cost_pct_delta']:+.1f} pts)"
+            lines.append(f'    "{prefix}{op.index}" [label="{_escape(label)}", '
+                         f'fillcolor="{DIFF_COLORS[statuses[op.index]]}"];')
+        for op in plan.operators:
+            for child in op.children:
+                lines.append(f'    "{prefix}{op.index}" -> "{prefix}{child}";')
+        lines.append("  }")
+    for new_index, row in changed_rows.items():
+        lines.append(f'  "o{row["old_node"]}" -> "n{new_index}" [style=dashed, color="#e0a000", constraint=false];')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+@timed("graphviz.render")
 def parse_execution_plan_for_graphviz(xml_text):
     try:
-        root = ET.fromstring(xml_text)
-        plan_nodes = []
-        edges = []
+        return {"status": "success", "dot": plan_to_dot(parse_showplan(xml_text))}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+# İki planı (önceki, şimdiki) karşılaştırır ve yan yana renkli DOT üretir
+# Compares two plans (previous, current) and renders a colored side-by-side DOT
+@timed("graphviz.diff")
+def compare_execution_plans_for_graphviz(old_plan, new_plan):
+    try:
+        diff = diff_plans(old_plan, new_plan)
+        if diff["status"] != "success":
+            return diff
+        return {"status": "success", "dot": plan_diff_to_dot(diff), "diff": diff}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
 
-        def traverse(node, parent_id=None):
-            if node.tag.endswith("RelOp"):
-                node_id = node.attrib.get("NodeId", f"node{len(plan_nodes)}")
-                logical_op = node.attrib.get("LogicalOp", "Unknown")
-                physical_op = node.attrib.get("PhysicalOp", "Unknown")
-                est_rows = node.attrib.get("EstimateRows", "N/A")
 
-                label = f"{physical_op}\n{logical_op}\nRows: {est_rows}"
-                plan_nodes.append((node_id, label))
+# ---------------------------------------------------------------------------
+# Büyük planlar: katlanmış, maliyet ısı haritalı görünüm
+# Large plans: collapsed view with a cost heat map
+# ---------------------------------------------------------------------------
 
-                if parent_id:
-                    edges.append((parent_id, node_id))
+# Beyazdan (0) sarıya ve kırmızıya (%50 ve üzeri) giden HSV rengi
+# HSV color going from white (0) through yellow to red (50% and above)
+def _heat_color(share):
+    saturation = min(share * 2.0, 1.0)
+    return f"{0.15 * (1 - saturation):.3f} {saturation:.3f} 1.000"
 
-                for child in node:
-                    traverse(child, node_id)
-            else:
-                for child in node:
-                    traverse(child, parent_id)
 
-        traverse(root)
+def _subtree_sizes(plan):
+    sizes = [1] * len(plan.operators)
+    for op in reversed(plan.operators):
+        for child in op.children:
+            sizes[op.index] += sizes[child]
+    return sizes
 
-        dot_output = "digraph ExecutionPlan {\n"
-        for node_id, label in plan_nodes:
-            dot_output += f'  "{node_id}" [label="{label}", shape=box];\n'
-        for src, dst in edges:
-            dot_output += f'  "{src}" -> "{dst}";\n'
-        dot_output += "}"
 
-        return {"status": "success", "dot": dot_output}
+# expanded: kullanıcının açtığı operatörler (ataları da açılır), focus: görünümün kökü olacak operatör.
+# expanded: operators opened by the user (their ancestors are opened too), focus: operator used as the view root.
+# Pahalı alt ağaçlar maliyet sırasıyla, max_nodes dolana kadar açılır; payı min_cost_pct altındaki
+# kardeşler tek bir "ucuz girdiler" kutusunda toplanır.
+# Expensive subtrees are opened in cost order until max_nodes is reached; siblings below min_cost_pct
+# are gathered into a single "cheap inputs" box.
+def plan_view(plan, expanded=(), focus=None, max_nodes=DEFAULT_VIEW_MAX_NODES, min_cost_pct=DEFAULT_VIEW_MIN_COST_PCT):
+    operators = plan.operators
+    total = plan.total_cost() or 1.0
+    sizes = _subtree_sizes(plan)
+    roots = [focus] if focus is not None else list(plan.roots)
+    # Eşik, renk ve boyut görünümün köküne göredir (odaklanınca alt ağacın kendi maliyeti)
+    # Threshold, color and size are relative to the view root (the subtree's own cost when focused)
+    base = (operators[focus].subtree_cost if focus is not None else total) or 1.0
+    min_cost = base * min_cost_pct / 100
 
-    except Exception as e:
+    forced = set()
+    for index in expanded:
+        while index is not None and index not in forced and index < len(operators):
+            forced.add(index)
+            index = operators[index].parent
+
+    shown = set(roots)
+    opened = set()
+    groups = {}
+    # Zorla açılanlar önce, sonra alt ağaç maliyeti büyük olan
+    # Forced nodes first, then the largest subtree cost
+    heap = [(index not in forced, -operators[index].subtree_cost, index) for index in roots if operators[index].children]
+    heapq.heapify(heap)
+    while heap:
+        not_forced, _, index = heapq.heappop(heap)
+        op = operators[index]
+        if not_forced and op.subtree_cost < min_cost:
+            break
+        significant = [c for c in op.children if c in forced or operators[c].subtree_cost >= min_cost]
+        cheap = [c for c in op.children if c not in forced and operators[c].subtree_cost < min_cost]
+        if len(cheap) == 1:
+            significant = list(op.children)
+            cheap = []
+        if not_forced and len(shown) + len(groups) + len(significant) + bool(cheap) > max_nodes:
+            continue
+        opened.add(index)
+        for child in significant:
+            shown.add(child)
+            if operators[child].children:
+                heapq.heappush(heap, (child not in forced, -operators[child].subtree_cost, child))
+        if cheap:
+            groups[index] = cheap
+
+    lines = ["digraph ExecutionPlan {",
+             "  graph [ranksep=0.3, nodesep=0.2];",
+             '  node [shape=box, style="rounded,filled", fontname="Helvetica"];']
+    collapsed = []
+    for index in sorted(shown):
+        op = operators[index]
+        subtree_share = min(op.subtree_cost / base, 1.0)
+        label = _operator_label(op, total) + f"\nSubtree: {100 * op.subtree_cost / total:.1f}%"
+        extra = ""
+        if op.children and index not in opened:
+            # Katlanmış alt ağaç: rengi gizli alt ağacın payından gelir
+            # Collapsed subtree: its color comes from the share of the hidden subtree
+            label += f"\n▸ {sizes[index] - 1} operators hidden"
+            fill = _heat_color(subtree_share)
+            extra = ", peripheries=2"
+            collapsed.append({"node": index, "node_id": op.node_id, "operator": op.label, "object": op.object,
+                              "hidden": sizes[index] - 1, "cost_pct": round(100 * op.subtree_cost / total, 2)})
+        else:
+            fill = _heat_color(op.own_cost / base)
+        lines.append(f'  "n{index}" [id="op{index}", label="{_escape(label)}", fillcolor="{fill}", '
+                     f'fontsize={10 + 8 * math.sqrt(subtree_share):.1f}, penwidth={1 + 3 * subtree_share:.2f}, '
+                     f'tooltip="{_escape(f"node {op.node_id}: {op.label}")}"{extra}];')
+    for index, cheap in groups.items():
+        hidden = sum(sizes[c] for c in cheap)
+        cost = sum(operators[c].subtree_cost for c in cheap)
+        label = f"{len(cheap)} cheap inputs\n{hidden} operators\nCost: {100 * cost / total:.1f}%"
+        lines.append(f'  "g{index}" [label="{_escape(label)}", shape=folder, fillcolor="{_heat_color(cost / base)}", '
+                     f'style=filled, fontsize=9];')
+        lines.append(f'  "n{index}" -> "g{index}" [style=dashed];')
+        for child in cheap:
+            collapsed.append({"node": child, "node_id": operators[child].node_id, "operator": operators[child].label,
+                              "object": operators[child].object, "hidden": sizes[child],
+                              "cost_pct": round(100 * operators[child].subtree_cost / total, 2)})
+    for index in sorted(opened):
+        for child in operators[index].children:
+            if child in shown:
+                lines.append(f'  "n{index}" -> "n{child}" '
+                             f'[penwidth={1 + 4 * min(operators[child].subtree_cost / base, 1.0):.2f}];')
+    lines.append("}")
+
+    collapsed.sort(key=lambda entry: entry["cost_pct"], reverse=True)
+    visible_total = sum(sizes[index] for index in roots)
+    return {
+        "dot": "\n".join(lines),
+        "shown": len(shown),
+        "groups": len(groups),
+        "hidden": visible_total - len(shown),
+        "total": len(operators),
+        "collapsed": collapsed[:MAX_COLLAPSED_ENTRIES]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sunucu tarafı SVG / server side SVG
+# ---------------------------------------------------------------------------
+
+def dot_executable():
+    return os.environ.get(DOT_EXECUTABLE_ENV) or shutil.which("dot")
+
+
+def _prune_svg_cache(cache_dir, max_bytes):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".svg"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    # En eski kullanılanlar önce silinir / the least recently used go first
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
+        except OSError:
+            pass
+
+
+@timed("graphviz.svg")
+def render_svg(dot, cache_dir=DEFAULT_SVG_CACHE_DIR, max_cache_bytes=DEFAULT_MAX_SVG_CACHE_BYTES,
+               timeout=SVG_RENDER_TIMEOUT_S):
+    cache_key = hashlib.blake2b(dot.encode("utf-8"), digest_size=16).hexdigest()
+    path = os.path.join(cache_dir, f"{cache_key}.svg")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            svg = f.read()
+        os.utime(path)
+        count("svg_cache.hit")
+        return {"status": "success", "svg": svg, "cache_hit": True, "cache_key": cache_key}
+    except FileNotFoundError:
+        pass
+
+    executable = dot_executable()
+    if executable is None:
+        return {"status": "error", "error": f"Graphviz 'dot' executable not found (install Graphviz or set {DOT_EXECUTABLE_ENV})"}
+    try:
+        completed = subprocess.run([executable, "-Tsvg"], input=dot.encode("utf-8"), capture_output=True,
+                                   timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
         return {"status": "error", "error": str(e)}
+    if completed.returncode != 0:
+        return {"status": "error", "error": completed.stderr.decode("utf-8", "replace").strip()}
+
+    count("svg_cache.miss")
+    svg = completed.stdout.decode("utf-8")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Aynı DOT'u çizen iş thread'leri aynı geçici dosyaya yazmasın
+        # Job threads rendering the same DOT must not write to the same temporary file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(svg)
+        os.replace(tmp_path, path)
+        _prune_svg_cache(cache_dir, max_cache_bytes)
+    except OSError as e:
+        print("SVG cache write failed:", e)
+    return {"status": "success", "svg": svg, "cache_hit": False, "cache_key": cache_key}
@@ -0,0 +1,355 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import re
+
+from connection_pool import borrowed_connection
+from metadata_catalog import as_catalog, estimated_pages
+from sql_parser import identifier_spellings, parse_query
+
+# Sorgudan çıkarılan (seçicilik bilinmeyen) adaylar için varsayılan etki oranı
+# Assumed impact share for candidates taken from the query text (selectivity unknown)
+QUERY_PREDICATE_IMPACT = 0.5
+DEFAULT_DMV_TOP = 500
+# Öneri başına saklanan örnek sorgu kimliği (büyük iş yüklerinde bellek sınırı)
+# Example query ids kept per suggestion (memory bound on large workloads)
+MAX_EXAMPLE_QUERIES = 10
+# Kapsayan index için INCLUDE'a alınan SELECT kolonu sınırı; daha genişse include eklenmez
+# Bound on SELECT-list columns added as INCLUDE for a covering index; wider lists add none
+MAX_INCLUDE_COLUMNS = 8
+INDEX_NAME_MAX = 128
+
+EQUALITY_OPS = frozenset(["=", "in", "is null"])
+RANGE_OPS = frozenset(["<", ">", "<=", ">=", "!<", "!>", "between", "like"])
+
+# Sunucunun topladığı eksik index önerileri; iyileşme ölçüsü Microsoft'un önerdiği formüldür
+# Missing index suggestions collected by the server; the improvement measure is the usual formula
+MISSING_INDEX_DMV_SQL = """
+    SELECT TOP (?)
+        DB_NAME(d.database_id) AS database_name,
+        OBJECT_SCHEMA_NAME(d.object_id, d.database_id) AS schema_name,
+        OBJECT_NAME(d.object_id, d.database_id) AS table_name,
+        d.equality_columns, d.inequality_columns, d.included_columns,
+        s.user_seeks + s.user_scans AS uses,
+        s.avg_total_user_cost,
+        s.avg_user_impact
+    FROM sys.dm_db_missing_index_details d
+    INNER JOIN sys.dm_db_missing_index_groups g ON g.index_handle = d.index_handle
+    INNER JOIN sys.dm_db_missing_index_group_stats s ON s.group_handle = g.index_group_handle
+    WHERE d.database_id = DB_ID()
+    ORDER BY s.avg_total_user_cost * s.avg_user_impact * (s.user_seeks + s.user_scans) DESC;
+"""
+
+_DMV_COLUMN_RE = re.compile(r"\[((?:[^\]]|\]\])*)\]")
+
+
+def _dmv_columns(text):
+    return [name.replace("]]", "]") for name in _DMV_COLUMN_RE.findall(text or "")]
+
+
+def _quote(name):
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def _unique(columns):
+    return list(dict.fromkeys(columns))
+
+
+# sys.dm_db_missing_index_details satırlarını plan MissingIndex kayıtlarıyla aynı biçimde döndürür
+# Returns sys.dm_db_missing_index_details rows in the same shape as plan MissingIndex records
+def fetch_missing_index_details(connection, top=DEFAULT_DMV_TOP):
+    with borrowed_connection(connection) as conn:
+        cursor = conn.cursor()
+        cursor.execute(MISSING_INDEX_DMV_SQL, top)
+        hints = []
+        for (database, schema, table, equality, inequality, included,
+             uses, avg_cost, avg_impact) in cursor.fetchall():
+            if table is None:
+                continue
+            hints.append({
+                "database": database, "schema": schema, "table": table,
+                "equality": _dmv_columns(equality),
+                "inequality": _dmv_columns(inequality),
+                "include": _dmv_columns(included),
+                "impact": float(avg_impact or 0),
+                "uses": int(uses or 0),
+                "avg_cost": float(avg_cost or 0)
+            })
+        return hints
+
+
+# Sorgudaki WHERE/JOIN/ORDER BY kolonlarından tablo başına index adayları çıkarır.
+# Extracts per-table index candidates from the WHERE/JOIN/ORDER BY columns of a query.
+# Dönüş / returns: [{"table", "equality", "range", "order_by", "include", "spellings"}]
+# Adlar parser'ın küçük harfli adlarıdır; "spellings" sorgudaki yazılışlarını taşır
+# Names are the parser's lower-cased names; "spellings" carries how the query spells them
+def extract_index_candidates(query):
+    parsed = parse_query(query)
+    by_table = {}
+
+    def candidate(table):
+        return by_table.setdefault(table, {"table": table, "equality": [], "range": [], "order_by": [], "include": []})
+
+    for predicate in parsed.predicates:
+        # Önek NOT altındaki predicate seek sağlamaz / a predicate under a prefix NOT gives no seek
+        if predicate.clause not in ("where", "on") or predicate.negated:
+            continue
+        table = parsed.table_for(predicate.column.qualifier)
+        if predicate.right is not None:
+            # Join koşulu: iki taraf da kendi tablosunda eşitlik kolonudur
+            # Join condition: both sides are equality columns on their own table
+            if predicate.op != "=":
+                continue
+            right_table = parsed.table_for(predicate.right.qualifier)
+            if table is not None:
+                candidate(table)["equality"].append(predicate.column.column)
+            if right_table is not None:
+                candidate(right_table)["equality"].append(predicate.right.column)
+            continue
+        if table is None:
+            continue
+        if predicate.op in EQUALITY_OPS:
+            candidate(table)["equality"].append(predicate.column.column)
+        elif predicate.op in RANGE_OPS:
+            # '%abc' ile başlayan LIKE seek yapamaz
+            # A LIKE starting with a wildcard cannot seek
+            if predicate.op == "like" and isinstance(predicate.values[0], str) and \
+                    predicate.values[0][:1] in ("%", "_", "["):
+                continue
+            candidate(table)["range"].append(predicate.column.column)
+
+    order_tables = {parsed.table_for(column.qualifier) for column in parsed.order_by}
+    if len(order_tables) == 1 and None not in order_tables:
+        candidate(order_tables.pop())["order_by"] = _unique(column.column for column in parsed.order_by)
+
+    # Seçilen kolonlar INCLUDE olur (kapsayan index); SELECT * veya çok geniş listede eklenmez
+    # Projected columns become INCLUDEs (covering index); none for SELECT * or very wide lists
+    if not parsed.select_star:
+        for column in parsed.select_columns:
+            table = parsed.table_for(column.qualifier)
+            if table in by_table:
+                by_table[table]["include"].append(column.column)
+
+    spellings = identifier_spellings(query) if by_table else {}
+    candidates = []
+    for item in by_table.values():
+        item["equality"] = _unique(item["equality"])
+        item["range"] = [c for c in _unique(item["range"]) if c not in item["equality"]]
+        used = set(item["equality"]) | set(item["range"]) | set(item["order_by"])
+        include = [c for c in _unique(item["include"]) if c not in used]
+        item["include"] = include if len(include) <= MAX_INCLUDE_COLUMNS else []
+        names = used | set(item["include"]) | set(item["table"].split("."))
+        item["spellings"] = {name: spellings[name] for name in names if name in spellings}
+        candidates.append(item)
+    return candidates
+
+
+def _covering_index(indexes, equality, tail):
+    # Anahtarın başı eşitlik kolonlarını (sırası fark etmez), ardından tail kolonlarını içeriyorsa index yeterlidir
+    # An index is enough when its leading keys are the equality columns (any order) followed by the tail
+    width = len(equality)
+    for index_def in indexes:
+        keys = index_def["key_columns"]
+        if len(keys) < width + len(tail):
+            continue
+        if set(keys[:width]) == equality and tuple(keys[width:width + len(tail)]) == tail:
+            return index_def
+    return None
+
+
+def _extendable_index(indexes, key_columns):
+    # Anahtarı önerinin başlangıcı olan index yeni index yerine genişletilebilir
+    # An index whose keys are a prefix of the suggestion can be widened instead of adding a new one
+    best = None
+    for index_def in indexes:
+        keys = index_def["key_columns"]
+        if keys and keys == key_columns[:len(keys)] and not index_def["is_primary_key"] and \
+                (best is None or len(keys) > len(best["key_columns"])):
+            best = index_def
+    return best
+
+
+# Adlar özgün yazılışlarıyla gelir (büyük/küçük harf duyarlı harmanlamalar) ve köşeli parantezle yazılır
+# Names arrive in their original spelling (case-sensitive collations) and are bracket-quoted
+def _index_ddl(schema, table, key_columns, include_columns):
+    name = f"IX_{table}_{'_'.join(key_columns)}"[:INDEX_NAME_MAX]
+    keys = ", ".join(_quote(column) for column in key_columns)
+    include = f" INCLUDE ({', '.join(_quote(column) for column in include_columns)})" if include_columns else ""
+    target = f"{_quote(schema)}.{_quote(table)}" if schema else _quote(table)
+    return f"CREATE NONCLUSTERED INDEX {_quote(name)} ON {target} ({keys}){include};"
+
+
+# Tüm iş yükü boyunca index adaylarını toplar; aynı tablo için uyumlu adayları tek indexte birleştirir.
+# Collects index candidates across a whole workload and consolidates compatible ones per table.
+# Kaynaklar: sorgu metni, plan MissingIndex ipuçları, sys.dm_db_missing_index_details
+# Sources: query text, plan MissingIndex hints, sys.dm_db_missing_index_details
+# Fayda birimi: tahmini kaçınılan sayfa okuması x çalıştırma ağırlığı
+# Benefit unit: estimated page reads avoided x execution weight
+class IndexAdvisor:
+    def __init__(self, metadata=None, default_db=None):
+        self.catalog = as_catalog(metadata)
+        self.default_db = default_db
+        # (tablo, eşitlik kümesi, tail) -> aday grubu
+        # (table, equality set, tail) -> candidate group
+        self.groups = {}
+        self.queries = 0
+        self.covered = {}
+        # Katalog adları küçük harflidir; DDL için sorgu ve sunucu ipuçlarındaki yazılışlar tablo başına tutulur
+        # Catalog names are lower-cased; the spellings seen in queries and server hints are kept per table for the DDL
+        self.spellings = {}
+
+    def _remember(self, table, names):
+        spellings = self.spellings.setdefault(table, {})
+        for name in names:
+            if name:
+                spellings.setdefault(name.lower(), name)
+
+    def _table(self, name, database=None, schema=None):
+        if schema:
+            name = f"{database}.{schema}.{name}" if database else f"{schema}.{name}"
+        row = self.catalog.resolve_row(name.lower(), self.default_db)
+        if row is None:
+            return name.lower(), None
+        return self.catalog.key_of(row), self.catalog.record(row)
+
+    def _add(self, table, meta, equality, tail, include, impact, weight, source, query_id=None):
+        equality = frozenset(column.lower() for column in equality)
+        tail = tuple(column.lower() for column in tail if column.lower() not in equality)
+        if not equality and not tail:
+            return
+        indexes = meta["indexes"] if meta else []
+        existing = _covering_index(indexes, equality, tail)
+        include = [column.lower() for column in include if column.lower() not in equality and column.lower() not in tail]
+        if existing is not None:
+            # Kümelenmiş index tüm kolonları taşır; diğerlerinde include kolonları da bulunmalı
+            # A clustered index carries every column; others must also hold the included columns
+            stored = set(existing["key_columns"]) | set(existing["included_columns"])
+            if existing["type"] == "CLUSTERED" or all(column in stored for column in include):
+                self.covered[existing["name"]] = self.covered.get(existing["name"], 0) + 1
+                return
+
+        pages = estimated_pages(meta) if meta else 1
+        group = self.groups.setdefault((table, equality, tail), {
+            "table": table, "meta": meta, "equality": equality, "tail": tail, "include": {},
+            "benefit": 0.0, "impact": 0.0, "queries": [], "sources": set(), "hits": 0
+        })
+        for column in include:
+            group["include"][column] = None
+        group["benefit"] += weight * impact * pages
+        group["impact"] = max(group["impact"], impact * 100)
+        group["sources"].add(source)
+        group["hits"] += 1
+        if query_id is not None and len(group["queries"]) < MAX_EXAMPLE_QUERIES and query_id not in group["queries"]:
+            group["queries"].append(query_id)
+
+    # weight: çalıştırma sayısı veya toplam CPU gibi göreli ağırlık
+    # weight: relative weight such as the execution count or total CPU
+    def add_query(self, query, weight=1.0, query_id=None):
+        return self.add_candidates(extract_index_candidates(query), weight, query_id)
+
+    # extract_index_candidates çıktısı (ör. batch işçilerinden gelen) eklenir
+    # Adds extract_index_candidates output (e.g. coming from batch workers)
+    def add_candidates(self, candidates, weight=1.0, query_id=None):
+        self.queries += 1
+        for item in candidates:
+            table, meta = self._table(item["table"])
+            self._remember(table, item["spellings"].values())
+            self._add(table, meta, item["equality"], item["range"][:1] or item["order_by"],
+                      item["range"][1:] + item["include"], QUERY_PREDICATE_IMPACT, weight, "query", query_id)
+        return candidates
+
+    # Plan MissingIndex veya DMV kayıtları; DMV kayıtlarında ağırlık kullanım sayısıdır
+    # Plan MissingIndex or DMV records; for DMV records the weight is the use count
+    def add_missing_indexes(self, hints, weight=1.0, source="plan", query_id=None):
+        for hint in hints:
+            table, meta = self._table(hint["table"], hint.get("database"), hint.get("schema"))
+            self._remember(table, [hint.get("schema"), hint["table"]] + hint["equality"] + hint["inequality"] + hint["include"])
+            inequality = hint["inequality"]
+            self._add(table, meta, hint["equality"], inequality[:1], inequality[1:] + hint["include"],
+                      (hint["impact"] or 0) / 100, hint.get("uses", weight), source, query_id)
+
+    def _consolidate(self):
+        # Büyükten küçüğe: küçük eşitlik kümeleri, onları kapsayan indexin başına yerleşir
+        # Largest first: smaller equality sets become the leading keys of the index that contains them
+        merged = []
+        for group in sorted(self.groups.values(), key=lambda g: (len(g["equality"]) + len(g["tail"]), g["benefit"]),
+                            reverse=True):
+            target = None
+            for candidate in merged:
+                if candidate["table"] != group["table"]:
+                    continue
+                if group["equality"] == candidate["equality"] and group["tail"] == candidate["tail"][:len(group["tail"])]:
+                    target = candidate
+                elif not group["tail"] and group["equality"] < candidate["equality"] and \
+                        all(group["equality"] <= prefix or prefix <= group["equality"] for prefix in candidate["prefixes"]):
+                    target = candidate
+                if target is not None:
+                    break
+            if target is None:
+                group = dict(group, include=dict(group["include"]), queries=list(group["queries"]),
+                             sources=set(group["sources"]), prefixes=[])
+                merged.append(group)
+                continue
+            target["prefixes"].append(group["equality"])
+            target["include"].update(group["include"])
+            target["benefit"] += group["benefit"]
+            target["impact"] = max(target["impact"], group["impact"])
+            target["queries"].extend(q for q in group["queries"] if q not in target["queries"])
+            del target["queries"][MAX_EXAMPLE_QUERIES:]
+            target["sources"] |= group["sources"]
+            target["hits"] += group["hits"]
+        return merged
+
+    def recommendations(self, top=None):
+        results = []
+        for group in self._consolidate():
+            # Daha çok alt kümede geçen eşitlik kolonu öne alınır (alt kümeler anahtar başı olur)
+            # Equality columns used by more subsets come first, so each subset is a key prefix
+            votes = {column: sum(column in prefix for prefix in group["prefixes"]) for column in group["equality"]}
+            key_columns = sorted(group["equality"], key=lambda column: (-votes[column], column)) + list(group["tail"])
+            include_columns = [column for column in group["include"] if column not in key_columns]
+            meta = group["meta"]
+            schema = meta["schema"] if meta else (group["table"].split(".")[-2] if "." in group["table"] else "")
+            table_name = meta["table"] if meta else group["table"].split(".")[-1]
+            extends = _extendable_index(meta["indexes"], key_columns) if meta else None
+            spellings = self.spellings.get(group["table"], {})
+            results.append({
+                "table": group["table"],
+                "key_columns": key_columns,
+                "include_columns": include_columns,
+                "benefit": round(group["benefit"], 2),
+                "impact": round(group["impact"], 1),
+                "hits": group["hits"],
+                "example_queries": group["queries"],
+                "sources": sorted(group["sources"]),
+                "extends_index": extends["name"] if extends else None,
+                "ddl": _index_ddl(spellings.get(schema, schema), spellings.get(table_name, table_name),
+                                  [spellings.get(column, column) for column in key_columns],
+                                  [spellings.get(column, column) for column in include_columns])
+            })
+        results.sort(key=lambda r: r["benefit"], reverse=True)
+        return results[:top] if top else results
+
+    def report(self, top=None):
+        return {
+            "status": "success",
+            "queries": self.queries,
+            "recommendations": self.recommendations(top),
+            "already_covered": dict(sorted(self.covered.items(), key=lambda item: item[1], reverse=True))
+        }
+
+
+# Tek sorgu için öneriler (plan ipuçlarıyla birlikte); analyze_query_offline bunu kullanır
+# Suggestions for a single query (together with plan hints); used by analyze_query_offline
+def recommend_indexes(query, metadata=None, default_db=None, missing_indexes=None):
+    advisor = IndexAdvisor(metadata, default_db)
+    advisor.add_query(query)
+    if missing_indexes:
+        advisor.add_missing_indexes(missing_indexes)
+    return advisor.recommendations()
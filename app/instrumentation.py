@@ -0,0 +1,332 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+# Aşama süresi kovaları (ms); Prometheus çıktısında saniyeye çevrilir
+# Stage latency buckets (ms); converted to seconds in the Prometheus output
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+MAX_SLOW_RUNS = 20
+PROFILE_TOP_FUNCTIONS = 25
+
+# Streamlit gibi argümansız girişler için: SQL_ANALYZER_METRICS=dosya(.jsonl|.prom) ölçümü açar,
+# SQL_ANALYZER_PROFILE_MS=eşik bu süreyi aşan profilli aşamaların cProfile çıktısını saklar
+# For entry points without arguments such as Streamlit: SQL_ANALYZER_METRICS=file(.jsonl|.prom) turns metrics on,
+# SQL_ANALYZER_PROFILE_MS=threshold keeps cProfile output of profiled stages slower than this
+METRICS_ENV = "SQL_ANALYZER_METRICS"
+PROFILE_ENV = "SQL_ANALYZER_PROFILE_MS"
+
+OK = "ok"
+ERROR = "error"
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.slow_runs = deque(maxlen=MAX_SLOW_RUNS)
+        self.profile_threshold_ms = None
+        self.profile_dir = None
+        self.local = threading.local()
+
+
+_state = _State()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum_ms", "min_ms", "max_ms")
+
+    def __init__(self):
+        # Son kova +Inf / the last bucket is +Inf
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, elapsed_ms):
+        index = 0
+        for bound in LATENCY_BUCKETS_MS:
+            if elapsed_ms <= bound:
+                break
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = elapsed_ms if self.max_ms is None else max(self.max_ms, elapsed_ms)
+
+    # Kova sınırlarından yaklaşık yüzdelik (kovanın üst sınırı, en fazla max)
+    # Approximate percentile from the bucket bounds (the bucket's upper bound, capped at max)
+    def percentile(self, p):
+        if not self.count:
+            return None
+        target = p / 100 * self.count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "min_ms": round(self.min_ms, 3) if self.min_ms is not None else None,
+            "max_ms": round(self.max_ms, 3) if self.max_ms is not None else None,
+            "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), self.buckets)}
+        }
+
+
+def _observe(name, status, elapsed_ms):
+    with _state.lock:
+        histogram = _state.histograms.get((name, status))
+        if histogram is None:
+            histogram = _state.histograms[(name, status)] = _Histogram()
+        histogram.observe(elapsed_ms)
+
+
+# ---------------------------------------------------------------------------
+# Span'ler / spans
+# ---------------------------------------------------------------------------
+
+# Kapalıyken span() her seferinde bu tek nesneyi döndürür: bellek ayırma ve saat okuma yok
+# When disabled span() returns this single object every time: no allocation and no clock reads
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def mark_error(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "profile", "status", "started", "profiler")
+
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.profile = profile
+        self.status = OK
+        self.started = None
+        self.profiler = None
+
+    def __enter__(self):
+        # cProfile iç içe çalışmaz; sadece en dıştaki profilli span profillenir
+        # cProfile does not nest; only the outermost profiled span is profiled
+        if self.profile and _state.profile_threshold_ms is not None and not getattr(_state.local, "profiling", False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+                _state.local.profiling = True
+            except ValueError:
+                self.profiler = None
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        if exc_type is not None:
+            self.status = ERROR
+        if self.profiler is not None:
+            self.profiler.disable()
+            _state.local.profiling = False
+            if elapsed_ms >= _state.profile_threshold_ms:
+                _keep_profile(self.name, elapsed_ms, self.profiler)
+        _observe(self.name, self.status, elapsed_ms)
+        return False
+
+    # Hata fırlatmayan ama {"status": "error"} dönen çağrılar için
+    # For calls that return {"status": "error"} instead of raising
+    def mark_error(self):
+        self.status = ERROR
+
+
+def _keep_profile(name, elapsed_ms, profiler):
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    path = None
+    if _state.profile_dir:
+        os.makedirs(_state.profile_dir, exist_ok=True)
+        path = os.path.join(_state.profile_dir, f"{name}_{int(time.time() * 1000)}.prof")
+        profiler.dump_stats(path)
+    with _state.lock:
+        _state.slow_runs.append({"stage": name, "elapsed_ms": round(elapsed_ms, 3), "ts": time.time(),
+                                 "profile_path": path, "top": buffer.getvalue()})
+
+
+# Kullanım / usage: with span("analyze_query.structure"): ...
+# profile=True: ölçüm açık ve eşik verilmişse, eşiği aşan çalıştırmanın cProfile özeti saklanır
+# profile=True: when metrics are on and a threshold is set, runs over the threshold keep a cProfile summary
+def span(name, profile=False):
+    if not _state.enabled:
+        return _NOOP_SPAN
+    return _Span(name, profile)
+
+
+# Fonksiyonu span ile sarar; {"status": "error"} dönen sonuçlar hata olarak sayılır
+# Wraps a function in a span; results of {"status": "error"} are counted as errors
+def timed(name=None, profile=False):
+    def decorate(func):
+        stage = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with _Span(stage, profile) as current:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and result.get("status") == ERROR:
+                    current.mark_error()
+                return result
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    if not _state.enabled:
+        return
+    with _state.lock:
+        _state.counters[name] = _state.counters.get(name, 0) + value
+
+
+# ---------------------------------------------------------------------------
+# Açma / kapama ve dışa aktarma / switching and export
+# ---------------------------------------------------------------------------
+
+def enable(profile_threshold_ms=None, profile_dir=None):
+    _state.profile_threshold_ms = profile_threshold_ms
+    _state.profile_dir = profile_dir
+    _state.enabled = True
+
+
+def disable():
+    _state.enabled = False
+
+
+# (eşik ms, profil klasörü); açıp kapatırken korunmaları için
+# (threshold ms, profile directory); kept so that switching on and off preserves them
+def profile_settings():
+    return _state.profile_threshold_ms, _state.profile_dir
+
+
+# Sadece eşiği değiştirir, profil klasörü (ör. configure_from_env) korunur
+# Changes only the threshold; the profile directory (e.g. from configure_from_env) is kept
+def set_profile_threshold(threshold_ms):
+    _state.profile_threshold_ms = threshold_ms
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def reset():
+    with _state.lock:
+        _state.histograms.clear()
+        _state.counters.clear()
+        _state.slow_runs.clear()
+
+
+def snapshot():
+    with _state.lock:
+        stages = {}
+        for (name, status), histogram in sorted(_state.histograms.items()):
+            stages.setdefault(name, {})[status] = histogram.as_dict()
+        return {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "stages": stages,
+            "counters": dict(_state.counters),
+            "slow_runs": list(_state.slow_runs)
+        }
+
+
+# Aşama başına özet satırları (arayüz ve konsol için)
+# Per-stage summary rows (for the UI and the console)
+def summary():
+    with _state.lock:
+        return [{
+            "stage": name, "status": status, "count": histogram.count,
+            "mean_ms": round(histogram.sum_ms / histogram.count, 2),
+            "p50_ms": histogram.percentile(50), "p95_ms": histogram.percentile(95),
+            "max_ms": round(histogram.max_ms, 2)
+        } for (name, status), histogram in sorted(_state.histograms.items()) if histogram.count]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(prefix="sql_analyzer"):
+    with _state.lock:
+        histograms = sorted(_state.histograms.items())
+        counters = sorted(_state.counters.items())
+    lines = [f"# HELP {prefix}_stage_duration_seconds Latency of instrumented stages",
+             f"# TYPE {prefix}_stage_duration_seconds histogram"]
+    for (name, status), histogram in histograms:
+        labels = f'stage="{_label(name)}",status="{status}"'
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS_MS, histogram.buckets):
+            cumulative += bucket_count
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{prefix}_stage_duration_seconds_sum{{{labels}}} {histogram.sum_ms / 1000:.6f}")
+        lines.append(f"{prefix}_stage_duration_seconds_count{{{labels}}} {histogram.count}")
+    lines.append(f"# HELP {prefix}_events_total Instrumentation counters")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in counters:
+        lines.append(f'{prefix}_events_total{{name="{_label(name)}"}} {value:g}')
+    return "\n".join(lines) + "\n"
+
+
+# .prom -> Prometheus metin dosyası (üzerine yazılır), diğerleri -> JSON satırı eklenir
+# .prom -> Prometheus text file (overwritten), anything else -> a JSON line is appended
+def write_metrics(path):
+    if path.endswith(".prom"):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot(), default=str) + "\n")
+    return path
+
+
+def configure_from_env():
+    path = os.environ.get(METRICS_ENV)
+    if not path or _state.enabled:
+        return None
+    threshold = os.environ.get(PROFILE_ENV)
+    enable(float(threshold) if threshold else None, os.path.join(os.path.dirname(os.path.abspath(path)), "profiles"))
+    atexit.register(write_metrics, path)
+    return path
+
+
+configure_from_env()
@@ -9,16 +9,29 @@ Description:
 """
 import pandas as pd
 
+from metadata_store import is_store_path, load_metadata_store
+
+
 def load_table_metadata(path):
-    df = pd.read_excel(path)
-    table_dict = {}
+    # SQLite metadata deposu doğrudan okunur
+    # A SQLite metadata store is read directly
+    if is_store_path(path):
+        return load_metadata_store(path)
 
-    for _, row in df.iterrows():
-        key = f"{row['Şema'].strip().lower()}.{row['Tablo Adı'].strip().lower()}"
-        table_dict[key] = {
-            "row_count": int(row["Row Count"]),
-            "column_count": int(row["Column Count"]),
-            "has_index": False if str(row["Index Information"]).strip().lower() == "yok" else True
-        }
+    df = pd.read_excel(path, usecols=["Şema", "Tablo Adı", "Row Count", "Column Count", "Index Information"])
 
-    return table_dict
+    # Satır satır (iterrows) yerine kolon bazlı işlem
+    # Column-wise processing instead of row by row (iterrows)
+    keys = df["Şema"].astype(str).str.strip().str.lower() + "." + df["Tablo Adı"].astype(str).str.strip().str.lower()
+    row_counts = df["Row Count"].astype("int64").tolist()
+    column_counts = df["Column Count"].astype("int64").tolist()
+    has_index = (df["Index Information"].astype(str).str.strip().str.lower() != "yok").tolist()
+
+    return {
+        key: {
+            "row_count": row_count,
+            "column_count": column_count,
+            "has_index": indexed
+        }
+        for key, row_count, column_count, indexed in zip(keys, row_counts, column_counts, has_index)
+    }
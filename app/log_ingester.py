@@ -0,0 +1,138 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+from datetime import timezone
+
+import pyodbc
+
+from connection import APP_NAME
+from connection_pool import borrowed_connection
+from query_history import get_query_history
+from sql_parser import fingerprint_hash
+
+DEFAULT_BATCH_SIZE = 5000
+# Bir çalıştırmada bellekte tutulan en fazla sorgu metni
+# Maximum number of query texts kept in memory during one ingestion
+TEXT_CACHE_SIZE = 10000
+
+# Metin her satırda tekrar gelmez; partideki yeni hash'ler için ayrıca çekilir
+# The text is not repeated per row; it is fetched separately for the batch's new hashes
+LOG_BATCH_SQL = """
+    SELECT TOP (?)
+        LogId, QueryHash, DatabaseName, RunDateUtc, DurationUs, ExecutionTimeMs, AffectedRows, ErrorMessage,
+        ProgramName
+    FROM dbo.QueryPerformanceLog
+    WHERE LogId > ?
+    ORDER BY LogId;
+"""
+
+QUERY_TEXT_SQL = "SELECT QueryHash, QueryText FROM dbo.QueryText WHERE QueryHash IN ({placeholders});"
+
+
+def _watermark_source(server, database):
+    return f"QueryPerformanceLog|{server.lower()}|{database.lower()}"
+
+
+# Yer önce açılır, sonra çekilir: partinin hash'leri sabitlenir ve çıkarılmaz (parti sınırdan büyükse cache geçici olarak büyür)
+# Room is made before fetching: the batch's hashes are pinned and never evicted (the cache grows past the limit
+# temporarily when a batch alone is larger)
+def _fetch_fingerprints(cursor, hashes, cache):
+    pinned = set(hashes)
+    missing = [h for h in hashes if h not in cache]
+    overflow = len(cache) + len(missing) - TEXT_CACHE_SIZE
+    if overflow > 0:
+        for key in [key for key in cache if key not in pinned][:overflow]:
+            del cache[key]
+    # IN listesi parametre sınırının (2100) altında tutulur
+    # The IN list stays below the parameter limit (2100)
+    for start in range(0, len(missing), 1000):
+        chunk = missing[start:start + 1000]
+        cursor.execute(QUERY_TEXT_SQL.format(placeholders=", ".join("?" for _ in chunk)), *chunk)
+        for query_hash, query_text in cursor.fetchall():
+            cache[bytes(query_hash)] = (query_text, fingerprint_hash(query_text))
+
+
+# dbo.QueryPerformanceLog'daki yeni satırları LogId filigranı ile parti parti geçmiş deposuna aktarır.
+# Pulls new dbo.QueryPerformanceLog rows in batches past the LogId watermark into the history store.
+# Filigran her partiyle aynı transaction'da saklanır; yarıda kesilen aktarım kaldığı yerden devam eder.
+# The watermark is saved in the same transaction as each batch, so an interrupted run resumes where it stopped.
+# Metni (henüz) dbo.QueryText'te olmayan satırda durulur: filigran o satırın önünde kalır, sonraki çalıştırma yeniden dener.
+# A row whose text is not in dbo.QueryText (yet) stops the run: the watermark stays before it and the next run retries.
+# Uygulamanın kendi çalıştırmaları (ProgramName = APP_NAME) geçmişte zaten kayıtlıdır; atlanır ve sayılır
+# The app's own runs (ProgramName = APP_NAME) are already in the history; they are skipped and counted
+# cancelled: her partiden sonra sorulur; True dönerse aktarım kaydedilmiş filigranda durur
+# cancelled: asked after every batch; when it returns True the import stops at the saved watermark
+def ingest_performance_log(connection, history=None, server=None, batch_size=DEFAULT_BATCH_SIZE,
+                           max_batches=None, on_progress=None, cancelled=None):
+    if history is None:
+        history = get_query_history()
+    summary = {"status": "success", "ingested": 0, "failed_runs": 0, "app_runs": 0, "missing_text": 0,
+               "batches": 0, "watermark": None}
+    try:
+        with borrowed_connection(connection) as conn:
+            database = conn.getinfo(pyodbc.SQL_DATABASE_NAME)
+            if server is None:
+                server = conn.getinfo(pyodbc.SQL_SERVER_NAME)
+            source = _watermark_source(server, database)
+            watermark = history.get_watermark(source)
+            summary["watermark"] = watermark
+            cursor = conn.cursor()
+            texts = {}
+
+            while max_batches is None or summary["batches"] < max_batches:
+                cursor.execute(LOG_BATCH_SQL, batch_size, watermark)
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                _fetch_fingerprints(cursor, list({bytes(row[1]) for row in rows}), texts)
+
+                records = []
+                last_log_id = None
+                for (log_id, query_hash, database_name, run_date, duration_us, duration_ms,
+                     affected_rows, error_message, program_name) in rows:
+                    text = texts.get(bytes(query_hash))
+                    if text is None:
+                        summary["missing_text"] = sum(1 for row in rows if bytes(row[1]) not in texts)
+                        break
+                    last_log_id = log_id
+                    if program_name == APP_NAME:
+                        summary["app_runs"] += 1
+                        continue
+                    # Hatalı çalıştırmalar süre geçmişine girmez, sadece sayılır
+                    # Failed runs are not part of the duration history, only counted
+                    if error_message is not None or duration_ms < 0:
+                        summary["failed_runs"] += 1
+                        continue
+                    records.append({
+                        "query": text[0],
+                        "fingerprint": text[1],
+                        "server": server,
+                        "database": database_name,
+                        "ts": run_date.replace(tzinfo=timezone.utc).timestamp(),
+                        "duration_ms": duration_us / 1000 if duration_us is not None else float(duration_ms),
+                        "row_count": affected_rows,
+                        "source": "log"
+                    })
+
+                if last_log_id is not None:
+                    watermark = last_log_id
+                    history.record_runs(records, watermark=(source, watermark))
+                    summary["ingested"] += len(records)
+                    summary["batches"] += 1
+                    summary["watermark"] = watermark
+                    if on_progress:
+                        on_progress(summary)
+                if summary["missing_text"] or len(rows) < batch_size:
+                    break
+                if cancelled is not None and cancelled():
+                    summary["cancelled"] = True
+                    break
+    except Exception as e:
+        summary.update({"status": "error", "error": str(e)})
+    return summary
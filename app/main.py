@@ -7,13 +7,217 @@ Description:
     This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
     Created using Python 3.x and Streamlit.
 """
+import argparse
+import os
+
 from connection import connect_to_sql_server
 from measure_query_duration import measure_query_duration_v3
 
-if __name__ == "__main__":
-    server = input("Server Name: ")
-    database = input("Database Name: ")
-    conn = connect_to_sql_server(server, database)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SQL Query Analyzer")
+    parser.add_argument("--batch", metavar="WORKLOAD",
+                        help="Workload file to analyze headless (.jsonl, .sql or one query per line)")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="Result file (.jsonl or .parquet)")
+    parser.add_argument("--metadata", help="Metadata store (.sqlite) used for the table checks")
+    parser.add_argument("--default-db", help="Database used to resolve schema.table names")
+    parser.add_argument("--processes", type=int, default=None, help="Analysis worker processes")
+    parser.add_argument("--execute", type=int, default=0, metavar="N",
+                        help="Also execute the first N analyzed queries on the server")
+    parser.add_argument("--execute-workers", type=int, default=4, help="Concurrent executions")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Estimate query cost from statistics histograms (needs --server/--database); "
+                             "--execute then only runs queries the estimator cannot judge")
+    parser.add_argument("--ingest-log", action="store_true",
+                        help="Import new dbo.QueryPerformanceLog rows into the local query history")
+    parser.add_argument("--top-offenders", type=int, metavar="N",
+                        help="Scan the top N queries per CPU/reads/duration/executions from the plan cache")
+    parser.add_argument("--workload-source", choices=["dmv", "querystore"], default="dmv",
+                        help="sys.dm_exec_query_stats (dmv) or Query Store of --database (querystore)")
+    parser.add_argument("--hours", type=int, default=24, help="Query Store window in hours")
+    parser.add_argument("--diff-plans", nargs=2, metavar=("OLD", "NEW"),
+                        help="Compare two showplan XML files (.sqlplan / .xml), e.g. from two runs or environments")
+    parser.add_argument("--diff-dot", metavar="FILE", help="With --diff-plans, write the side-by-side diff as DOT")
+    parser.add_argument("--server", help="Server name (needed with --execute / --estimate / --ingest-log / --top-offenders)")
+    parser.add_argument("--database", help="Database name (needed with --execute / --estimate / --ingest-log / --top-offenders)")
+    capture = parser.add_mutually_exclusive_group()
+    capture.add_argument("--record", metavar="ARCHIVE",
+                         help="Record every server response into this capture archive (.capture.jsonl.gz)")
+    capture.add_argument("--replay", metavar="ARCHIVE",
+                         help="Serve server responses from a capture archive instead of connecting")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Collect stage timings and write them to FILE (.prom = Prometheus text, else JSON lines)")
+    parser.add_argument("--profile-slow-ms", type=float, metavar="MS",
+                        help="With --metrics, keep a cProfile dump of analyses slower than MS")
+    return parser.parse_args()
+
+
+# --record: bağlantılar kayıt arşivine yazar, --replay: sunucu yerine arşiv kullanılır
+# --record: connections write into a capture archive, --replay: the archive is used instead of the server
+def open_capture(args):
+    if args.record:
+        from capture import CaptureArchive
+        return CaptureArchive(args.record, {"server": args.server, "database": args.database})
+    if args.replay:
+        from capture import CaptureReplay
+        return CaptureReplay(args.replay)
+    return None
+
+
+def open_server_connection(args, server=None, database=None):
+    if args.replay:
+        return args.capture.connect()
+    conn = connect_to_sql_server(server or args.server, database or args.database)
+    if conn is not None and args.record:
+        conn = args.capture.wrap(conn)
+    return conn
+
+
+def run_batch(args):
+    from batch_analyzer import run_batch_analysis
+
+    connect = None
+    if args.execute > 0:
+        connect = lambda: open_server_connection(args)
+
+    stats_source = None
+    if args.estimate:
+        from table_stats_cache import connection_source, get_cached_column_statistics
+
+        # Histogramlar bir kez tazelenir, işçiler yerel cache'ten okur
+        # Histograms are refreshed once, the workers read them from the local cache
+        conn = open_server_connection(args)
+        if conn is None:
+            print("Error: connection failed.")
+            return
+        # İşçiler cache'i istatistiklerin kaydedildiği adlarla okur (--server/--database verilmemiş olabilir)
+        # Workers read the cache under the names the statistics were saved with (--server/--database may be omitted)
+        try:
+            stats_source = connection_source(conn, args.server)
+            get_cached_column_statistics(conn, stats_source[0])
+        finally:
+            conn.close()
+
+    def report(summary):
+        print(f" analyzed: {summary['analyzed']}  flagged: {summary['flagged']}  "
+              f"expensive (est.): {summary['estimated_expensive']}  "
+              f"executed: {summary['executed']}  errors: {summary['errors']}", flush=True)
+
+    summary = run_batch_analysis(
+        args.batch, args.output,
+        metadata_path=args.metadata,
+        default_db=(args.default_db or args.database or "").lower() or None,
+        processes=args.processes,
+        connect=connect,
+        max_executions=args.execute,
+        execute_workers=args.execute_workers,
+        on_progress=report,
+        stats_source=stats_source
+    )
+    print(f"\n Done in {summary['elapsed_s']:.1f} s. Results: {args.output}")
+    print_index_recommendations(summary["index_recommendations"])
+
+
+def print_index_recommendations(recommendations, top=10):
+    if not recommendations:
+        return
+    print("\n Index recommendations:")
+    for r in recommendations[:top]:
+        extends = f" (extends {r['extends_index']})" if r["extends_index"] else ""
+        print(f"  benefit {r['benefit']:>14,.0f}  hits {r['hits']:>6}  {r['ddl']}{extends}")
+
+
+def run_ingest_log(args):
+    from log_ingester import ingest_performance_log
+
+    conn = open_server_connection(args)
+    if conn is None:
+        print("Error: connection failed.")
+        return
+
+    def report(summary):
+        print(f" batches: {summary['batches']}  ingested: {summary['ingested']}  "
+              f"failed runs: {summary['failed_runs']}  LogId: {summary['watermark']}", flush=True)
+
+    try:
+        summary = ingest_performance_log(conn, server=args.server, on_progress=report)
+    finally:
+        conn.close()
+    if summary["status"] == "success":
+        print(f"\n Done. {summary['ingested']} runs imported, watermark LogId {summary['watermark']}.")
+        if summary["app_runs"]:
+            print(f" Skipped {summary['app_runs']} runs made by this app; they are already in the history.")
+        if summary["missing_text"]:
+            print(f" Stopped before {summary['missing_text']} runs whose query text is not in dbo.QueryText yet; "
+                  f"they are retried on the next run.")
+    else:
+        print("Error:", summary["error"])
+
+
+def run_top_offenders(args):
+    from batch_analyzer import JsonlResultWriter
+    from metadata_catalog import MetadataCatalog
+    from metadata_store import load_metadata_columns
+    from workload_scan import scan_workload
+
+    conn = open_server_connection(args)
+    if conn is None:
+        print("Error: connection failed.")
+        return
+    catalog = MetadataCatalog.from_columns(load_metadata_columns(args.metadata)) if args.metadata else None
+
+    try:
+        report = scan_workload(
+            conn, catalog, top_n=args.top_offenders, source=args.workload_source,
+            default_db=(args.default_db or args.database or "").lower() or None, hours=args.hours,
+            on_progress=lambda done, total: print(f" analyzed {done}/{total}", end="\r", flush=True)
+        )
+    finally:
+        conn.close()
+    if report["status"] != "success":
+        print("Error:", report["error"])
+        return
+
+    writer = JsonlResultWriter(args.output)
+    try:
+        writer.write_many(report["offenders"])
+    finally:
+        writer.close()
+    print(f"\n Done in {report['elapsed_s']:.1f} s. Results: {args.output}\n")
+    for offender in report["offenders"][:10]:
+        print(f" #{offender['rank']:<3} score {offender['score']:>7.2f}  cpu {offender['total_cpu_ms']:>12,.0f} ms  "
+              f"reads {offender['total_reads']:>14,.0f}  {' '.join(offender['query'].split())[:80]}")
+    print_index_recommendations(report["index_recommendations"])
+
+
+def run_diff_plans(args):
+    from graphviz_execution_plan import compare_execution_plans_for_graphviz
+
+    with open(args.diff_plans[0], "rb") as old_file, open(args.diff_plans[1], "rb") as new_file:
+        result = compare_execution_plans_for_graphviz(old_file.read(), new_file.read())
+    if result["status"] != "success":
+        print("Error:", result["error"])
+        return
+    diff = result["diff"]
+    print(f"\n Operators: {diff['old_operator_count']} → {diff['new_operator_count']}  matched: {diff['matched']}  "
+          f"changed: {diff['changed']}  added: {diff['added']}  removed: {diff['removed']}")
+    print(f" Plan hash: {diff['old_plan_hash']} → {diff['new_plan_hash']}\n")
+    for message in diff["messages"]:
+        print(" ", message)
+    if args.diff_dot:
+        with open(args.diff_dot, "w", encoding="utf-8") as f:
+            f.write(result["dot"])
+        print(f"\n Diff graph written to {args.diff_dot}")
+
+
+def run_interactive(args):
+    if args.replay:
+        conn = open_server_connection(args)
+    else:
+        server = input("Server Name: ")
+        database = input("Database Name: ")
+        conn = open_server_connection(args, server, database)
 
     print("\n Paste your SQL query (press Enter + Enter to finish):\n")
     lines = []
@@ -32,3 +236,29 @@ if __name__ == "__main__":
         print(f" Number of affected rows: {result['row_count']}")
     else:
         print("Error:", result["error"])
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.capture = open_capture(args)
+    if args.metrics:
+        import instrumentation
+        instrumentation.enable(args.profile_slow_ms,
+                               os.path.join(os.path.dirname(os.path.abspath(args.metrics)), "profiles"))
+    try:
+        if args.diff_plans:
+            run_diff_plans(args)
+        elif args.batch:
+            run_batch(args)
+        elif args.ingest_log:
+            run_ingest_log(args)
+        elif args.top_offenders:
+            run_top_offenders(args)
+        else:
+            run_interactive(args)
+    finally:
+        if args.record:
+            args.capture.close()
+            print(f" Server responses recorded in {args.record}")
+        if args.metrics:
+            print(f" Stage timings written to {instrumentation.write_metrics(args.metrics)}")
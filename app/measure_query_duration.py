@@ -7,30 +7,57 @@ Description:
     This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
     Created using Python 3.x and Streamlit.
 """
-import re
+import statistics
+import time
+
 import pyodbc
 
+from sql_parser import extract_tables_from_query
+from connection_pool import borrowed_connection
+from instrumentation import timed
+
+@timed("run_and_measure")
 def measure_query_duration_v3(connection, query):
+    # connection bir ConnectionPool da olabilir
+    # connection may also be a ConnectionPool
+    with borrowed_connection(connection) as conn:
+        return _measure_query_duration(conn, query)
+
+
+def _measure_query_duration(connection, query):
     cursor = connection.cursor()
     try:
         # Sorgudan veritabanı adını çek (örnek: x.dbo.tablo)
         # Retrieve the database name from the query (example: x.dbo.table)
-        match = re.search(r'(\w+)\.\w+\.\w+', query.lower())
-        target_db = match.group(1) if match else connection.getinfo(pyodbc.SQL_DATABASE_NAME).lower()
+        qualified = [name for name in extract_tables_from_query(query) if name.count(".") >= 2]
+        target_db = qualified[0].split(".")[-3] if qualified else connection.getinfo(pyodbc.SQL_DATABASE_NAME).lower()
 
         # Bu SP'yi git içerisinden bulabilirsiniz. Kendi veritabanınızda oluşturmanız gerekmektedir.
         # You can find this SP inside. You need to create it in your own database.
-        cursor.execute(f"EXEC [{target_db}].dbo.RunAndMeasure ?", query)
+        cursor.execute(f"EXEC [{target_db.replace(']', ']]')}].dbo.RunAndMeasure ?", query)
 
         while True:
-            if cursor.description is not None:
+            # SP sonucu DurationMs kolonundan tanınır; sorgunun kendi sonuçları atlanır
+            # The SP result is recognised by its DurationMs column; the query's own result sets are skipped
+            if cursor.description is not None and cursor.description[0][0] == "DurationMs":
                 result = cursor.fetchone()
-                if result is not None and len(result) == 2 and isinstance(result[0], int):
-                    return {
+                if result is not None and len(result) >= 2 and isinstance(result[0], int):
+                    perf = {
                         "status": "success",
                         "duration_ms": int(result[0]),
                         "row_count": int(result[1])
                     }
+                    # Yeni SP sürümü mikrosaniye çözünürlüklü süre de döner
+                    # The newer SP version also returns a microsecond-resolution duration
+                    if len(result) >= 3 and result[2] is not None:
+                        perf["duration_us"] = int(result[2])
+                    return perf
+            # SP hata durumunda Label/Value döner
+            # On failure the SP returns Label/Value
+            elif cursor.description is not None and cursor.description[0][0] == "Label":
+                result = cursor.fetchone()
+                if result is not None and result[0] == "ERROR":
+                    return {"status": "error", "error": str(result[1])}
             if not cursor.nextset():
                 break
 
@@ -44,3 +71,79 @@ def measure_query_duration_v3(connection, query):
             "status": "error",
             "error": str(e)
         }
+
+
+# Süre örneklerinden min/medyan/p95/p99/stddev üretir
+# Produces min/median/p95/p99/stddev from duration samples
+def summarize_latencies(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        # Doğrusal interpolasyon / linear interpolation
+        position = (len(ordered) - 1) * p / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": statistics.fmean(ordered),
+        "median": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0
+    }
+
+
+# Soğuk cache: sadece geliştirme sunucularında! (sysadmin yetkisi gerekir)
+# Cold cache: development instances only! (requires sysadmin)
+COLD_CACHE_SQL = "CHECKPOINT; DBCC DROPCLEANBUFFERS WITH NO_INFOMSGS;"
+
+
+# Sorguyu warmup + runs kez çalıştırır, sunucu ve istemci sürelerinin dağılımını döndürür.
+# Runs the query warmup + runs times and returns the server and client time distributions.
+@timed("benchmark_query")
+def benchmark_query(connection, query, runs=5, warmup=1, cold_cache=False):
+    with borrowed_connection(connection) as conn:
+        server_ms = []
+        client_ms = []
+        row_count = None
+
+        for i in range(warmup + runs):
+            if cold_cache:
+                cursor = conn.cursor()
+                cursor.execute(COLD_CACHE_SQL)
+                while cursor.nextset():
+                    pass
+
+            started = time.perf_counter()
+            perf = _measure_query_duration(conn, query)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if perf["status"] != "success":
+                perf["failed_run"] = i + 1
+                return perf
+            if i < warmup:
+                continue
+
+            server_ms.append(perf["duration_us"] / 1000 if "duration_us" in perf else float(perf["duration_ms"]))
+            client_ms.append(elapsed_ms)
+            row_count = perf["row_count"]
+
+    server_stats = summarize_latencies(server_ms)
+    return {
+        "status": "success",
+        # Eski alanlarla uyum: duration_ms = sunucu medyanı
+        # Compatible with the old fields: duration_ms = server median
+        "duration_ms": round(server_stats["median"], 3),
+        "row_count": row_count,
+        "runs": runs,
+        "warmup": warmup,
+        "cold_cache": cold_cache,
+        "server_ms": server_stats,
+        "client_ms": summarize_latencies(client_ms),
+        "samples_ms": server_ms
+    }
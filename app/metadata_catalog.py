@@ -0,0 +1,273 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import array
+import sys
+from collections.abc import Mapping
+
+from metadata_store import LIST_SEPARATOR, encode_indexes, decode_indexes
+
+# resolve() sonuç durumları
+# resolve() result statuses
+FOUND = "found"
+AMBIGUOUS = "ambiguous"
+MISSING = "missing"
+
+
+# Sayfa tahmini: 8 KB sayfada ~8060 bayt veri, kolon başına ortalama bayt
+# Page estimate: ~8060 data bytes per 8 KB page, average bytes per column
+PAGE_BYTES = 8060
+AVG_COLUMN_BYTES = 16
+
+
+# record() çıktısından tablonun yaklaşık sayfa sayısı (tam tarama maliyeti)
+# Approximate page count of a table from a record() result (cost of a full scan)
+def estimated_pages(meta):
+    return max(1, int(meta["row_count"] * max(meta["column_count"], 1) * AVG_COLUMN_BYTES / PAGE_BYTES))
+
+
+def _add_to_index(index, key, row):
+    # Tekil ad -> int, birden fazla eşleşme -> list (belirsizlik O(1) ile anlaşılır)
+    # Unique name -> int, several matches -> list (ambiguity is detected in O(1))
+    current = index.get(key)
+    if current is None:
+        index[key] = row
+    elif isinstance(current, list):
+        current.append(row)
+    else:
+        index[key] = [current, row]
+
+
+# Tüm modüllerin paylaştığı, kolon bazlı (array) metadata kataloğu.
+# Column-based (array backed) metadata catalog shared by all analyzers.
+# Anahtarlar: db.schema.table, schema.table ve table için önceden kurulmuş indeksler.
+# Lookups use precomputed indexes on db.schema.table, schema.table and table.
+class MetadataCatalog(Mapping):
+    __slots__ = (
+        "databases", "schemas", "tables", "row_counts", "column_counts",
+        "has_index", "index_columns", "indexes", "_by_full", "_by_schema_name", "_by_name"
+    )
+
+    def __init__(self):
+        self.databases = []
+        self.schemas = []
+        self.tables = []
+        self.row_counts = array.array("q")
+        self.column_counts = array.array("q")
+        self.has_index = bytearray()
+        self.index_columns = []
+        self.indexes = []
+        self._by_full = {}
+        self._by_schema_name = {}
+        self._by_name = {}
+
+    # ------------------------------------------------------------------
+    # Oluşturma / construction
+    # ------------------------------------------------------------------
+
+    def add(self, database, schema, table, row_count, column_count, has_index, index_columns="", indexes=""):
+        database = sys.intern((database or "").strip().lower())
+        schema = sys.intern((schema or "").strip().lower())
+        table = (table or "").strip().lower()
+        full_key = self._full_key(database, schema, table)
+        if full_key in self._by_full:
+            # Aynı tablo tekrar geldiyse son değer geçerli
+            # If the same table comes again, the last value wins
+            row = self._by_full[full_key]
+            self.row_counts[row] = int(row_count or 0)
+            self.column_counts[row] = int(column_count or 0)
+            self.has_index[row] = 1 if has_index else 0
+            self.index_columns[row] = index_columns
+            self.indexes[row] = indexes
+            return row
+
+        row = len(self.tables)
+        self.databases.append(database)
+        self.schemas.append(schema)
+        self.tables.append(table)
+        self.row_counts.append(int(row_count or 0))
+        self.column_counts.append(int(column_count or 0))
+        self.has_index.append(1 if has_index else 0)
+        # index_columns LIST_SEPARATOR ile birleşik metin olarak tutulur
+        # index_columns are kept as LIST_SEPARATOR-joined text
+        self.index_columns.append(index_columns)
+        # index tanımları metadata_store.encode_indexes metni olarak tutulur
+        # index definitions are kept as metadata_store.encode_indexes text
+        self.indexes.append(indexes)
+
+        self._by_full[full_key] = row
+        if schema:
+            _add_to_index(self._by_schema_name, f"{schema}.{table}", row)
+        _add_to_index(self._by_name, table, row)
+        return row
+
+    @classmethod
+    def from_items(cls, items):
+        catalog = cls()
+        for item in items:
+            index_columns = item.get("index_columns") or []
+            if not isinstance(index_columns, str):
+                index_columns = LIST_SEPARATOR.join(index_columns)
+            catalog.add(
+                item.get("database"), item.get("schema"), item.get("table"),
+                item.get("row_count"), item.get("column_count"), item.get("has_index"),
+                index_columns, encode_indexes(item.get("indexes"))
+            )
+        return catalog
+
+    # metadata_store kolonlarından toplu kurulum (satır başına add() çağrısı yok)
+    # Bulk construction from metadata_store columns (no add() call per row)
+    @classmethod
+    def from_columns(cls, columns):
+        catalog = cls()
+        intern = sys.intern
+        catalog.databases = [intern(database) for database in columns["database"]]
+        catalog.schemas = [intern(schema) for schema in columns["schema"]]
+        catalog.tables = list(columns["table"])
+        catalog.row_counts = array.array("q", columns["row_count"])
+        catalog.column_counts = array.array("q", columns["column_count"])
+        catalog.has_index = bytearray(columns["has_index"])
+        catalog.index_columns = list(columns["index_columns"])
+        catalog.indexes = list(columns.get("indexes") or [""] * len(catalog.tables))
+
+        by_full = catalog._by_full
+        by_schema_name = catalog._by_schema_name
+        by_name = catalog._by_name
+        full_key = cls._full_key
+        for row, (database, schema, table) in enumerate(zip(catalog.databases, catalog.schemas, catalog.tables)):
+            by_full[full_key(database, schema, table)] = row
+            if schema:
+                _add_to_index(by_schema_name, f"{schema}.{table}", row)
+            _add_to_index(by_name, table, row)
+        return catalog
+
+    # Eski dict formatları: db.schema.table veya schema.table (Excel) anahtarlı
+    # Legacy dict formats keyed by db.schema.table or schema.table (Excel)
+    @classmethod
+    def from_dict(cls, metadata_dict):
+        items = []
+        for key, value in metadata_dict.items():
+            item = dict(value)
+            if not item.get("table"):
+                parts = key.strip().lower().split(".")
+                item["table"] = parts[-1]
+                item["schema"] = parts[-2] if len(parts) > 1 else ""
+                item["database"] = parts[-3] if len(parts) > 2 else ""
+            items.append(item)
+        return cls.from_items(items)
+
+    # ------------------------------------------------------------------
+    # Çözümleme / resolution
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _full_key(database, schema, table):
+        return ".".join(part for part in (database, schema, table) if part)
+
+    def key_of(self, row):
+        return self._full_key(self.databases[row], self.schemas[row], self.tables[row])
+
+    def _lookup(self, index, key):
+        match = index.get(key)
+        if match is None:
+            return MISSING, []
+        if isinstance(match, list):
+            return AMBIGUOUS, match
+        return FOUND, [match]
+
+    # Sorgudaki tablo adını (1, 2 veya 3 parçalı) kataloğa çözümler.
+    # Resolves a table name from the query (1, 2 or 3 part) against the catalog.
+    # Dönüş / returns: (status, key, rows) -> status FOUND / AMBIGUOUS / MISSING
+    def resolve(self, table_name, default_db=None):
+        parts = [part.strip() for part in table_name.strip().lower().replace("[", "").replace("]", "").split(".")]
+
+        if len(parts) >= 3:
+            # sunucu.db.şema.tablo gibi 4 parçalı adlar için son üç parça
+            # For 4-part names (server.db.schema.table) use the last three parts
+            database, schema, name = parts[-3:]
+            # db..tablo -> varsayılan şema belirtilmemiş
+            # db..table -> no schema given
+            status, rows = self._lookup(self._by_full, self._full_key(database, schema or "dbo", name))
+            key = f"{database}.{schema or 'dbo'}.{name}"
+        elif len(parts) == 2:
+            schema, name = parts
+            key = f"{default_db}.{schema}.{name}" if default_db else f"{schema}.{name}"
+            status, rows = (MISSING, [])
+            if default_db:
+                status, rows = self._lookup(self._by_full, key)
+            if status == MISSING:
+                status, rows = self._lookup(self._by_schema_name, f"{schema}.{name}")
+        else:
+            key = parts[0]
+            status, rows = self._lookup(self._by_name, key)
+
+        if status == FOUND:
+            key = self.key_of(rows[0])
+        return status, key, rows
+
+    # Tekil satırı döndürür; belirsiz adda varsayılan veritabanındaki eşleşme tercih edilir
+    # Returns the single row; for an ambiguous name the match in the default database wins
+    def resolve_row(self, table_name, default_db=None):
+        status, _, rows = self.resolve(table_name, default_db)
+        if status == AMBIGUOUS and default_db:
+            rows = [row for row in rows if self.databases[row] == default_db]
+            status = FOUND if len(rows) == 1 else AMBIGUOUS
+        return rows[0] if status == FOUND else None
+
+    def record(self, row):
+        index_columns = self.index_columns[row]
+        return {
+            "database": self.databases[row],
+            "schema": self.schemas[row],
+            "table": self.tables[row],
+            "row_count": self.row_counts[row],
+            "column_count": self.column_counts[row],
+            "has_index": bool(self.has_index[row]),
+            "index_columns": index_columns.split(LIST_SEPARATOR) if index_columns else [],
+            "indexes": decode_indexes(self.indexes[row])
+        }
+
+    # ------------------------------------------------------------------
+    # Mapping arayüzü (eski dict kullanımıyla uyumluluk)
+    # Mapping interface (compatibility with the old dict usage)
+    # ------------------------------------------------------------------
+
+    def _row_for_key(self, key):
+        # Yineleme anahtarları (key_of) önce birebir aranır: veritabanı/şema boş olan satırların
+        # kısa anahtarı ad çözümlemesinde başka veritabanlarıyla belirsiz olabilir
+        # Iteration keys (key_of) are matched exactly first: the short key of a row without a
+        # database/schema can be ambiguous with other databases under name resolution
+        row = self._by_full.get(key)
+        if row is not None:
+            return row
+        status, _, rows = self.resolve(key)
+        return rows[0] if status == FOUND else None
+
+    def __getitem__(self, key):
+        row = self._row_for_key(key)
+        if row is None:
+            raise KeyError(key)
+        return self.record(row)
+
+    def __contains__(self, key):
+        return self._row_for_key(key) is not None
+
+    def __iter__(self):
+        return (self.key_of(row) for row in range(len(self.tables)))
+
+    def __len__(self):
+        return len(self.tables)
+
+
+# dict veya katalog alır, her zaman katalog döndürür
+# Accepts a dict or a catalog and always returns a catalog
+def as_catalog(metadata):
+    if isinstance(metadata, MetadataCatalog):
+        return metadata
+    return MetadataCatalog.from_dict(metadata or {})
@@ -0,0 +1,94 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from table_info import get_table_info
+from connection_pool import ConnectionPool, borrowed_connection
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def _harvest_database(conn):
+    meta, _ = get_table_info(conn, export_excel=False)
+    return meta
+
+
+def _collect_database(connect, db_name, harvest):
+    started = time.perf_counter()
+    target = connect(db_name)
+    if target is None:
+        raise ConnectionError(f"Connection failed for {db_name}.")
+    # Havuzdan gelen bağlantı geri verilir, düz bağlantı kapatılır
+    # Pooled connections are returned, plain connections are closed
+    with borrowed_connection(target) as conn:
+        try:
+            meta = harvest(conn)
+        finally:
+            if not isinstance(target, ConnectionPool):
+                conn.close()
+    return meta, time.perf_counter() - started
+
+
+# Veritabanlarını paralel olarak tarar, her biri bittiğinde sonucu döndürür (generator).
+# Scans the databases in parallel and yields each result as soon as it finishes (generator).
+# connect: db adı alıp bağlantı, havuz veya None döndüren fonksiyon / callable taking a db name, returning a connection, a pool or None
+# harvest: bağlantı alıp metadata listesi döndüren fonksiyon / callable taking a connection, returning the metadata list
+def collect_metadata_parallel(connect, db_names, max_workers=DEFAULT_MAX_WORKERS, harvest=None):
+    if not db_names:
+        return
+    if harvest is None:
+        harvest = _harvest_database
+
+    # pyodbc I/O sırasında GIL'i bırakır, bu yüzden thread yeterli
+    # pyodbc releases the GIL during I/O, so threads are enough
+    workers = max(1, min(int(max_workers), len(db_names)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata") as executor:
+        futures = {executor.submit(_collect_database, connect, db, harvest): db for db in db_names}
+        try:
+            for future in as_completed(futures):
+                db_name = futures[future]
+                try:
+                    meta, elapsed = future.result()
+                    yield {
+                        "database": db_name,
+                        "status": "success",
+                        "metadata": meta,
+                        "elapsed_s": elapsed
+                    }
+                except Exception as e:
+                    yield {
+                        "database": db_name,
+                        "status": "error",
+                        "error": str(e),
+                        "metadata": []
+                    }
+        finally:
+            # Tüketici erken bırakırsa (ör. iptal) henüz başlamamış veritabanları çalıştırılmaz
+            # When the consumer stops early (e.g. cancellation) databases that have not started are skipped
+            for future in futures:
+                future.cancel()
+
+
+# Tüm sonuçları birleştirir; hatalı veritabanları ayrıca listelenir (kısmi sonuç).
+# Merges all results; failed databases are listed separately (partial results).
+def collect_metadata(connect, db_names, max_workers=DEFAULT_MAX_WORKERS, on_progress=None, harvest=None):
+    all_metadata = []
+    errors = {}
+    done = 0
+    for item in collect_metadata_parallel(connect, db_names, max_workers, harvest):
+        done += 1
+        if item["status"] == "success":
+            all_metadata.extend(item["metadata"])
+        else:
+            errors[item["database"]] = item["error"]
+        if on_progress:
+            on_progress(done, len(db_names), item)
+    return all_metadata, errors
@@ -0,0 +1,309 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import array
+import os
+import sqlite3
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+
+import pandas as pd
+
+# Metadata'nın varsayılan disk formatı: tek dosyalık SQLite veritabanı.
+# Default on-disk metadata format: a single-file SQLite database.
+STORE_EXTENSIONS = (".sqlite", ".db")
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+# index_columns listesi tek bir TEXT alanında bu ayraçla saklanır
+# index_columns lists are stored in one TEXT field joined by this separator
+LIST_SEPARATOR = "\x1e"
+
+# indexes alanı: indexler INDEX_SEPARATOR, index alanları INDEX_FIELD_SEPARATOR ile ayrılır,
+# kolon listeleri yine LIST_SEPARATOR ile birleştirilir
+# indexes field: indexes are split by INDEX_SEPARATOR, index fields by INDEX_FIELD_SEPARATOR,
+# column lists are again joined by LIST_SEPARATOR
+INDEX_SEPARATOR = "\x1d"
+INDEX_FIELD_SEPARATOR = "\x1c"
+
+# Kolon bazlı bloblarda satırlar bu ayraçla birleştirilir
+# Rows are joined by this separator inside the columnar blobs
+ROW_SEPARATOR = "\x1f"
+
+# 2: indexes kolonu eklendi; 1 sürümlü dosyalar indexes olmadan okunur
+# 2: adds the indexes column; version 1 files are read without indexes
+STORE_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+TEXT_COLUMNS = ("database", "schema", "table", "index_columns", "indexes")
+INTEGER_COLUMNS = ("row_count", "column_count")
+
+# Lazy erişimde kullanılan memory-map boyutu
+# Memory-map size used for lazy access
+MMAP_SIZE = 256 * 1024 * 1024
+
+SELECT_COLUMNS = "database, schema, table_name, row_count, column_count, has_index, index_columns, indexes"
+
+
+def metadata_key(database, schema, table):
+    return f"{database.lower()}.{schema.lower()}.{table.lower()}"
+
+
+# harvest_table_metadata index tanımlarını tek metin alanına çevirir (ve geri)
+# Converts harvest_table_metadata index definitions into one text field (and back)
+def encode_indexes(indexes):
+    if not indexes:
+        return ""
+    if isinstance(indexes, str):
+        return indexes
+    return INDEX_SEPARATOR.join(
+        INDEX_FIELD_SEPARATOR.join((
+            index_def["name"] or "",
+            index_def.get("type") or "",
+            ("p" if index_def.get("is_primary_key") else "") + ("u" if index_def.get("is_unique") else ""),
+            LIST_SEPARATOR.join(column.lower() for column in index_def.get("key_columns") or []),
+            LIST_SEPARATOR.join(column.lower() for column in index_def.get("included_columns") or [])
+        ))
+        for index_def in indexes
+    )
+
+
+def decode_indexes(text):
+    indexes = []
+    if not text:
+        return indexes
+    for encoded in text.split(INDEX_SEPARATOR):
+        name, type_desc, flags, key_columns, included_columns = encoded.split(INDEX_FIELD_SEPARATOR)
+        indexes.append({
+            "name": name,
+            "type": type_desc,
+            "is_primary_key": "p" in flags,
+            "is_unique": "u" in flags,
+            "key_columns": key_columns.split(LIST_SEPARATOR) if key_columns else [],
+            "included_columns": included_columns.split(LIST_SEPARATOR) if included_columns else []
+        })
+    return indexes
+
+
+def _row_to_item(row):
+    database, schema, table, row_count, column_count, has_index, index_columns = row[:7]
+    return {
+        "database": database,
+        "schema": schema,
+        "table": table,
+        "row_count": row_count,
+        "column_count": column_count,
+        "has_index": bool(has_index),
+        "index_columns": index_columns.split(LIST_SEPARATOR) if index_columns else [],
+        "indexes": decode_indexes(row[7] if len(row) > 7 else "")
+    }
+
+
+def is_store_path(path):
+    return str(path).lower().endswith(STORE_EXTENSIONS)
+
+
+def default_store_path(export_version="merged"):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    return f"table_info_output_{timestamp}_{export_version}.sqlite"
+
+
+def _split_text(blob, count):
+    if count == 0:
+        return []
+    return blob.decode("utf-8").split(ROW_SEPARATOR)
+
+
+# get_table_info çıktısını (result_list) SQLite dosyasına yazar.
+# Writes the get_table_info output (result_list) into a SQLite file.
+# Satır tablosu lazy erişim için, kolon blobları hızlı toplu yükleme içindir.
+# The row table serves lazy lookups, the column blobs serve fast bulk loads.
+def save_metadata_store(result_list, path):
+    rows = [
+        (
+            metadata_key(item["database"], item["schema"], item["table"]),
+            item["database"].lower(),
+            item["schema"].lower(),
+            item["table"].lower(),
+            int(item["row_count"] or 0),
+            int(item["column_count"] or 0),
+            1 if item["has_index"] else 0,
+            LIST_SEPARATOR.join(item.get("index_columns") or []),
+            encode_indexes(item.get("indexes"))
+        )
+        for item in result_list
+    ]
+
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TABLE store_info (name TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE metadata_columns (name TEXT PRIMARY KEY, data BLOB)")
+        conn.execute("""
+            CREATE TABLE metadata (
+                key TEXT PRIMARY KEY,
+                database TEXT NOT NULL,
+                schema TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                row_count INTEGER,
+                column_count INTEGER,
+                has_index INTEGER,
+                index_columns TEXT,
+                indexes TEXT
+            ) WITHOUT ROWID
+        """)
+        conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        # Aynı anahtar birden fazla geldiyse kolonlar da tekil olmalı
+        # Columns must be unique by key as well, in case a key came more than once
+        unique_rows = list({row[0]: row for row in rows}.values())
+        columns = {
+            "database": ROW_SEPARATOR.join(row[1] for row in unique_rows).encode("utf-8"),
+            "schema": ROW_SEPARATOR.join(row[2] for row in unique_rows).encode("utf-8"),
+            "table": ROW_SEPARATOR.join(row[3] for row in unique_rows).encode("utf-8"),
+            "index_columns": ROW_SEPARATOR.join(row[7] for row in unique_rows).encode("utf-8"),
+            "indexes": ROW_SEPARATOR.join(row[8] for row in unique_rows).encode("utf-8"),
+            "row_count": array.array("q", (row[4] for row in unique_rows)).tobytes(),
+            "column_count": array.array("q", (row[5] for row in unique_rows)).tobytes(),
+            "has_index": bytes(row[6] for row in unique_rows)
+        }
+        conn.executemany("INSERT INTO metadata_columns VALUES (?, ?)", columns.items())
+        conn.executemany("INSERT INTO store_info VALUES (?, ?)", [
+            ("format_version", str(STORE_FORMAT_VERSION)),
+            ("row_count", str(len(unique_rows))),
+            ("byteorder", sys.byteorder),
+            ("created_at", datetime.now().isoformat(timespec="seconds"))
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return path
+
+
+# Kolon bloblarını tek seferde okur; dict üretmeden kolon listeleri/dizileri döner.
+# Reads the column blobs in one go and returns column lists/arrays without building dicts.
+def load_metadata_columns(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        info = dict(conn.execute("SELECT name, value FROM store_info").fetchall())
+        blobs = dict(conn.execute("SELECT name, data FROM metadata_columns").fetchall())
+    finally:
+        conn.close()
+
+    if int(info.get("format_version", 0)) not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported metadata store format: {info.get('format_version')}")
+
+    count = int(info["row_count"])
+    # Eski dosyalarda indexes blobu yoktur / old files have no indexes blob
+    columns = {
+        name: _split_text(blobs[name], count) if name in blobs else [""] * count
+        for name in TEXT_COLUMNS
+    }
+    for name in INTEGER_COLUMNS:
+        values = array.array("q")
+        values.frombytes(blobs[name])
+        if info.get("byteorder", sys.byteorder) != sys.byteorder:
+            values.byteswap()
+        columns[name] = values
+    columns["has_index"] = blobs["has_index"]
+    columns["count"] = count
+    return columns
+
+
+# Tüm dosyayı okur: {db.schema.table: dict}
+# Reads the whole file: {db.schema.table: dict}
+def load_metadata_store(path):
+    columns = load_metadata_columns(path)
+    return {
+        metadata_key(database, schema, table): {
+            "database": database,
+            "schema": schema,
+            "table": table,
+            "row_count": row_count,
+            "column_count": column_count,
+            "has_index": bool(has_index),
+            "index_columns": index_columns.split(LIST_SEPARATOR) if index_columns else [],
+            "indexes": decode_indexes(indexes)
+        }
+        for database, schema, table, row_count, column_count, has_index, index_columns, indexes in zip(
+            columns["database"], columns["schema"], columns["table"], columns["row_count"],
+            columns["column_count"], columns["has_index"], columns["index_columns"], columns["indexes"]
+        )
+    }
+
+
+# Tembel (lazy) erişim: satırlar sadece istendiğinde okunur, dosya memory-map ile açılır.
+# Lazy access: rows are read only on demand and the file is memory-mapped.
+class LazyMetadataStore(Mapping):
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self._len = None
+        # 1 sürümlü dosyalarda indexes kolonu yoktur
+        # Version 1 files have no indexes column
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(metadata)")}
+        self._select = SELECT_COLUMNS if "indexes" in columns else SELECT_COLUMNS.rsplit(",", 1)[0]
+
+    def __getitem__(self, key):
+        row = self._conn.execute(
+            f"SELECT {self._select} FROM metadata WHERE key = ?", (key.strip().lower(),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return _row_to_item(row)
+
+    def __iter__(self):
+        for (key,) in self._conn.execute("SELECT key FROM metadata"):
+            yield key
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        return self._len
+
+    def close(self):
+        self._conn.close()
+
+
+# Excel artık sadece açıkça istenen bir dışa aktarma seçeneği
+# Excel is now only an explicit export option
+def export_metadata_excel(result_list, path):
+    pd.DataFrame(list(result_list)).to_excel(path, index=False)
+    return path
+
+
+# get_table_info formatındaki Excel dosyasını vektörel olarak okur (iterrows yok)
+# Reads a get_table_info-format Excel file in a vectorized way (no iterrows)
+def load_metadata_excel(path_or_buffer):
+    df = pd.read_excel(path_or_buffer)
+    keys = (
+        df["database"].astype(str).str.lower() + "."
+        + df["schema"].astype(str).str.lower() + "."
+        + df["table"].astype(str).str.lower()
+    )
+    records = df.to_dict("records")
+    for record in records:
+        record["has_index"] = bool(record.get("has_index"))
+        # Excel'de index tanımları düz metne dönüşür, geri okunmaz
+        # Index definitions turn into plain text in Excel and are not read back
+        record.pop("indexes", None)
+    return dict(zip(keys, records))
+
+
+def load_metadata_file(path, lazy=False):
+    if is_store_path(path):
+        return LazyMetadataStore(path) if lazy else load_metadata_store(path)
+    return load_metadata_excel(path)
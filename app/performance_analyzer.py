@@ -8,65 +8,223 @@ Description:
     Created using Python 3.x and Streamlit.
 """
 
-import re
+import time
 
-def run_query_with_statistics(connection, query):
+from connection_pool import borrowed_connection
+from instrumentation import timed
+from statistics_parser import parse_statistics_messages, evaluate_statistics
+
+# Sonuç kümeleri bu boyutta parçalar halinde okunur; bellek kullanımı sonuç boyutundan bağımsızdır
+# Result sets are read in batches of this size; memory use does not depend on the result size
+FETCH_BATCH_SIZE = 5000
+
+# drain modları: "fetch" satırları parça parça çeker ve sayar, "discard" okumadan sonraki kümeye geçer
+# drain modes: "fetch" pulls and counts rows batch by batch, "discard" skips to the next set without reading
+DRAIN_MODES = ("fetch", "discard")
+
+
+def _estimate_row_bytes(row):
+    # Kaba tahmin: NVARCHAR karakter başına 2 bayt, sayısal/tarih tipleri 8 bayt
+    # Rough estimate: NVARCHAR 2 bytes per character, numeric/date types 8 bytes
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, str):
+            size += 2 * len(value)
+        elif isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+
+# Cursor'daki tüm sonuç kümelerini sabit bellekle tüketir.
+# Consumes every result set on the cursor with constant memory.
+# max_rows / max_bytes aşılırsa sorgu iptal edilir ve truncated=True döner
+# If max_rows / max_bytes is exceeded the query is cancelled and truncated=True is returned
+def drain_result_sets(cursor, mode="fetch", batch_size=FETCH_BATCH_SIZE, max_rows=None, max_bytes=None):
+    if mode not in DRAIN_MODES:
+        raise ValueError(f"Unknown drain mode: {mode}")
+
+    result_sets = []
+    messages = []
+    plans = []
+    affected_rows = 0
+    total_rows = total_bytes = 0
+    truncated = False
+
+    while True:
+        # Mesajlar her kümeden sonra sıfırlanır, bu yüzden nextset'ten önce toplanır
+        # Messages are reset per result set, so they are collected before nextset
+        messages.extend(_cursor_messages(cursor))
+        if cursor.description is None:
+            # DML: etkilenen satır sayısı
+            # DML: affected row count
+            if cursor.rowcount is not None and cursor.rowcount > 0:
+                affected_rows += cursor.rowcount
+        elif _is_plan_result_set(cursor):
+            plans.append("".join(row[0] for row in cursor.fetchall()))
+        else:
+            stats = {"columns": [col[0] for col in cursor.description], "rows": None, "bytes": None}
+            if mode == "fetch":
+                stats["rows"] = stats["bytes"] = 0
+                while True:
+                    size = batch_size if max_rows is None else min(batch_size, max(1, max_rows - total_rows))
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    batch_bytes = sum(_estimate_row_bytes(row) for row in rows)
+                    stats["rows"] += len(rows)
+                    stats["bytes"] += batch_bytes
+                    total_rows += len(rows)
+                    total_bytes += batch_bytes
+                    if (max_rows is not None and total_rows >= max_rows) or \
+                            (max_bytes is not None and total_bytes >= max_bytes):
+                        truncated = True
+                        break
+            result_sets.append(stats)
+            if truncated:
+                # Kalan satırların aktarımı sunucuda durdurulur
+                # Transfer of the remaining rows is stopped on the server
+                messages.extend(_cursor_messages(cursor))
+                cursor.cancel()
+                break
+        if not cursor.nextset():
+            messages.extend(_cursor_messages(cursor))
+            break
+
+    return {
+        "result_sets": result_sets,
+        "row_count": total_rows + affected_rows,
+        "bytes": total_bytes,
+        "truncated": truncated,
+        "messages": messages,
+        "plans": plans
+    }
+
+
+@timed("run_query_with_statistics")
+def run_query_with_statistics(connection, query, max_rows=None, max_bytes=None, mode="fetch"):
+    # connection bir ConnectionPool da olabilir
+    # connection may also be a ConnectionPool
+    with borrowed_connection(connection) as conn:
+        return _run_query_with_statistics(conn, query, max_rows, max_bytes, mode)
+
+
+def _run_query_with_statistics(connection, query, max_rows=None, max_bytes=None, mode="fetch"):
     cursor = connection.cursor()
 
-    # Clear messages (from cursor)
-    # Mesajları temizle (cursor'dan)
-    cursor.messages.clear()
-    
-    
     # Enable STATISTICS commands
     # STATISTICS komutlarını aktif et
     cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON;")
 
     try:
         cursor.execute(query)
-        try:
-            _ = cursor.fetchall()
-        except:
-            pass  # SELECT değilse sorun çıkarmaz
-                  # SELECT does not cause problems
+        # Sonuçlar fetchall ile belleğe alınmaz, parça parça tüketilir
+        # Results are not materialised with fetchall; they are consumed in batches
+        drained = drain_result_sets(cursor, mode=mode, max_rows=max_rows, max_bytes=max_bytes)
     except Exception as e:
         return [f" Query could not be executed: {e}"]
+    finally:
+        # Havuzdaki bağlantıda STATISTICS açık kalmamalı; bağlantı koptuysa hata asıl sonucu gizlememeli
+        # STATISTICS must not stay on for a pooled connection; on a dead connection the error must not mask the result
+        try:
+            cursor.execute("SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
+        except Exception:
+            pass
+
+    # Performans mesajları, SET OFF çalışmadan önce toplanmış olanlardır
+    # The performance messages are those collected before SET OFF ran
+    return drained["messages"]
+
+
+# STATISTICS XML ile dönen gerçek planın kolon adı
+# Column name of the actual plan returned by STATISTICS XML
+SHOWPLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+
+def _cursor_messages(cursor):
+    return [msg[1] for msg in cursor.messages if isinstance(msg[1], str)]
+
+
+def _is_plan_result_set(cursor):
+    return len(cursor.description) == 1 and cursor.description[0][0] == SHOWPLAN_COLUMN
+
+
+def _summarize_statistics(parsed):
+    totals = parsed["totals"]
+    # Derleme süresi de ölçülen süreye dahildir (önceki davranış)
+    # Compile time is part of the measured time as before
+    return {
+        "cpu_ms": totals["cpu_ms"] + totals["parse_cpu_ms"],
+        "elapsed_ms": totals["elapsed_ms"] + totals["parse_elapsed_ms"],
+        "logical_reads": totals["logical_reads"],
+        "physical_reads": totals["physical_reads"] + totals["read_ahead_reads"],
+        "compile_ms": totals["parse_elapsed_ms"]
+    }
+
+
+# Sorguyu tek sefer çalıştırır: süre, satır sayısı, IO/TIME istatistikleri ve gerçek plan birlikte döner.
+# Runs the query exactly once: duration, row count, IO/TIME statistics and the actual plan come back together.
+@timed("single_execution")
+def run_query_single_execution(connection, query, max_rows=None, max_bytes=None):
+    # connection bir ConnectionPool da olabilir
+    # connection may also be a ConnectionPool
+    with borrowed_connection(connection) as conn:
+        return _run_query_single_execution(conn, query, max_rows, max_bytes)
+
+
+def _run_query_single_execution(connection, query, max_rows=None, max_bytes=None):
+    cursor = connection.cursor()
+    cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON; SET STATISTICS XML ON;")
+
+    started = time.perf_counter()
+    try:
+        cursor.execute(query)
+        drained = drain_result_sets(cursor, max_rows=max_rows, max_bytes=max_bytes)
+        client_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        return {"status": "error", "error": str(e), "statistics": _cursor_messages(cursor)}
+    finally:
+        # Kopmuş bağlantıda sıfırlama hatası asıl sonucu gizlememeli
+        # On a dead connection a failed reset must not mask the result
+        try:
+            cursor.execute("SET STATISTICS IO OFF; SET STATISTICS TIME OFF; SET STATISTICS XML OFF;")
+        except Exception:
+            pass
+
+    messages = drained["messages"]
+    plans = drained["plans"]
+    parsed = parse_statistics_messages(messages)
+    summary = _summarize_statistics(parsed)
+    return {
+        "status": "success",
+        # Sunucu süresi yoksa istemci süresi kullanılır
+        # Falls back to the client-side time when there is no server time
+        "duration_ms": summary["elapsed_ms"] if summary["elapsed_ms"] else int(round(client_ms)),
+        "client_ms": client_ms,
+        "row_count": drained["row_count"],
+        "result_bytes": drained["bytes"],
+        "result_sets": drained["result_sets"],
+        "truncated": drained["truncated"],
+        "cpu_ms": summary["cpu_ms"],
+        "logical_reads": summary["logical_reads"],
+        "physical_reads": summary["physical_reads"],
+        "compile_ms": summary["compile_ms"],
+        "statistics": messages,
+        "statistics_parsed": parsed,
+        "plans": plans,
+        "plan_xml": plans[-1] if plans else None
+    }
+
 
-    # STATISTICS kapat
-    # close STATISTICS 
-
-    cursor.execute("SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
-
-    # Performans mesajlarını alır
-    # Receives performance messages
-    stats_output = [msg[1] for msg in cursor.messages if isinstance(msg[1], str)]
-
-    return stats_output
-
-
-def interpret_statistics_output(stats_output):
-    results = []
-
-    for line in stats_output:
-        # Logical read yorumlama
-        # Logical read interpretation
-        if "logical reads" in line:
-            table = re.search(r"Table '(\w+)'", line)
-            reads = re.search(r"logical reads (\d+)", line)
-            if table and reads:
-                table_name = table.group(1)
-                read_count = int(reads.group(1))
-                if read_count > 1000:
-                    results.append(f" {table_name} high logical read in table: {read_count}")
-        
-        # CPU süresi yorumlama
-        # CPU time interpretation
-        if "CPU time" in line:
-            cpu_match = re.search(r"CPU time = (\d+)", line)
-            if cpu_match:
-                cpu_time = int(cpu_match.group(1))
-                if cpu_time > 500:
-                    results.append(f" High CPU time: {cpu_time} ms")
+# Ham mesajları veya parse_statistics_messages çıktısını okunabilir önerilere çevirir.
+# Turns raw messages or parse_statistics_messages output into readable recommendations.
+# metadata verilirse okuma eşikleri tablo boyutuna göre belirlenir
+# When metadata is given, read thresholds are relative to the table size
+def interpret_statistics_output(stats_output, metadata=None, default_db=None):
+    parsed = stats_output if isinstance(stats_output, dict) else parse_statistics_messages(stats_output)
+    results = [finding["message"] for finding in evaluate_statistics(parsed, metadata, default_db)]
 
     if not results:
         results.append(" Performance values are normal.")
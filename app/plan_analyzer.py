@@ -0,0 +1,360 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import codecs
+import hashlib
+import io
+import re
+import xml.etree.ElementTree as ET
+
+SHOWPLAN_NAMESPACE = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+
+# Tahmin / gerçek satır oranı bu değeri aşarsa uyarı verilir
+# A warning is raised when the estimated / actual row ratio exceeds this value
+ROW_ESTIMATE_SKEW = 10
+# Bu oranın altındaki tahminler gürültü sayılır
+# Estimates below this many rows are treated as noise
+ROW_ESTIMATE_MIN_ROWS = 1000
+
+SPILL_TAGS = ("SpillToTempDb", "SortSpillDetails", "HashSpillDetails", "ExchangeSpillDetails")
+
+_XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def _local(tag):
+    return tag[len(SHOWPLAN_NAMESPACE):] if tag.startswith(SHOWPLAN_NAMESPACE) else tag
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class PlanOperator:
+    # Binlerce operatör için küçük, __slots__ tabanlı düğüm
+    # Small __slots__ based node, plans can hold thousands of operators
+    __slots__ = (
+        "index", "statement", "node_id", "parent", "children", "physical_op", "logical_op",
+        "estimate_rows", "estimated_executions", "subtree_cost", "own_cost", "parallel",
+        "actual_rows", "actual_executions", "actual_elapsed_ms", "actual_cpu_ms", "actual_logical_reads",
+        "object", "warnings", "implicit_conversions"
+    )
+
+    def __init__(self, index, statement, attrib, parent):
+        self.index = index
+        self.statement = statement
+        self.node_id = attrib.get("NodeId")
+        self.parent = parent
+        self.children = []
+        self.physical_op = attrib.get("PhysicalOp", "Unknown")
+        self.logical_op = attrib.get("LogicalOp", "Unknown")
+        self.estimate_rows = _float(attrib.get("EstimateRows"))
+        self.estimated_executions = 1 + _float(attrib.get("EstimateRebinds")) + _float(attrib.get("EstimateRewinds"))
+        self.subtree_cost = _float(attrib.get("EstimatedTotalSubtreeCost"))
+        self.own_cost = self.subtree_cost
+        self.parallel = attrib.get("Parallel") in ("1", "true")
+        # Gerçek değerler yalnızca gerçek (actual) planlarda bulunur
+        # Actual values are only present in actual plans
+        self.actual_rows = None
+        self.actual_executions = None
+        self.actual_elapsed_ms = None
+        self.actual_cpu_ms = None
+        self.actual_logical_reads = None
+        self.object = None
+        self.warnings = []
+        self.implicit_conversions = 0
+
+    @property
+    def label(self):
+        if self.physical_op == self.logical_op:
+            return self.physical_op
+        return f"{self.physical_op} ({self.logical_op})"
+
+    def row_estimate_ratio(self):
+        # Tahmin yürütme başına, gerçek değer tüm yürütmelerin toplamıdır
+        # The estimate is per execution, the actual value is the total over all executions
+        if self.actual_rows is None:
+            return None
+        estimated = self.estimate_rows * max(self.actual_executions or 1, 1)
+        return (max(self.actual_rows, 1.0)) / max(estimated, 1.0)
+
+    def as_dict(self):
+        return {
+            "node": self.index,
+            "node_id": self.node_id,
+            "statement": self.statement,
+            "operator": self.label,
+            "object": self.object,
+            "subtree_cost": self.subtree_cost,
+            "own_cost": self.own_cost,
+            "estimate_rows": self.estimate_rows,
+            "actual_rows": self.actual_rows,
+            "actual_executions": self.actual_executions,
+            "actual_elapsed_ms": self.actual_elapsed_ms,
+            "actual_cpu_ms": self.actual_cpu_ms,
+            "warnings": list(self.warnings)
+        }
+
+
+class ParsedPlan:
+    __slots__ = ("operators", "roots", "statements", "missing_indexes", "warnings")
+
+    def __init__(self):
+        self.operators = []
+        self.roots = []
+        self.statements = []
+        self.missing_indexes = []
+        # Operatöre bağlanamayan (sorgu seviyesi) uyarılar
+        # Warnings that do not belong to an operator (statement level)
+        self.warnings = []
+
+    @property
+    def is_actual(self):
+        return any(op.actual_rows is not None for op in self.operators)
+
+    def total_cost(self):
+        return sum(stmt["subtree_cost"] for stmt in self.statements) or \
+            sum(self.operators[root].subtree_cost for root in self.roots)
+
+    # Planın şekil özeti: SQL Server'ın QueryPlanHash'leri, yoksa operatör ağacının hash'i
+    # Plan shape digest: SQL Server's QueryPlanHash values, otherwise a hash of the operator tree
+    def plan_hash(self):
+        hashes = [stmt["query_plan_hash"] for stmt in self.statements]
+        if hashes and all(hashes):
+            return ",".join(hashes)
+        digest = hashlib.blake2b(digest_size=8)
+        for op in self.operators:
+            digest.update(f"{op.parent}|{op.physical_op}|{op.logical_op}|{op.object}\n".encode("utf-8"))
+        return "0x" + digest.hexdigest().upper()
+
+
+def _open_source(source):
+    if hasattr(source, "read"):
+        return source
+    if isinstance(source, bytes):
+        # .sqlplan dosyaları BOM'lu UTF-16 olabilir ya da UTF-8 olup utf-16 bildirebilir: metne çevrilir
+        # .sqlplan files may be UTF-16 with a BOM, or UTF-8 while declaring utf-16: decode to text first
+        if source.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            source = source.decode("utf-16")
+        else:
+            source = source.decode("utf-8-sig")
+    # str XML: encoding bildirimi (utf-16) UTF-8'e çevrilen metinle çelişmesin
+    # str XML: drop the encoding declaration (utf-16) so it does not contradict the UTF-8 bytes
+    return io.BytesIO(_XML_DECLARATION_RE.sub("", source, count=1).encode("utf-8"))
+
+
+# Showplan XML'ini iterparse ile tek geçişte okur; element ağacı bellekte tutulmaz.
+# Reads showplan XML in one pass with iterparse; the element tree is not kept in memory.
+# source: XML metni, bytes veya dosya nesnesi / XML text, bytes or a file object
+def parse_showplan(source):
+    plan = ParsedPlan()
+    stack = []
+    statement = None
+    missing_group = None
+    missing_index = None
+    column_group = None
+    warnings_depth = 0
+
+    def add_warning(text):
+        if stack:
+            stack[-1].warnings.append(text)
+        else:
+            plan.warnings.append(text)
+
+    for event, elem in ET.iterparse(_open_source(source), events=("start", "end")):
+        tag = _local(elem.tag)
+        attrib = elem.attrib
+
+        if event == "start":
+            if tag == "RelOp":
+                parent = stack[-1] if stack else None
+                op = PlanOperator(len(plan.operators), len(plan.statements) - 1, attrib,
+                                  parent.index if parent else None)
+                plan.operators.append(op)
+                if parent:
+                    parent.children.append(op.index)
+                else:
+                    plan.roots.append(op.index)
+                stack.append(op)
+            elif tag == "StmtSimple" or tag == "StmtCursor":
+                statement = {
+                    "text": attrib.get("StatementText", ""),
+                    "type": attrib.get("StatementType"),
+                    "subtree_cost": _float(attrib.get("StatementSubTreeCost")),
+                    "estimate_rows": _float(attrib.get("StatementEstRows")),
+                    "query_hash": attrib.get("QueryHash"),
+                    "query_plan_hash": attrib.get("QueryPlanHash"),
+                    "optimization_level": attrib.get("StatementOptmLevel"),
+                    "early_abort": attrib.get("StatementOptmEarlyAbortReason"),
+                    "degree_of_parallelism": None,
+                    "memory_grant": None
+                }
+                plan.statements.append(statement)
+            elif tag == "QueryPlan" and statement is not None:
+                statement["degree_of_parallelism"] = attrib.get("DegreeOfParallelism")
+                statement["compile_ms"] = _float(attrib.get("CompileTime"))
+            elif tag == "MemoryGrantInfo":
+                if statement is not None:
+                    statement["memory_grant"] = {k: _float(v) for k, v in attrib.items()}
+            elif tag == "Warnings":
+                warnings_depth += 1
+            elif tag == "MissingIndexGroup":
+                missing_group = _float(attrib.get("Impact"))
+            elif tag == "MissingIndex":
+                missing_index = {
+                    "database": attrib.get("Database", "").strip("[]"),
+                    "schema": attrib.get("Schema", "").strip("[]"),
+                    "table": attrib.get("Table", "").strip("[]"),
+                    "impact": missing_group,
+                    "equality": [], "inequality": [], "include": []
+                }
+            elif tag == "ColumnGroup" and missing_index is not None:
+                column_group = attrib.get("Usage", "").lower()
+            continue
+
+        # --- end ---
+        if tag == "RelOp":
+            stack.pop()
+        elif tag == "RunTimeCountersPerThread" and stack:
+            op = stack[-1]
+            # Paralel planlarda her thread ayrı satırdır: satırlar toplanır, süre en büyüğüdür
+            # Parallel plans have one row per thread: rows are summed, time is the maximum
+            op.actual_rows = (op.actual_rows or 0) + _float(attrib.get("ActualRows"))
+            op.actual_executions = (op.actual_executions or 0) + _float(attrib.get("ActualExecutions"))
+            op.actual_logical_reads = (op.actual_logical_reads or 0) + _float(attrib.get("ActualLogicalReads"))
+            if "ActualElapsedms" in attrib:
+                op.actual_elapsed_ms = max(op.actual_elapsed_ms or 0, _float(attrib.get("ActualElapsedms")))
+                op.actual_cpu_ms = (op.actual_cpu_ms or 0) + _float(attrib.get("ActualCPUms"))
+        elif tag == "Object" and stack and stack[-1].object is None and missing_index is None:
+            parts = [attrib.get(k, "").strip("[]") for k in ("Schema", "Table")]
+            name = ".".join(p for p in parts if p)
+            if attrib.get("Index"):
+                name += "." + attrib["Index"].strip("[]")
+            stack[-1].object = name or None
+        elif tag == "Convert" and attrib.get("Implicit") == "1" and stack:
+            stack[-1].implicit_conversions += 1
+        elif tag == "Warnings":
+            warnings_depth -= 1
+        elif warnings_depth and tag in SPILL_TAGS:
+            level = attrib.get("SpillLevel")
+            add_warning(f"Spill to tempdb ({tag}{', level ' + level if level else ''})")
+        elif warnings_depth and tag == "PlanAffectingConvert":
+            add_warning(f"Implicit conversion affects {attrib.get('ConvertIssue', 'plan')}: "
+                        f"{attrib.get('Expression', '')}")
+        elif warnings_depth and tag == "NoJoinPredicate":
+            add_warning("No join predicate")
+        elif warnings_depth and tag == "ColumnsWithNoStatistics":
+            add_warning("Columns without statistics")
+        elif warnings_depth and tag == "MemoryGrantWarning":
+            add_warning(f"Memory grant warning: {attrib.get('GrantWarningKind', '')} "
+                        f"(requested {attrib.get('RequestedMemory')} KB, used {attrib.get('MaxUsedMemory')} KB)")
+        elif tag == "Column" and column_group is not None:
+            missing_index.setdefault(column_group, []).append(attrib.get("Name", "").strip("[]"))
+        elif tag == "ColumnGroup":
+            column_group = None
+        elif tag == "MissingIndex" and missing_index is not None:
+            plan.missing_indexes.append(missing_index)
+            missing_index = None
+        elif tag == "MissingIndexGroup":
+            missing_group = None
+        elif tag in ("StmtSimple", "StmtCursor"):
+            statement = None
+
+        # Bellek sabit kalsın diye işlenen element temizlenir
+        # Processed elements are cleared so memory stays flat
+        elem.clear()
+
+    # Operatörün kendi maliyeti = alt ağaç maliyeti - çocukların alt ağaç maliyeti
+    # Own cost of an operator = subtree cost - subtree cost of its children
+    operators = plan.operators
+    for op in operators:
+        if op.children:
+            op.own_cost = max(op.subtree_cost - sum(operators[c].subtree_cost for c in op.children), 0.0)
+
+    return plan
+
+
+# En pahalı operatörleri sıralar. Gerçek planda süre, tahmini planda kendi maliyeti esas alınır.
+# Ranks the most expensive operators. Actual plans rank by time, estimated plans by own cost.
+def rank_hot_operators(plan, top=10):
+    total = plan.total_cost() or 1.0
+    if plan.is_actual and any(op.actual_elapsed_ms for op in plan.operators):
+        # Süreler kümülatiftir; kendi süresi = süre - çocukların en büyük süresi
+        # Times are cumulative; own time = time - the largest child time
+        def weight(op):
+            child = max((plan.operators[c].actual_elapsed_ms or 0 for c in op.children), default=0)
+            return max((op.actual_elapsed_ms or 0) - child, 0)
+    else:
+        def weight(op):
+            return op.own_cost
+
+    ranked = sorted(plan.operators, key=weight, reverse=True)[:top]
+    result = []
+    for op in ranked:
+        row = op.as_dict()
+        row["cost_pct"] = round(100 * op.own_cost / total, 2)
+        row["weight"] = weight(op)
+        result.append(row)
+    return result
+
+
+# Plan üzerindeki sorunları öneri metinleri olarak döndürür
+# Returns the problems found in the plan as recommendation strings
+def plan_warnings(plan):
+    findings = []
+    for text in plan.warnings:
+        findings.append(f"⚠️ {text}")
+
+    for op in plan.operators:
+        where = f"{op.label}{' on ' + op.object if op.object else ''} (node {op.node_id})"
+        for text in op.warnings:
+            findings.append(f"⚠️ {where}: {text}")
+        if op.implicit_conversions and op.physical_op.endswith(("Scan", "Seek")):
+            findings.append(f"⚠️ {where}: {op.implicit_conversions} implicit conversion(s) in predicate")
+        ratio = op.row_estimate_ratio()
+        if ratio is not None and max(op.actual_rows, op.estimate_rows) >= ROW_ESTIMATE_MIN_ROWS:
+            if ratio >= ROW_ESTIMATE_SKEW or ratio <= 1 / ROW_ESTIMATE_SKEW:
+                findings.append(f"⚠️ {where}: estimated {op.estimate_rows:,.0f} rows per execution, "
+                                f"actual {op.actual_rows:,.0f} over {op.actual_executions:,.0f} execution(s)")
+
+    for stmt in plan.statements:
+        grant = stmt.get("memory_grant")
+        if grant and grant.get("GrantedMemory") and grant.get("MaxUsedMemory") is not None:
+            if grant["GrantedMemory"] >= 1024 * 100 and grant["MaxUsedMemory"] < grant["GrantedMemory"] / 10:
+                findings.append(f"⚠️ Excessive memory grant: {grant['GrantedMemory']:,.0f} KB granted, "
+                                f"{grant['MaxUsedMemory']:,.0f} KB used")
+
+    for index in plan.missing_indexes:
+        keys = ", ".join(index["equality"] + index["inequality"])
+        include = f" INCLUDE ({', '.join(index['include'])})" if index["include"] else ""
+        findings.append(f"📌 Missing index on {index['schema']}.{index['table']} ({keys}){include} "
+                        f"- estimated impact {index['impact']:.1f}%")
+    return findings
+
+
+def analyze_plan(xml_text, top=10):
+    try:
+        plan = parse_showplan(xml_text)
+    except ET.ParseError as e:
+        return {"status": "error", "error": f"Invalid showplan XML: {e}"}
+
+    return {
+        "status": "success",
+        "plan": plan,
+        "is_actual": plan.is_actual,
+        "operator_count": len(plan.operators),
+        "plan_hash": plan.plan_hash(),
+        "total_cost": plan.total_cost(),
+        "statements": plan.statements,
+        "hot_operators": rank_hot_operators(plan, top),
+        "missing_indexes": plan.missing_indexes,
+        "warnings": plan_warnings(plan)
+    }
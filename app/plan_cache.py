@@ -0,0 +1,303 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+import pyodbc
+
+from connection_pool import borrowed_connection
+from graphviz_execution_plan import plan_to_dot
+from instrumentation import count, span, timed
+from plan_analyzer import analyze_plan
+from plan_diff import diff_plans
+from query_analyzer import analyze_execution_plan
+from sql_parser import fingerprint_query, original_name_parts, parse_query
+
+DEFAULT_PLAN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".sql_performance_analyzer", "plan_cache.sqlite")
+DEFAULT_MAX_PLAN_CACHE_BYTES = 128 * 1024 * 1024
+PLAN_CACHE_FORMAT_VERSION = 2
+
+# Sorgudaki tabloların şema (modify_date) ve istatistik (STATS_DATE) durumunun özeti.
+# Summary of the schema (modify_date) and statistics (STATS_DATE) state of the query's tables.
+# Şema veya istatistik değişirse damga değişir ve plan yeniden derlenir.
+# When the schema or statistics change the stamp changes and the plan is recompiled.
+# İlk kolon çözülemeyen (OBJECT_ID NULL) ad sayısıdır / the first column counts names that did not resolve
+VERSION_STAMP_SQL = """
+    SELECT
+        SUM(CASE WHEN refs.object_id IS NULL THEN 1 ELSE 0 END),
+        COUNT(DISTINCT o.object_id),
+        MAX(o.modify_date),
+        CHECKSUM_AGG(CHECKSUM(o.object_id, o.modify_date, s.stats_id, STATS_DATE(s.object_id, s.stats_id)))
+    FROM (VALUES {values}) AS refs(object_id)
+    LEFT JOIN sys.objects o ON o.object_id = refs.object_id
+    LEFT JOIN sys.stats s ON s.object_id = o.object_id;
+"""
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plans (
+        cache_key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        server TEXT NOT NULL,
+        database TEXT NOT NULL,
+        version_stamp TEXT NOT NULL,
+        plan_xml BLOB NOT NULL,
+        analysis BLOB NOT NULL,
+        dot BLOB NOT NULL,
+        compile_ms REAL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS ix_plans_last_used ON plans(last_used);
+    CREATE INDEX IF NOT EXISTS ix_plans_query ON plans(fingerprint, server, database, created_at);
+    CREATE TABLE IF NOT EXISTS cache_info (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def plan_cache_key(fingerprint, server, database, version_stamp):
+    raw = f"{PLAN_CACHE_FORMAT_VERSION}|{server.lower()}|{database.lower()}|{version_stamp}|{fingerprint}"
+    return hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+# QUOTENAME karşılığı; boş parça (db..tablo) olduğu gibi kalır
+# Equivalent of QUOTENAME; an empty part (db..table) is kept as is
+def _quote_name(parts):
+    return ".".join("[" + part.replace("]", "]]") + "]" if part else "" for part in parts)
+
+
+# Sorgunun başvurduğu tablolar için şema/istatistik damgası (tek sorgu).
+# Adlar sorgudaki yazılışla ve köşeli parantezle gönderilir (boşluklu adlar, büyük/küçük harf duyarlı harmanlama).
+# Çözülemeyen bir ad varsa damga yoktur (None): plan cache'lenmez, değişiklikler kaçırılmaz.
+# Schema/statistics stamp for the tables referenced by the query (single query).
+# Names are sent as spelled in the query and bracket-quoted (names with spaces, case-sensitive collations).
+# When a name does not resolve there is no stamp (None): the plan is not cached so no change goes unnoticed.
+def fetch_version_stamp(connection, query):
+    names = sorted({ref.name for ref in parse_query(query).tables if ref.kind == "table"})
+    if not names:
+        return "no-tables"
+    spelled = original_name_parts(query, names)
+    object_names = [_quote_name(spelled.get(name) or name.split(".")) for name in names]
+    cursor = connection.cursor()
+    values = ", ".join("(OBJECT_ID(?))" for _ in object_names)
+    cursor.execute(VERSION_STAMP_SQL.format(values=values), *object_names)
+    unresolved, count, modify_date, checksum = cursor.fetchone()
+    if unresolved:
+        return None
+    return f"{count}|{modify_date.isoformat() if modify_date is not None else None}|{checksum}"
+
+
+class PlanCache:
+    def __init__(self, path=DEFAULT_PLAN_CACHE_PATH, max_bytes=DEFAULT_MAX_PLAN_CACHE_BYTES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Streamlit oturumları farklı thread'lerden erişir
+        # Streamlit sessions access it from different threads
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT value FROM cache_info WHERE name = 'version'").fetchone()
+        if row is None or row[0] != str(PLAN_CACHE_FORMAT_VERSION):
+            # Eski formatlı kayıtlar okunamaz, cache sıfırlanır
+            # Old-format entries cannot be read, the cache is reset
+            self._conn.execute("DELETE FROM plans")
+            self._conn.execute("INSERT OR REPLACE INTO cache_info VALUES ('version', ?)",
+                               (str(PLAN_CACHE_FORMAT_VERSION),))
+        self._conn.commit()
+
+    def get(self, cache_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT plan_xml, analysis, dot, compile_ms, created_at, hits FROM plans WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE plans SET last_used = ?, hits = hits + 1 WHERE cache_key = ?",
+                               (time.time(), cache_key))
+            self._conn.commit()
+
+        plan_xml, analysis, dot, compile_ms, created_at, hits = row
+        return {
+            "plan_xml": zlib.decompress(plan_xml).decode("utf-8"),
+            "plan_analysis": pickle.loads(zlib.decompress(analysis)),
+            "dot": zlib.decompress(dot).decode("utf-8"),
+            "compile_ms": compile_ms,
+            "created_at": created_at,
+            "hits": hits + 1
+        }
+
+    def put(self, cache_key, fingerprint, server, database, version_stamp, plan_xml, plan_analysis, dot,
+            compile_ms=None):
+        # XML, ayrıştırılmış ağaç ve DOT sıkıştırılmış saklanır
+        # XML, the parsed tree and the DOT are stored compressed
+        plan_blob = zlib.compress(plan_xml.encode("utf-8"), 6)
+        analysis_blob = zlib.compress(pickle.dumps(plan_analysis, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        dot_blob = zlib.compress(dot.encode("utf-8"), 6)
+        size = len(plan_blob) + len(analysis_blob) + len(dot_blob)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (cache_key, fingerprint, server, database, version_stamp, plan_blob, analysis_blob, dot_blob,
+                 compile_ms, size, now, now)
+            )
+            self._evict_locked(keep=cache_key)
+            self._conn.commit()
+        return size
+
+    # Aynı sorgunun (parmak izi/server/veritabanı) başka bir damgayla derlenmiş en son planı
+    # The latest plan of the same query (fingerprint/server/database) compiled under another stamp
+    def previous(self, fingerprint, server, database, exclude_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cache_key, analysis, created_at FROM plans "
+                "WHERE fingerprint = ? AND server = ? AND database = ? AND cache_key <> ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (fingerprint, server, database, exclude_key)
+            ).fetchone()
+        if row is None:
+            return None
+        cache_key, analysis, created_at = row
+        return {"cache_key": cache_key, "plan_analysis": pickle.loads(zlib.decompress(analysis)),
+                "created_at": created_at}
+
+    # Boyut bütçesi aşılırsa en uzun süredir kullanılmayan planlar silinir
+    # When the size budget is exceeded the least recently used plans are removed
+    def _evict_locked(self, keep=None):
+        if self.max_bytes is None:
+            return 0
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM plans").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = []
+        for cache_key, size in self._conn.execute("SELECT cache_key, size FROM plans ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            if cache_key == keep:
+                continue
+            evicted.append((cache_key,))
+            total -= size
+        self._conn.executemany("DELETE FROM plans WHERE cache_key = ?", evicted)
+        return len(evicted)
+
+    def evict(self):
+        with self._lock:
+            evicted = self._evict_locked()
+            self._conn.commit()
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            count, size, hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM plans"
+            ).fetchone()
+        return {"plans": count, "bytes": size, "max_bytes": self.max_bytes, "hits": hits}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM plans")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_plan_cache(path=DEFAULT_PLAN_CACHE_PATH, max_bytes=DEFAULT_MAX_PLAN_CACHE_BYTES):
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = PlanCache(path, max_bytes)
+            _caches[path] = cache
+        return cache
+
+
+# analyze_execution_plan ile aynı sonuç; plan, analiz ve DOT cache'ten gelebilir.
+# Same result as analyze_execution_plan; the plan, analysis and DOT may come from the cache.
+# Anahtar: literal duyarlı parmak izi + server + veritabanı + şema/istatistik damgası
+# Key: literal-sensitive fingerprint + server + database + schema/statistics stamp
+@timed("get_execution_plan_cached")
+def get_execution_plan_cached(connection, query, cache=None, server=None, compare_previous=True):
+    if cache is None:
+        cache = get_plan_cache()
+    try:
+        with borrowed_connection(connection) as conn:
+            database = conn.getinfo(pyodbc.SQL_DATABASE_NAME)
+            if server is None:
+                server = conn.getinfo(pyodbc.SQL_SERVER_NAME)
+            # Literal değerleri ve tipleri plana etki ettiği için korunur
+            # Literals are kept because their values and types affect the plan
+            fingerprint = fingerprint_query(query, keep_literals=True)
+            version_stamp = fetch_version_stamp(conn, query)
+            cache_key = None if version_stamp is None else plan_cache_key(fingerprint, server, database, version_stamp)
+
+            cached = cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                count("plan_cache.hit")
+                cached.update({"status": "success", "cache_hit": True, "cache_key": cache_key})
+                if compare_previous:
+                    _attach_previous_diff(cached, cache, fingerprint, server, database)
+                return cached
+
+            count("plan_cache.miss")
+            plan_result = analyze_execution_plan(conn, query)
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+    if plan_result["status"] != "success":
+        return plan_result
+
+    plan_analysis = analyze_plan(plan_result["plan_xml"])
+    if plan_analysis["status"] != "success":
+        return {"status": "error", "error": plan_analysis["error"], "plan_xml": plan_result["plan_xml"]}
+    with span("graphviz.render"):
+        dot = plan_to_dot(plan_analysis["plan"])
+    compile_ms = sum(stmt.get("compile_ms") or 0 for stmt in plan_analysis["statements"]) or None
+    if cache_key is not None:
+        cache.put(cache_key, fingerprint, server, database, version_stamp, plan_result["plan_xml"], plan_analysis,
+                  dot, compile_ms)
+    result = {
+        "status": "success",
+        "plan_xml": plan_result["plan_xml"],
+        "plan_analysis": plan_analysis,
+        "dot": dot,
+        "compile_ms": compile_ms,
+        "cache_hit": False,
+        "cache_key": cache_key
+    }
+    if compare_previous and cache_key is not None:
+        _attach_previous_diff(result, cache, fingerprint, server, database)
+    return result
+
+
+# Şema/istatistik değişince yeniden derlenen plan, aynı sorgunun önceki planıyla karşılaştırılır
+# A plan recompiled after a schema/statistics change is compared with the previous plan of the same query
+def _attach_previous_diff(result, cache, fingerprint, server, database):
+    previous = cache.previous(fingerprint, server, database, result["cache_key"])
+    if previous is None or previous["plan_analysis"].get("status") != "success":
+        return result
+    with span("plan_diff"):
+        result["plan_diff"] = diff_plans(previous["plan_analysis"]["plan"], result["plan_analysis"]["plan"])
+    result["previous_plan_created_at"] = previous["created_at"]
+    return result
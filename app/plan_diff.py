@@ -0,0 +1,328 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+from plan_analyzer import ParsedPlan, parse_showplan
+
+# İki operatör ağacı üç adımda eşlenir (GumTree benzeri), hepsi doğrusal zamanlı:
+#   1. aynı alt ağaç hash'ine sahip (en az iki operatörlü) alt ağaçlar bütün olarak eşlenir
+#   2. aşağıdan yukarı: çocuklarının çoğu aynı yeni operatörün çocuklarına eşlenen operatörler eşlenir
+#   3. yukarıdan aşağı: eşlenmiş ebeveynlerin kalan çocukları imza, tablo ve konuma göre hizalanır
+# The two operator trees are matched in three passes (GumTree-like), all linear time:
+#   1. subtrees (of at least two operators) with the same subtree hash are matched as a whole
+#   2. bottom-up: operators whose children mostly map to the children of one new operator are matched
+#   3. top-down: the remaining children of matched parents are aligned by signature, table and position
+
+JOIN_OPERATORS = ("Nested Loops", "Hash Match", "Merge Join", "Adaptive Join")
+# Tahmin bu oranda değişirse (ve satır sayısı eşiği aşıyorsa) kardinalite kayması sayılır
+# An estimate change of this ratio (above the row threshold) counts as a cardinality shift
+ESTIMATE_SHIFT_RATIO = 2.0
+ESTIMATE_SHIFT_MIN_ROWS = 100
+# Operatörün toplam maliyetteki payı bu kadar puan değişirse maliyet değişimi sayılır
+# A change of this many points in the operator's share of the total cost counts as a cost change
+COST_SHARE_DELTA_PCT = 5.0
+# Eklenen/silinen operatörler bu maliyet payının altındaysa mesaj üretilmez
+# Added/removed operators below this cost share produce no message
+MIN_MESSAGE_COST_PCT = 1.0
+MAX_MESSAGES = 25
+# Birden fazla aynı alt ağaç adayı varken en fazla bu kadarına bakılır
+# With several identical subtree candidates at most this many are inspected
+MAX_CANDIDATE_SCAN = 32
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+ADDED = "added"
+REMOVED = "removed"
+
+
+def _signature(op):
+    return op.physical_op, op.logical_op, op.object
+
+
+def _table(op):
+    if not op.object:
+        return None
+    return ".".join(op.object.split(".")[:2])
+
+
+# Alt ağaç hash'leri ve boyutları; operatörler ön-sıralı olduğu için ters sırada çocuklar önce gelir
+# Subtree hashes and sizes; operators are in pre-order so children come first in reverse order
+def _subtree_hashes(plan):
+    operators = plan.operators
+    hashes = [0] * len(operators)
+    sizes = [1] * len(operators)
+    for op in reversed(operators):
+        hashes[op.index] = hash((_signature(op), tuple(hashes[c] for c in op.children)))
+        sizes[op.index] = 1 + sum(sizes[c] for c in op.children)
+    return hashes, sizes
+
+
+class _Matcher:
+    __slots__ = ("old", "new", "old_to_new", "new_to_old")
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.old_to_new = {}
+        self.new_to_old = {}
+
+    def link(self, o, n):
+        self.old_to_new[o] = n
+        self.new_to_old[n] = o
+
+    def link_subtree(self, o, n):
+        # Aynı hash'li alt ağaçlar aynı şekle sahiptir; yığın ile eşzamanlı gezilir
+        # Subtrees with the same hash have the same shape; they are walked together with a stack
+        stack = [(o, n)]
+        while stack:
+            o, n = stack.pop()
+            self.link(o, n)
+            stack.extend(zip(self.old.operators[o].children, self.new.operators[n].children))
+
+    def match_identical(self, old_hashes, old_sizes, new_hashes, new_sizes):
+        candidates = {}
+        heads = {}
+        for op in self.new.operators:
+            if new_sizes[op.index] > 1:
+                candidates.setdefault(new_hashes[op.index], []).append(op.index)
+        for op in self.old.operators:
+            o = op.index
+            if o in self.old_to_new or old_sizes[o] < 2:
+                continue
+            pool = candidates.get(old_hashes[o])
+            if not pool:
+                continue
+            # Listenin başındaki eşlenmiş adaylar atlanır (silme yerine başlangıç konumu ilerler)
+            # Matched candidates at the head of the list are skipped (the start moves instead of deleting)
+            start = heads.get(old_hashes[o], 0)
+            while start < len(pool) and pool[start] in self.new_to_old:
+                start += 1
+            heads[old_hashes[o]] = start
+            if start == len(pool):
+                continue
+            chosen = pool[start]
+            # Ebeveynleri zaten eşlenmiş aday tercih edilir
+            # A candidate whose parent is already matched is preferred
+            if op.parent is not None and op.parent in self.old_to_new:
+                wanted_parent = self.old_to_new[op.parent]
+                for n in pool[start:start + MAX_CANDIDATE_SCAN]:
+                    if n not in self.new_to_old and self.new.operators[n].parent == wanted_parent:
+                        chosen = n
+                        break
+            self.link_subtree(o, chosen)
+
+    def match_bottom_up(self):
+        old_ops = self.old.operators
+        new_ops = self.new.operators
+        for op in reversed(old_ops):
+            if op.index in self.old_to_new or not op.children:
+                continue
+            parents = Counter(
+                new_ops[self.old_to_new[c]].parent for c in op.children
+                if c in self.old_to_new and new_ops[self.old_to_new[c]].parent is not None
+            )
+            for n, common in parents.most_common():
+                if n in self.new_to_old:
+                    continue
+                candidate = new_ops[n]
+                dice = 2 * common / (len(op.children) + len(candidate.children))
+                if _compatible(op, candidate) or dice >= 0.5:
+                    self.link(op.index, n)
+                break
+
+    def align_children(self, old_children, new_children):
+        old_free = [c for c in old_children if c not in self.old_to_new]
+        new_free = [c for c in new_children if c not in self.new_to_old]
+        if not old_free or not new_free:
+            return
+        old_ops = self.old.operators
+        new_ops = self.new.operators
+        for same in (_signature, lambda op: op.logical_op, _table, lambda op: op.physical_op):
+            for o in list(old_free):
+                key = same(old_ops[o])
+                if key is None:
+                    continue
+                for n in new_free:
+                    if same(new_ops[n]) == key:
+                        self.link(o, n)
+                        old_free.remove(o)
+                        new_free.remove(n)
+                        break
+        # Geriye birer operatör kaldıysa aynı yerdeki operatör değişmiştir
+        # When one operator is left on each side, the operator at that position was replaced
+        if len(old_free) == 1 and len(new_free) == 1:
+            self.link(old_free[0], new_free[0])
+
+    def match_top_down(self):
+        self.align_children(self.old.roots, self.new.roots)
+        new_ops = self.new.operators
+        for op in self.old.operators:
+            n = self.old_to_new.get(op.index)
+            if n is not None and op.children:
+                self.align_children(op.children, new_ops[n].children)
+
+
+def _compatible(old_op, new_op):
+    if old_op.physical_op == new_op.physical_op or old_op.logical_op == new_op.logical_op:
+        return True
+    return _table(old_op) is not None and _table(old_op) == _table(new_op)
+
+
+def _pct(value, total):
+    return round(100 * value / total, 2) if total else 0.0
+
+
+def _operator_row(status, old_op, new_op, old_total, new_total):
+    row = {"status": status, "changes": []}
+    for prefix, op, total in (("old", old_op, old_total), ("new", new_op, new_total)):
+        row[f"{prefix}_node"] = op.index if op else None
+        row[f"{prefix}_node_id"] = op.node_id if op else None
+        row[f"{prefix}_operator"] = op.label if op else None
+        row[f"{prefix}_object"] = op.object if op else None
+        row[f"{prefix}_estimate_rows"] = op.estimate_rows if op else None
+        row[f"{prefix}_actual_rows"] = op.actual_rows if op else None
+        row[f"{prefix}_cost_pct"] = _pct(op.own_cost, total) if op else 0.0
+    row["cost_pct_delta"] = round(row["new_cost_pct"] - row["old_cost_pct"], 2)
+    row["subtree_cost_delta"] = (new_op.subtree_cost if new_op else 0.0) - (old_op.subtree_cost if old_op else 0.0)
+    return row
+
+
+def _row_ratio(old_value, new_value):
+    if old_value is None or new_value is None or max(old_value, new_value) < ESTIMATE_SHIFT_MIN_ROWS:
+        return None
+    ratio = max(new_value, 1.0) / max(old_value, 1.0)
+    if ratio >= ESTIMATE_SHIFT_RATIO or ratio <= 1 / ESTIMATE_SHIFT_RATIO:
+        return ratio
+    return None
+
+
+# Eşlenmiş iki operatör arasındaki farklar ve okunur mesajları
+# Differences between two matched operators and their readable messages
+def _compare_operators(old_op, new_op, row):
+    where = f"{new_op.label}{' on ' + new_op.object if new_op.object else ''} (node {old_op.node_id} → {new_op.node_id})"
+    messages = []
+    if old_op.physical_op != new_op.physical_op or old_op.logical_op != new_op.logical_op:
+        if old_op.physical_op in JOIN_OPERATORS and new_op.physical_op in JOIN_OPERATORS:
+            row["changes"].append("join_type")
+            messages.append(f"🔀 Join type changed: {old_op.label} → {new_op.label} (node {old_op.node_id} → {new_op.node_id})")
+        else:
+            row["changes"].append("operator")
+            messages.append(f"🔁 Operator changed: {old_op.label} → {new_op.label} (node {old_op.node_id} → {new_op.node_id})")
+    if old_op.object != new_op.object:
+        if _table(old_op) is not None and _table(old_op) == _table(new_op):
+            row["changes"].append("index")
+            messages.append(f"🗂️ Index choice changed on {_table(new_op)}: {old_op.object} → {new_op.object}")
+        else:
+            row["changes"].append("object")
+            messages.append(f"🔁 Object changed: {old_op.object or '-'} → {new_op.object or '-'} ({new_op.label})")
+    if _row_ratio(old_op.estimate_rows, new_op.estimate_rows) is not None:
+        row["changes"].append("estimate")
+        messages.append(f"📐 {where}: estimated rows {old_op.estimate_rows:,.0f} → {new_op.estimate_rows:,.0f}")
+    if _row_ratio(old_op.actual_rows, new_op.actual_rows) is not None:
+        row["changes"].append("actual_rows")
+        messages.append(f"📐 {where}: actual rows {old_op.actual_rows:,.0f} → {new_op.actual_rows:,.0f}")
+    if abs(row["cost_pct_delta"]) >= COST_SHARE_DELTA_PCT:
+        row["changes"].append("cost")
+        messages.append(f"💰 {where}: cost share {row['old_cost_pct']:.1f}% → {row['new_cost_pct']:.1f}%")
+    return messages
+
+
+def _as_plan(source):
+    if isinstance(source, ParsedPlan):
+        return source
+    return parse_showplan(source)
+
+
+# İki planı karşılaştırır (önceki / şimdiki). old ve new: ParsedPlan, XML metni, bytes veya dosya nesnesi.
+# Compares two plans (previous / current). old and new: ParsedPlan, XML text, bytes or a file object.
+def diff_plans(old, new):
+    try:
+        old_plan = _as_plan(old)
+        new_plan = _as_plan(new)
+    except ET.ParseError as e:
+        return {"status": "error", "error": f"Invalid showplan XML: {e}"}
+
+    old_hashes, old_sizes = _subtree_hashes(old_plan)
+    new_hashes, new_sizes = _subtree_hashes(new_plan)
+    matcher = _Matcher(old_plan, new_plan)
+    matcher.match_identical(old_hashes, old_sizes, new_hashes, new_sizes)
+    matcher.match_bottom_up()
+    matcher.match_top_down()
+
+    old_total = old_plan.total_cost() or 1.0
+    new_total = new_plan.total_cost() or 1.0
+    old_status = [REMOVED] * len(old_plan.operators)
+    new_status = [ADDED] * len(new_plan.operators)
+    rows = []
+    scored_messages = []
+    for o, n in matcher.old_to_new.items():
+        old_op = old_plan.operators[o]
+        new_op = new_plan.operators[n]
+        row = _operator_row(CHANGED, old_op, new_op, old_total, new_total)
+        messages = _compare_operators(old_op, new_op, row)
+        if row["changes"]:
+            old_status[o] = new_status[n] = CHANGED
+            rows.append(row)
+            scored_messages.extend((abs(row["cost_pct_delta"]) + 100 * ("join_type" in row["changes"]), m)
+                                   for m in messages)
+        else:
+            old_status[o] = new_status[n] = UNCHANGED
+    for op in old_plan.operators:
+        if old_status[op.index] == REMOVED:
+            row = _operator_row(REMOVED, op, None, old_total, new_total)
+            rows.append(row)
+            if row["old_cost_pct"] >= MIN_MESSAGE_COST_PCT:
+                scored_messages.append((row["old_cost_pct"], f"➖ Removed {op.label}"
+                                        f"{' on ' + op.object if op.object else ''} ({row['old_cost_pct']:.1f}% of cost)"))
+    for op in new_plan.operators:
+        if new_status[op.index] == ADDED:
+            row = _operator_row(ADDED, None, op, old_total, new_total)
+            rows.append(row)
+            if row["new_cost_pct"] >= MIN_MESSAGE_COST_PCT:
+                scored_messages.append((row["new_cost_pct"], f"➕ New {op.label}"
+                                        f"{' on ' + op.object if op.object else ''} ({row['new_cost_pct']:.1f}% of cost)"))
+    rows.sort(key=lambda r: abs(r["cost_pct_delta"]), reverse=True)
+    scored_messages.sort(key=lambda item: item[0], reverse=True)
+
+    cost_delta_pct = round(100 * (new_plan.total_cost() - old_plan.total_cost()) / old_total, 2)
+    messages = [m for _, m in scored_messages[:MAX_MESSAGES]]
+    if abs(cost_delta_pct) >= COST_SHARE_DELTA_PCT:
+        messages.insert(0, f"{'📈' if cost_delta_pct > 0 else '📉'} Total estimated cost "
+                           f"{old_plan.total_cost():.4f} → {new_plan.total_cost():.4f} ({cost_delta_pct:+.1f}%)")
+    same_shape = [old_hashes[r] for r in old_plan.roots] == [new_hashes[r] for r in new_plan.roots]
+    if not rows:
+        messages.append("✅ Plans are identical (same shape, estimates and costs).")
+    elif same_shape:
+        messages.insert(0, "Same plan shape; estimates or costs changed.")
+
+    return {
+        "status": "success",
+        "identical": not rows,
+        "same_shape": same_shape,
+        "old_plan_hash": old_plan.plan_hash(),
+        "new_plan_hash": new_plan.plan_hash(),
+        "old_total_cost": old_plan.total_cost(),
+        "new_total_cost": new_plan.total_cost(),
+        "cost_delta_pct": cost_delta_pct,
+        "old_operator_count": len(old_plan.operators),
+        "new_operator_count": len(new_plan.operators),
+        "matched": len(matcher.old_to_new),
+        "changed": sum(1 for r in rows if r["status"] == CHANGED),
+        "added": new_status.count(ADDED),
+        "removed": old_status.count(REMOVED),
+        "operators": rows,
+        "messages": messages,
+        "mapping": matcher.old_to_new,
+        "old_status": old_status,
+        "new_status": new_status,
+        "old_plan": old_plan,
+        "new_plan": new_plan
+    }
@@ -7,22 +7,25 @@ Description:
     This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
     Created using Python 3.x and Streamlit.
 """
-from measure_query_duration import measure_query_duration_v3
+from measure_query_duration import measure_query_duration_v3, benchmark_query
 from query_optimizer_engine import analyze_structure
+from metadata_catalog import as_catalog, AMBIGUOUS, MISSING
+from sql_parser import extract_tables_from_query
+from connection_pool import borrowed_connection
+from performance_analyzer import run_query_single_execution, interpret_statistics_output
+from plan_analyzer import analyze_plan
+from index_advisor import recommend_indexes
+from selectivity_estimator import estimate_query, UNKNOWN
+from instrumentation import span, timed
 
-import re
 import pyodbc
 
-def extract_tables_from_query(query):
-    raw = re.findall(r'(?:from|join)\s+([a-zA-Z0-9_\[\]\.]+)', query.lower())
-    tables = []
-    for t in raw:
-        cleaned = t.replace("[", "").replace("]", "")
-        tables.append(cleaned.strip())
-    return tables
-
-def analyze_query(connection, query, metadata_dict):
-    metadata_dict = {k.strip().lower(): v for k, v in metadata_dict.items()}
+# Sunucuya gitmeden yapılan analiz: yapı + metadata kontrolleri
+# Analysis without touching the server: structure + metadata checks
+def analyze_query_offline(query, metadata_dict, default_db=None):
+    # Katalog bir kez kurulur; MetadataCatalog verilirse doğrudan kullanılır
+    # The catalog is built once; a MetadataCatalog is used as is
+    catalog = as_catalog(metadata_dict)
     result = {
         "query": query,
         "tables": [],
@@ -32,76 +35,151 @@ def analyze_query(connection, query, metadata_dict):
         "recommendations": []
     }
 
-    default_db = connection.getinfo(pyodbc.SQL_DATABASE_NAME).lower()
-
     #  Yapısal analiz (SELECT *, WHERE vs)
     # Structural analysis (SELECT *, WHERE vs)
-    result["structure_findings"] = analyze_structure(query, metadata_dict)
+    with span("analyze_query.structure"):
+        result["structure_findings"] = analyze_structure(query, catalog, default_db)
 
     # Tabloları çıkar
     # Remove tables
     tables = extract_tables_from_query(query)
     result["tables"] = tables
 
+    with span("analyze_query.metadata_lookup"):
+        _check_table_metadata(result, catalog, tables, default_db)
+
+    # WHERE/JOIN/ORDER BY kolonlarına göre mevcut indexlerle karşılaştırılmış öneriler
+    # Suggestions from the WHERE/JOIN/ORDER BY columns, checked against the existing indexes
+    with span("analyze_query.index_advice"):
+        result["index_recommendations"] = recommend_indexes(query, catalog, default_db)
+
+    return result
+
+
+def _check_table_metadata(result, catalog, tables, default_db):
     for t in tables:
-        parts = t.split(".")
-        if len(parts) == 3:
-            db, schema, name = parts
-            key = f"{db}.{schema}.{name}".lower()
-        elif len(parts) == 2:
-            schema, name = parts
-            db = default_db
-            key = f"{db}.{schema}.{name}".lower()
-        else:
-            name = parts[0].strip().lower()
-            matches = [k for k in metadata_dict if k.endswith(f".{name}")]
-            if len(matches) == 1:
-                key = matches[0]
-            elif len(matches) > 1:
-                result["recommendations"].append(f" '{name}' table found with multiple matches: {matches}")
-                continue
+        status, key, rows = catalog.resolve(t, default_db)
+        if status == AMBIGUOUS:
+            matches = [catalog.key_of(row) for row in rows]
+            result["recommendations"].append(f" '{key}' table found with multiple matches: {matches}")
+            continue
+        if status == MISSING:
+            if "." not in t:
+                result["recommendations"].append(f" '{key}' table could not be found in the metadata.")
+            continue
+
+        meta = catalog.record(rows[0])
+        result["table_metadata"].append({
+            "table": key,
+            "row_count": meta["row_count"],
+            "column_count": meta["column_count"],
+            "has_index": meta["has_index"]
+        })
+        if meta["row_count"] > 1_000_000 and not meta["has_index"]:
+            result["recommendations"].append(f" {key} large but no index definition.")
+
+
+def duration_recommendation(duration_ms):
+    if duration_ms < 200:
+        return "✅ The query ran quickly."
+    if duration_ms < 1000:
+        return "⚠️ Ran at medium speed."
+    return "🔥 The query is slow and needs to be optimised."
+
+
+# measure_mode: "sp" -> RunAndMeasure SP, "single" -> tek çalıştırmada istatistik + gerçek plan
+# measure_mode: "sp" -> RunAndMeasure SP, "single" -> statistics + actual plan from one execution
+# benchmark_runs > 1: SP modunda tek örnek yerine tekrarlı ölçüm (medyan, p95, ...)
+# benchmark_runs > 1: in SP mode, repeated runs (median, p95, ...) instead of a single sample
+# max_rows / max_bytes: tek çalıştırmada istemciye aktarılacak sonuç için üst sınır
+# max_rows / max_bytes: cap on the result transferred to the client in single-execution mode
+# measure_mode "estimate": sorgu çalıştırılmaz, histogramlardan maliyet tahmini yapılır
+# measure_mode "estimate": the query is not executed, its cost is estimated from the histograms
+# measure_mode "auto": tahmin karar veremezse (unknown) SP ile çalıştırılır
+# measure_mode "auto": executed through the SP only when the estimate is unknown
+# column_stats: get_cached_column_statistics çıktısı; verilmezse bağlantıdan (cache ile) okunur
+# column_stats: output of get_cached_column_statistics; read through the cache when not given
+@timed("analyze_query", profile=True)
+def analyze_query(connection, query, metadata_dict, measure_mode="sp",
+                  benchmark_runs=1, benchmark_warmup=0, cold_cache=False, max_rows=None, max_bytes=None,
+                  column_stats=None):
+    # connection bir ConnectionPool da olabilir
+    # connection may also be a ConnectionPool
+    catalog = as_catalog(metadata_dict)
+    with borrowed_connection(connection) as conn:
+        default_db = conn.getinfo(pyodbc.SQL_DATABASE_NAME).lower()
+        result = analyze_query_offline(query, catalog, default_db)
+
+        if measure_mode in ("estimate", "auto"):
+            with span("analyze_query.estimate"):
+                if column_stats is None:
+                    # table_stats_cache pandas yükler; sadece bu modda gerekir
+                    # table_stats_cache pulls in pandas; it is only needed in this mode
+                    from table_stats_cache import get_cached_column_statistics
+                    try:
+                        column_stats = get_cached_column_statistics(conn)
+                    except Exception as e:
+                        column_stats = {}
+                        result["recommendations"].append(f" Column statistics could not be read: {e}")
+                estimate = estimate_query(query, catalog, column_stats, default_db)
+            result["estimate"] = estimate
+            result["recommendations"].extend(estimate["findings"])
+            if measure_mode == "estimate" or estimate["verdict"] != UNKNOWN:
+                measure_mode = "skip"
             else:
-                result["recommendations"].append(f" '{name}' table could not be found in the metadata.")
-                continue
-
-        meta = metadata_dict.get(key.strip().lower())
-        if meta is not None:
-            result["table_metadata"].append({
-                "table": key,
-                "row_count": meta["row_count"],
-                "column_count": meta["column_count"],
-                "has_index": meta["has_index"]
-            })
-            if meta["row_count"] > 1_000_000 and not meta["has_index"]:
-                result["recommendations"].append(f" {key} large but no index definition.")
-
-    # Performans ölçümü (SP üzerinden)
-    # Performance measurement (via SP)
-    perf = measure_query_duration_v3(connection, query)
-    result["performance"] = perf
+                measure_mode = "sp"
 
-    if perf["status"] == "success":
-        dur = perf["duration_ms"]
-        if dur < 200:
-            result["recommendations"].append("✅ The query ran quickly.")
-        elif dur < 1000:
-            result["recommendations"].append("⚠️ Ran at medium speed.")
+        if measure_mode == "skip":
+            perf = {"status": "skipped", "reason": f"Not executed: estimate is {result['estimate']['verdict']}."}
+        elif measure_mode == "single":
+            perf = run_query_single_execution(conn, query, max_rows=max_rows, max_bytes=max_bytes)
+            if perf["status"] == "success":
+                with span("analyze_query.statistics"):
+                    result["recommendations"].extend(
+                        r for r in interpret_statistics_output(perf["statistics_parsed"], catalog, default_db)
+                        if r != " Performance values are normal."
+                    )
+                # Gerçek plandaki sıcak operatörler ve uyarılar
+                # Hot operators and warnings from the actual plan
+                if perf.get("plan_xml"):
+                    with span("analyze_query.plan_analysis"):
+                        plan_analysis = analyze_plan(perf["plan_xml"])
+                        if plan_analysis["status"] == "success":
+                            result["plan_analysis"] = plan_analysis
+                            result["recommendations"].extend(plan_analysis["warnings"])
+                            if plan_analysis["missing_indexes"]:
+                                result["index_recommendations"] = recommend_indexes(
+                                    query, catalog, default_db, plan_analysis["missing_indexes"])
+        elif benchmark_runs > 1 or cold_cache:
+            perf = benchmark_query(conn, query, runs=max(1, benchmark_runs), warmup=benchmark_warmup,
+                                   cold_cache=cold_cache)
         else:
-            result["recommendations"].append("🔥 The query is slow and needs to be optimised.")
+            # Performans ölçümü (SP üzerinden)
+            # Performance measurement (via SP)
+            perf = measure_query_duration_v3(conn, query)
+        result["performance"] = perf
 
-    return result
+    if perf["status"] == "success":
+        result["recommendations"].append(duration_recommendation(perf["duration_ms"]))
 
+    return result
 
 
+@timed("analyze_execution_plan")
 def analyze_execution_plan(connection, query):
     try:
-        cursor = connection.cursor()
-        cursor.execute("SET SHOWPLAN_XML ON;")
-        cursor.execute(query)
-        plan = ""
-        for row in cursor.fetchall():
-            plan += row[0]  # XML text is in the first column
-        cursor.execute("SET SHOWPLAN_XML OFF;")
+        with borrowed_connection(connection) as conn, span("analyze_execution_plan.fetch"):
+            cursor = conn.cursor()
+            cursor.execute("SET SHOWPLAN_XML ON;")
+            try:
+                cursor.execute(query)
+                # XML metni ilk kolondadır; parçalar tek seferde birleştirilir
+                # XML text is in the first column; the chunks are joined in one go
+                plan = "".join(row[0] for row in cursor.fetchall())
+            finally:
+                # Havuzdaki bağlantı SHOWPLAN açık kalmamalı
+                # A pooled connection must not be left with SHOWPLAN on
+                cursor.execute("SET SHOWPLAN_XML OFF;")
         return {"status": "success", "plan_xml": plan}
     except Exception as e:
         return {"status": "error", "error": str(e)}
@@ -0,0 +1,367 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import math
+import os
+import sqlite3
+import statistics
+import threading
+import time
+import zlib
+
+from sql_parser import fingerprint_hash
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".sql_performance_analyzer", "query_history.sqlite")
+
+# Regresyon tespiti: son N çalıştırma taban çizgisidir
+# Regression detection: the last N runs form the baseline
+DEFAULT_BASELINE_RUNS = 30
+MIN_BASELINE_RUNS = 5
+# Robust z-skoru eşiği ve en az göreli değişim
+# Robust z-score threshold and minimum relative change
+REGRESSION_Z = 3.0
+REGRESSION_MIN_CHANGE = 0.2
+# Sorgu başına saklanan farklı plan sayısı (plan karşılaştırması için)
+# Number of distinct plans kept per query (for plan comparison)
+DEFAULT_PLANS_PER_QUERY = 10
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS queries (
+        query_id INTEGER PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        server TEXT NOT NULL,
+        database TEXT NOT NULL,
+        query_text TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        run_count INTEGER NOT NULL DEFAULT 0,
+        total_ms REAL NOT NULL DEFAULT 0,
+        total_sq_ms REAL NOT NULL DEFAULT 0,
+        min_ms REAL,
+        max_ms REAL,
+        last_ms REAL,
+        last_plan_hash TEXT,
+        UNIQUE (fingerprint, server, database)
+    );
+    CREATE INDEX IF NOT EXISTS ix_queries_last_seen ON queries(last_seen);
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY,
+        query_id INTEGER NOT NULL,
+        ts REAL NOT NULL,
+        duration_ms REAL,
+        row_count INTEGER,
+        cpu_ms REAL,
+        logical_reads INTEGER,
+        plan_hash TEXT,
+        p95_ms REAL,
+        stddev_ms REAL,
+        samples INTEGER,
+        source TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_runs_query ON runs(query_id, run_id);
+    CREATE TABLE IF NOT EXISTS plans (
+        query_id INTEGER NOT NULL,
+        plan_hash TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        plan_xml BLOB NOT NULL,
+        PRIMARY KEY (query_id, plan_hash)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS ingest_watermarks (
+        source TEXT PRIMARY KEY,
+        value INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+"""
+
+# Sorgu başına özet satırı her kayıtta güncellenir; geçmiş görünümü runs tablosunu taramaz
+# The per-query summary row is updated on every insert; the history view never scans runs
+UPSERT_QUERY_SQL = """
+    UPDATE queries SET
+        last_seen = MAX(last_seen, :ts),
+        run_count = run_count + 1,
+        total_ms = total_ms + COALESCE(:duration_ms, 0),
+        total_sq_ms = total_sq_ms + COALESCE(:duration_ms, 0) * COALESCE(:duration_ms, 0),
+        min_ms = MIN(COALESCE(min_ms, :duration_ms), COALESCE(:duration_ms, min_ms)),
+        max_ms = MAX(COALESCE(max_ms, :duration_ms), COALESCE(:duration_ms, max_ms)),
+        last_ms = :duration_ms,
+        last_plan_hash = COALESCE(:plan_hash, last_plan_hash)
+    WHERE query_id = :query_id
+"""
+
+INSERT_RUN_SQL = """
+    INSERT INTO runs (query_id, ts, duration_ms, row_count, cpu_ms, logical_reads, plan_hash,
+                      p95_ms, stddev_ms, samples, source)
+    VALUES (:query_id, :ts, :duration_ms, :row_count, :cpu_ms, :logical_reads, :plan_hash,
+            :p95_ms, :stddev_ms, :samples, :source)
+"""
+
+RUN_COLUMNS = ("run_id", "ts", "duration_ms", "row_count", "cpu_ms", "logical_reads", "plan_hash",
+               "p95_ms", "stddev_ms", "samples", "source")
+
+
+# analyze_query / benchmark_query sonucundan bir geçmiş kaydı üretir
+# Builds a history record from an analyze_query / benchmark_query result
+def run_record(query, perf, server, database, plan_hash=None, source="analyze", ts=None):
+    server_ms = perf.get("server_ms") or {}
+    return {
+        "query": query,
+        "server": server,
+        "database": database,
+        "ts": ts if ts is not None else time.time(),
+        "duration_ms": perf.get("duration_ms"),
+        "row_count": perf.get("row_count"),
+        "cpu_ms": perf.get("cpu_ms"),
+        "logical_reads": perf.get("logical_reads"),
+        "plan_hash": plan_hash,
+        "p95_ms": server_ms.get("p95"),
+        "stddev_ms": server_ms.get("stddev"),
+        "samples": server_ms.get("count", 1),
+        "source": source
+    }
+
+
+class QueryHistory:
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # Sadece ekleme yapılan bir günlük: WAL + NORMAL senkronizasyon yeterince güvenli ve hızlıdır
+        # Append-only log: WAL with NORMAL sync is safe enough and fast
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._query_ids = {}
+
+    def _query_id_locked(self, fingerprint, server, database, query, ts):
+        key = (fingerprint, server, database)
+        query_id = self._query_ids.get(key)
+        if query_id is None:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO queries (fingerprint, server, database, query_text, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, server, database, query, ts, ts)
+            )
+            query_id = self._conn.execute(
+                "SELECT query_id FROM queries WHERE fingerprint = ? AND server = ? AND database = ?", key
+            ).fetchone()[0]
+            self._query_ids[key] = query_id
+        return query_id
+
+    # Kayıtlar tek transaction'da eklenir (toplu içe aktarma için)
+    # Records are inserted in a single transaction (for bulk ingestion)
+    # watermark=(kaynak, değer): aynı transaction'da saklanır, yarım kalan parti tekrar okunur
+    # watermark=(source, value): stored in the same transaction, so a half-written batch is re-read
+    def record_runs(self, records, watermark=None):
+        inserted = []
+        with self._lock:
+            try:
+                for record in records:
+                    row = dict(record)
+                    row["fingerprint"] = row.get("fingerprint") or fingerprint_hash(row["query"])
+                    row["server"] = (row.get("server") or "").lower()
+                    row["database"] = (row.get("database") or "").lower()
+                    row["query_id"] = self._query_id_locked(row["fingerprint"], row["server"], row["database"],
+                                                            row["query"], row["ts"])
+                    for column in RUN_COLUMNS[1:]:
+                        row.setdefault(column, None)
+                    row["run_id"] = self._conn.execute(INSERT_RUN_SQL, row).lastrowid
+                    self._conn.execute(UPSERT_QUERY_SQL, row)
+                    inserted.append({"run_id": row["run_id"], "query_id": row["query_id"],
+                                     "fingerprint": row["fingerprint"]})
+                if watermark is not None:
+                    self._conn.execute("INSERT OR REPLACE INTO ingest_watermarks VALUES (?, ?, ?)",
+                                       (watermark[0], watermark[1], time.time()))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._query_ids.clear()
+                raise
+        return inserted
+
+    def get_watermark(self, source, default=0):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM ingest_watermarks WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else default
+
+    def record_run(self, query, perf, server, database, plan_hash=None, source="analyze"):
+        return self.record_runs([run_record(query, perf, server, database, plan_hash, source)])[0]
+
+    def recent_runs(self, query_id, limit=100, before_run_id=None):
+        sql = f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE query_id = ?"
+        params = [query_id]
+        if before_run_id is not None:
+            sql += " AND run_id < ?"
+            params.append(before_run_id)
+        sql += " ORDER BY run_id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(RUN_COLUMNS, row)) for row in rows]
+
+    # Özet tablo üzerinden; milyonlarca çalıştırmada da sabit maliyetli
+    # Served from the summary table; constant cost even with millions of runs
+    def list_queries(self, limit=200, server=None, database=None):
+        sql = ("SELECT query_id, fingerprint, server, database, query_text, first_seen, last_seen, run_count, "
+               "total_ms, total_sq_ms, min_ms, max_ms, last_ms, last_plan_hash FROM queries")
+        clauses, params = [], []
+        if server is not None:
+            clauses.append("server = ?")
+            params.append(server.lower())
+        if database is not None:
+            clauses.append("database = ?")
+            params.append(database.lower())
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY last_seen DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        result = []
+        for (query_id, fingerprint, server_name, database_name, query_text, first_seen, last_seen, run_count,
+             total_ms, total_sq_ms, min_ms, max_ms, last_ms, last_plan_hash) in rows:
+            mean = total_ms / run_count if run_count else None
+            variance = (total_sq_ms / run_count - mean * mean) if run_count else None
+            result.append({
+                "query_id": query_id,
+                "fingerprint": fingerprint,
+                "server": server_name,
+                "database": database_name,
+                "query": query_text,
+                "runs": run_count,
+                "mean_ms": mean,
+                "stddev_ms": math.sqrt(max(variance, 0.0)) if variance is not None else None,
+                "min_ms": min_ms,
+                "max_ms": max_ms,
+                "last_ms": last_ms,
+                "last_plan_hash": last_plan_hash,
+                "first_seen": first_seen,
+                "last_seen": last_seen
+            })
+        return result
+
+    # Son çalıştırmayı taban çizgisiyle (son N çalıştırma) karşılaştırır.
+    # Compares the latest run against the baseline (the previous N runs).
+    # Medyan ve MAD kullanılır; tek tük aykırı ölçümler taban çizgisini bozmaz.
+    # Uses median and MAD so occasional outliers do not skew the baseline.
+    def detect_regression(self, query_id, duration_ms, plan_hash=None, before_run_id=None,
+                          window=DEFAULT_BASELINE_RUNS):
+        baseline = self.recent_runs(query_id, window, before_run_id)
+        durations = [run["duration_ms"] for run in baseline if run["duration_ms"] is not None]
+        previous_plan = next((run["plan_hash"] for run in baseline if run["plan_hash"]), None)
+
+        result = {
+            "status": "insufficient_history",
+            "baseline_runs": len(durations),
+            "baseline_median_ms": None,
+            "delta_ms": None,
+            "delta_pct": None,
+            "z_score": None,
+            "plan_changed": bool(plan_hash and previous_plan and plan_hash != previous_plan),
+            "previous_plan_hash": previous_plan,
+            "messages": []
+        }
+        if result["plan_changed"]:
+            result["messages"].append(f"🔀 Execution plan changed: {previous_plan} → {plan_hash}")
+        if duration_ms is None or not durations:
+            return result
+
+        median = statistics.median(durations)
+        result["baseline_median_ms"] = median
+        result["delta_ms"] = duration_ms - median
+        result["delta_pct"] = 100.0 * (duration_ms - median) / median if median else None
+        if len(durations) < MIN_BASELINE_RUNS:
+            return result
+
+        mad = statistics.median(abs(d - median) for d in durations)
+        # 1.4826 * MAD normal dağılımda standart sapmaya denk gelir; sıfıra düşmemesi için taban konur
+        # 1.4826 * MAD matches the standard deviation for normal data; floored so it never reaches zero
+        sigma = max(1.4826 * mad, 0.05 * median, 0.5)
+        z_score = (duration_ms - median) / sigma
+        result["z_score"] = z_score
+
+        if z_score >= REGRESSION_Z and duration_ms >= median * (1 + REGRESSION_MIN_CHANGE):
+            result["status"] = "regression"
+            result["messages"].append(
+                f"🐢 Significant slowdown: {duration_ms:.2f} ms vs baseline median {median:.2f} ms "
+                f"({result['delta_pct']:+.0f}%, z={z_score:.1f}, {len(durations)} runs)")
+        elif z_score <= -REGRESSION_Z and duration_ms <= median * (1 - REGRESSION_MIN_CHANGE):
+            result["status"] = "improvement"
+            result["messages"].append(
+                f"🚀 Significant speed-up: {duration_ms:.2f} ms vs baseline median {median:.2f} ms "
+                f"({result['delta_pct']:+.0f}%, z={z_score:.1f})")
+        else:
+            result["status"] = "ok"
+        return result
+
+    # Planı saklar ve bu sorgu için daha önce saklanan en son planı döndürür (yoksa None).
+    # Stores the plan and returns the latest plan stored earlier for this query (None if there is none).
+    # Her plan hash'i için en yeni XML tutulur; sorgu başına en fazla keep farklı plan kalır.
+    # The newest XML is kept per plan hash; at most keep distinct plans remain per query.
+    def record_plan(self, query_id, plan_hash, plan_xml, ts=None, keep=DEFAULT_PLANS_PER_QUERY):
+        ts = time.time() if ts is None else ts
+        blob = zlib.compress(plan_xml.encode("utf-8"), 6)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT plan_hash, last_seen, plan_xml FROM plans WHERE query_id = ? ORDER BY last_seen DESC LIMIT 1",
+                (query_id,)
+            ).fetchone()
+            updated = self._conn.execute(
+                "UPDATE plans SET last_seen = ?, plan_xml = ? WHERE query_id = ? AND plan_hash = ?",
+                (ts, blob, query_id, plan_hash)
+            ).rowcount
+            if not updated:
+                self._conn.execute("INSERT INTO plans VALUES (?, ?, ?, ?, ?)", (query_id, plan_hash, ts, ts, blob))
+            self._conn.execute(
+                "DELETE FROM plans WHERE query_id = ? AND plan_hash NOT IN "
+                "(SELECT plan_hash FROM plans WHERE query_id = ? ORDER BY last_seen DESC LIMIT ?)",
+                (query_id, query_id, keep)
+            )
+            self._conn.commit()
+        if previous is None:
+            return None
+        return {"plan_hash": previous[0], "last_seen": previous[1],
+                "plan_xml": zlib.decompress(previous[2]).decode("utf-8")}
+
+    def list_plans(self, query_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT plan_hash, first_seen, last_seen FROM plans WHERE query_id = ? ORDER BY last_seen DESC",
+                (query_id,)
+            ).fetchall()
+        return [{"plan_hash": plan_hash, "first_seen": first_seen, "last_seen": last_seen}
+                for plan_hash, first_seen, last_seen in rows]
+
+    def get_plan(self, query_id, plan_hash):
+        with self._lock:
+            row = self._conn.execute("SELECT plan_xml FROM plans WHERE query_id = ? AND plan_hash = ?",
+                                     (query_id, plan_hash)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_query_history(path=DEFAULT_HISTORY_PATH):
+    with _histories_lock:
+        history = _histories.get(path)
+        if history is None:
+            history = QueryHistory(path)
+            _histories[path] = history
+        return history
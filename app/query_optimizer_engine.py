@@ -8,46 +8,43 @@ Description:
     Created using Python 3.x and Streamlit.
 """
 
-import re
+from metadata_catalog import as_catalog, FOUND, AMBIGUOUS
+from sql_parser import parse_query
+# Eskiden bu modülde tanımlıydı; dışarıdaki içe aktarmalar için yeniden dışa aktarılır
+# Used to be defined in this module; re-exported for existing imports
+from sql_parser import extract_tables_from_query  # noqa: F401
 
-def extract_tables_from_query(query):
-    # Capture table names coming from FROM and JOIN
-    # FROM ve JOIN ile gelen tablo adlarını yakala
-    
-    return re.findall(r'(?:from|join)\s+([a-zA-Z0-9_\[\]\.]+)', query.lower())
-
-def analyze_structure(query, table_metadata_dict):
+def analyze_structure(query, table_metadata_dict, default_db=None):
     findings = []
+    catalog = as_catalog(table_metadata_dict)
+
+    # Tek geçişli parse, sonuç cache'ten gelir
+    # Single-pass parse, served from the parse cache
+    parsed = parse_query(query)
+    tables = parsed.table_names()
 
-    if "select *" in query.lower():
+    if parsed.select_star:
         findings.append("🚘 'SELECT *' usage detected. Only required columns should be selected.")
 
-    if "where" not in query.lower():
+    if tables and not parsed.has_where:
         findings.append("⚠️ There is no WHERE filter in the query. There may be a risk of full scan on the tables.")
 
-    tables = extract_tables_from_query(query)
     for raw_table in tables:
-        cleaned_table = raw_table.replace("[", "").replace("]", "")
-        parts = cleaned_table.split('.')
-        if len(parts) == 3:
-            db, schema, name = parts
-            key = f"{db.strip().lower()}.{schema.strip().lower()}.{name.strip().lower()}"
-        elif len(parts) == 2:
-            schema, name = parts
-            key = f"{schema.strip().lower()}.{name.strip().lower()}"
-        else:
-            name = parts[0]
-            key = name.strip().lower()
+        # Tek katalog, analyze_query ile aynı anahtar şeması
+        # One catalog, same key scheme as analyze_query
+        status, key, rows = catalog.resolve(raw_table, default_db)
 
-        if key in table_metadata_dict:
-            meta = table_metadata_dict[key]
+        if status == FOUND:
+            meta = catalog.record(rows[0])
 
             if meta["row_count"] > 1_000_000:
                 findings.append(f"🔥 Table '{key}' contains over 1M rows. WHERE clause is recommended.")
                 if not meta["has_index"]:
                     findings.append(f"🧱 Table '{key}' is large but has no index defined.")
+        elif status == AMBIGUOUS:
+            findings.append(f"❓ Table '{key}' matches more than one table in the metadata. Use a schema-qualified name.")
         else:
-            findings.append(f"❓ Table '{key}' not found in Excel metadata.")
+            findings.append(f"❓ Table '{key}' not found in metadata.")
 
     if not findings:
         findings.append("✅ Query is clean. It follows basic optimization rules.")
@@ -0,0 +1,566 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+from metadata_catalog import as_catalog, estimated_pages
+from sql_parser import parse_query, tokenize, NAME, OP
+
+# İstatistik yoksa kullanılan sabit tahminler (SQL Server'ın tahmin sabitlerine yakın)
+# Fixed guesses used without statistics (close to SQL Server's guess constants)
+RANGE_GUESS = 0.3
+BETWEEN_GUESS = 0.09
+LIKE_GUESS = 0.09
+NULL_GUESS = 0.1
+
+# Karar eşikleri: sayfa = 8 KB mantıksal okuma
+# Verdict thresholds: a page is one 8 KB logical read
+EXPENSIVE_PAGES = 100_000
+EXPENSIVE_ROWS = 1_000_000
+CHEAP_PAGES = 10_000
+# Bu boyutun altındaki tablolarda tahmin edilememiş predicate kararı değiştirmez
+# Below this size an unjudged predicate does not change the verdict
+SMALL_TABLE_ROWS = 100_000
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+UNKNOWN = "unknown"
+
+NEGATED_OPS = {"<>": "=", "not in": "in", "not like": "like", "not between": "between", "is not null": "is null"}
+# Tek taraflı aralık operatörleri: (alt sınır mı, sınır dahil mi)
+# One-sided range operators: (is a lower bound, bound included)
+RANGE_BOUNDS = {"<": (False, False), "!>": (False, True), "<=": (False, True),
+                ">": (True, False), "!<": (True, True), ">=": (True, True)}
+# Dönen satırı sınırlayan toplama fonksiyonları / aggregate functions that bound the returned rows
+AGGREGATE_FUNCTIONS = frozenset(["count", "count_big", "sum", "avg", "min", "max", "stdev", "stdevp", "var", "varp",
+                                 "string_agg", "checksum_agg", "grouping"])
+
+
+# ---------------------------------------------------------------------------
+# Histogram işlemleri / histogram operations
+# ---------------------------------------------------------------------------
+
+# Literal değeri histogram anahtarıyla karşılaştırılabilir hale getirir; uyumsuzsa None
+# Makes a literal comparable with the histogram keys; None when the types do not match
+def _comparable(kind, value):
+    if value is None:
+        return None
+    if kind == "n":
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if not isinstance(value, str):
+        return None
+    if kind == "d":
+        value = value.strip().replace(" ", "T")
+        return value + "T00:00:00" if len(value) == 10 else value
+    # Varsayılan harmanlama büyük/küçük harf duyarsızdır
+    # The default collation is case-insensitive
+    return value.casefold()
+
+
+def _step_key(step):
+    key = step[0]
+    if key is None:
+        return None, None
+    kind, value = key
+    return kind, (value.casefold() if kind == "s" else value)
+
+
+def histogram_rows(histogram):
+    return sum(step[1] + step[2] for step in histogram["steps"]) or histogram["rows"]
+
+
+# Tüm yoğunluk: 1 / farklı değer sayısı (adım anahtarları + adım arası farklı değerler)
+# All density: 1 / distinct values (step keys + distinct values between steps)
+def histogram_density(histogram):
+    distinct = sum((1 if step[2] else 0) + step[3] for step in histogram["steps"])
+    return 1.0 / distinct if distinct else 1.0
+
+
+def _null_rows(histogram):
+    steps = histogram["steps"]
+    return steps[0][2] if steps and steps[0][0] is None else 0.0
+
+
+def _key_kind(histogram):
+    for step in histogram["steps"]:
+        if step[0] is not None:
+            return step[0][0]
+    return None
+
+
+def _equal_rows(histogram, value):
+    if value is None:
+        return _null_rows(histogram)
+    previous = None
+    for step in histogram["steps"]:
+        kind, key = _step_key(step)
+        if key is None:
+            continue
+        if value == key:
+            return step[2]
+        if value < key:
+            # Adım aralığında: ortalama aralık satırı / inside the step range: average range rows
+            if step[3]:
+                return step[1] / step[3]
+            return step[1] if previous is not None else 0.0
+        previous = key
+    # Histogramın üstünde (artan anahtar): yoğunluk tahmini
+    # Above the histogram (ascending key): density estimate
+    return histogram_rows(histogram) * histogram_density(histogram) if histogram["modification_counter"] else 0.0
+
+
+def _rows_below(histogram, value, inclusive):
+    rows = 0.0
+    previous = None
+    for step in histogram["steps"]:
+        kind, key = _step_key(step)
+        if key is None:
+            continue
+        if value > key:
+            rows += step[1] + step[2]
+        elif value == key:
+            rows += step[1] + (step[2] if inclusive else 0.0)
+            return rows
+        else:
+            if previous is None:
+                return rows
+            # Adım içinde doğrusal dağılım; sayısal olmayan anahtarlarda yarısı
+            # Linear spread inside the step; half of it for non-numeric keys
+            if kind == "n" and key != previous:
+                fraction = (value - previous) / (key - previous)
+            else:
+                fraction = 0.5
+            return rows + step[1] * fraction
+        previous = key
+    return rows
+
+
+# Tek predicate için seçicilik; dönüş (seçicilik, yöntem) - yöntem "guess" ise istatistikle yargılanmamıştır
+# Selectivity of one predicate; returns (selectivity, method) - "guess" means it was not judged from statistics
+def predicate_selectivity(predicate, histogram, row_count):
+    op = predicate.op
+    if op in NEGATED_OPS:
+        selectivity, method = predicate_selectivity(predicate._replace(op=NEGATED_OPS[op]), histogram, row_count)
+        return max(0.0, 1.0 - selectivity), method
+
+    if histogram is None or not histogram["steps"]:
+        if op == "=" or op == "in":
+            return min(1.0, max(len(predicate.values), 1) * max(row_count, 1) ** -0.5), "guess"
+        if op == "is null":
+            return NULL_GUESS, "guess"
+        if op == "between":
+            return BETWEEN_GUESS, "guess"
+        if op == "like":
+            return LIKE_GUESS, "guess"
+        return RANGE_GUESS, "guess"
+
+    total = histogram_rows(histogram)
+    kind = _key_kind(histogram)
+
+    if op == "is null":
+        return _null_rows(histogram) / total, "histogram"
+
+    if op in ("=", "in"):
+        rows = 0.0
+        method = "histogram"
+        for value in predicate.values or (None,):
+            comparable = _comparable(kind, value)
+            if comparable is None:
+                # Parametre/değişken: yoğunluk vektörü
+                # Parameter/variable: density vector
+                rows += total * histogram_density(histogram)
+                method = "density"
+            else:
+                rows += _equal_rows(histogram, comparable)
+        return min(1.0, rows / total), method
+
+    if op == "like":
+        pattern = predicate.values[0] if predicate.values else None
+        if not isinstance(pattern, str) or kind != "s":
+            return LIKE_GUESS, "guess"
+        prefix = pattern.split("%", 1)[0].split("_", 1)[0].split("[", 1)[0]
+        if not prefix:
+            return LIKE_GUESS, "guess"
+        low = prefix.casefold()
+        rows = _rows_below(histogram, low + "\uffff", True) - _rows_below(histogram, low, False)
+        return max(0.0, min(1.0, rows / total)), "histogram"
+
+    if op == "between":
+        low, high = (_comparable(kind, value) for value in predicate.values)
+        if low is None or high is None:
+            return BETWEEN_GUESS, "guess"
+        rows = _rows_below(histogram, high, True) - _rows_below(histogram, low, False)
+        return max(0.0, min(1.0, rows / total)), "histogram"
+
+    value = _comparable(kind, predicate.values[0] if predicate.values else None)
+    if value is None:
+        return RANGE_GUESS, "guess"
+    non_null = total - _null_rows(histogram)
+    if op in ("<", "!>"):
+        rows = _rows_below(histogram, value, op == "!>")
+    elif op == "<=":
+        rows = _rows_below(histogram, value, True)
+    elif op in (">", "!<"):
+        rows = non_null - _rows_below(histogram, value, op == ">")
+    elif op == ">=":
+        rows = non_null - _rows_below(histogram, value, False)
+    else:
+        return RANGE_GUESS, "guess"
+    return max(0.0, min(1.0, rows / total)), "histogram"
+
+
+# Aynı kolondaki alt/üst sınırlar tek aralıktır; low/high: (değer, dahil mi) veya None
+# Lower/upper bounds on the same column form one interval; low/high: (value, included) or None
+def range_selectivity(histogram, low, high):
+    total = histogram_rows(histogram)
+    upper = _rows_below(histogram, high[0], high[1]) if high is not None else total - _null_rows(histogram)
+    lower = _rows_below(histogram, low[0], not low[1]) if low is not None else 0.0
+    return max(0.0, min(1.0, (upper - lower) / total))
+
+
+def _tighter(current, bound, lower):
+    # Alt sınırda büyük, üst sınırda küçük değer; eşitse dahil olmayan daha dardır
+    # The larger value for a lower bound, the smaller for an upper one; on a tie the excluded bound is tighter
+    if current is None:
+        return bound
+    if bound[0] == current[0]:
+        return bound if not bound[1] else current
+    return bound if (bound[0] > current[0]) == lower else current
+
+
+# Sorgu sonucu toplama ise (GROUP BY veya pencere olmayan toplama fonksiyonu) True
+# True when the query result is aggregated (GROUP BY, or an aggregate function that is not a window function)
+def _is_aggregate(parsed, tokens):
+    if parsed.group_by:
+        return True
+    for i, (kind, value) in enumerate(tokens):
+        if kind == NAME and value in AGGREGATE_FUNCTIONS and i + 1 < len(tokens) and tokens[i + 1] == (OP, "("):
+            depth = 0
+            for j in range(i + 1, len(tokens)):
+                if tokens[j] == (OP, "("):
+                    depth += 1
+                elif tokens[j] == (OP, ")"):
+                    depth -= 1
+                    if depth == 0:
+                        break
+            if not (j + 1 < len(tokens) and tokens[j + 1] == (NAME, "over")):
+                return True
+    return False
+
+
+# Üstel geri çekilme: en seçici predicate tam, sonrakiler giderek azalan kuvvetle çarpılır (CE 2014+)
+# Exponential backoff: the most selective predicate counts fully, the next ones with shrinking powers (CE 2014+)
+def combine_selectivities(selectivities):
+    combined = 1.0
+    for exponent, selectivity in enumerate(sorted(selectivities)[:4]):
+        combined *= selectivity ** (1.0 / (2 ** exponent))
+    return combined
+
+
+# ---------------------------------------------------------------------------
+# Sorgu tahmini / query estimate
+# ---------------------------------------------------------------------------
+
+def _column_stats(column_stats, table_key, column):
+    table = column_stats.get(table_key) if column_stats else None
+    return table["columns"].get(column) if table else None
+
+
+def _distinct(column_stats, table_key, column):
+    histogram = _column_stats(column_stats, table_key, column)
+    if histogram is None:
+        return None
+    return 1.0 / histogram_density(histogram)
+
+
+# Aynı tablodaki eşitlik kolonlarını kapsayan en geniş çok kolonlu yoğunluk (DBCC yoğunluk vektörü)
+# The widest multi-column density covering equality columns of the same table (DBCC density vector)
+def _multi_column_density(column_stats, table_key, equality_columns):
+    table = column_stats.get(table_key) if column_stats else None
+    best = None
+    for key, density in (table or {}).get("densities", {}).items():
+        columns = key.split(",")
+        if len(columns) > 1 and set(columns) <= equality_columns and (best is None or len(columns) > len(best[0])):
+            best = (columns, density)
+    return best
+
+
+def _leading_columns(meta):
+    return {index_def["key_columns"][0] for index_def in meta["indexes"] if index_def["key_columns"]}
+
+
+# ORDER BY'ın ilk kolonu sürücü tablodaki bir indeksin ilk anahtarıysa sıralama gerekmez
+# No sort is needed when the first ORDER BY column is the leading key of an index on the driving table
+def _order_supported(parsed, name, table):
+    column = parsed.order_by[0]
+    owner = parsed.table_for(column.qualifier)
+    return (owner is None or owner == name) and column.column in _leading_columns(table["meta"])
+
+
+# Histogramla yargılanabilen aralık predicate'ini kolonun sınırlarına ekler; eklendiyse True
+# Adds a range predicate that the histogram can judge to the column's bounds; True when added
+def _add_bounds(bounds, predicate, histogram):
+    if histogram is None or not histogram["steps"] or predicate.op not in RANGE_BOUNDS and predicate.op != "between":
+        return False
+    kind = _key_kind(histogram)
+    values = [_comparable(kind, value) for value in predicate.values]
+    if not values or None in values:
+        return False
+    current = bounds.get(predicate.column.column)
+    _, ops, low, high = current if current is not None else (histogram, [], None, None)
+    if predicate.op == "between":
+        low = _tighter(low, (values[0], True), True)
+        high = _tighter(high, (values[1], True), False)
+    else:
+        lower, included = RANGE_BOUNDS[predicate.op]
+        if lower:
+            low = _tighter(low, (values[0], included), True)
+        else:
+            high = _tighter(high, (values[0], included), False)
+    bounds[predicate.column.column] = (histogram, ops + [predicate.op], low, high)
+    return True
+
+
+# Sorguyu çalıştırmadan satır, okunan satır/sayfa ve maliyet kararı tahmin eder.
+# Estimates rows, scanned rows/pages and a cost verdict without executing the query.
+# column_stats: table_stats_cache.get_cached_column_statistics çıktısı / output of get_cached_column_statistics
+# Karar / verdict: cheap, expensive veya / or unknown (çalıştırılması gereken sorgular / queries that need execution)
+def estimate_query(query, metadata, column_stats=None, default_db=None):
+    catalog = as_catalog(metadata)
+    parsed = parse_query(query)
+    reasons = []
+
+    tokens = tokenize(query)
+    words = [value for kind, value in tokens if kind == NAME]
+    if "or" in words:
+        reasons.append("OR predicates are not combined by the estimator")
+    if words.count("select") > 1:
+        reasons.append("subqueries / set operations are not estimated")
+    if parsed.statement_count > 1:
+        reasons.append("multi-statement batch")
+
+    # Bu nedenler karar ne olursa olsun tahmini geçersiz kılar (pahalı da denemez)
+    # These reasons void the estimate whatever it says (it cannot be called expensive either)
+    unjudged = []
+    tables = {}
+    for ref in parsed.tables:
+        if ref.kind != "table":
+            reasons.append(f"{ref.kind} source '{ref.name}' has no metadata")
+            continue
+        if ref.name in tables:
+            continue
+        row = catalog.resolve_row(ref.name, default_db)
+        if row is None:
+            reasons.append(f"table '{ref.name}' is not in the metadata")
+            tables[ref.name] = None
+            continue
+        meta = catalog.record(row)
+        tables[ref.name] = {
+            "table": catalog.key_of(row), "meta": meta, "row_count": meta["row_count"],
+            "predicates": [], "selectivities": [], "seek_selectivities": [], "guessed": False, "bounds": {}
+        }
+
+    join_predicates = []
+    for predicate in parsed.predicates:
+        if predicate.clause not in ("where", "on"):
+            continue
+        if predicate.negated:
+            unjudged.append(f"predicate on '{predicate.column.column}' is under a prefix NOT")
+            continue
+        name = parsed.table_for(predicate.column.qualifier)
+        if predicate.right is not None:
+            right = parsed.table_for(predicate.right.qualifier)
+            if name and right and name != right and predicate.op == "=":
+                join_predicates.append((name, predicate.column.column, right, predicate.right.column))
+            continue
+        table = tables.get(name)
+        if table is None:
+            if name is None:
+                reasons.append(f"column '{predicate.column.column}' could not be tied to a table")
+            continue
+        histogram = _column_stats(column_stats, table["table"], predicate.column.column)
+        if _add_bounds(table["bounds"], predicate, histogram):
+            continue
+        selectivity, method = predicate_selectivity(predicate, histogram, table["row_count"])
+        table["predicates"].append({
+            "column": predicate.column.column, "op": predicate.op,
+            "selectivity": round(selectivity, 6), "method": method
+        })
+        table["selectivities"].append((predicate.column.column if predicate.op == "=" else None, selectivity))
+        if predicate.column.column in _leading_columns(table["meta"]) and predicate.op not in NEGATED_OPS:
+            table["seek_selectivities"].append(selectivity)
+        if method == "guess":
+            table["guessed"] = True
+
+    # Aynı kolondaki aralık predicate'leri tek aralık olarak değerlendirilir (bağımsız sayılmaz)
+    # Range predicates on the same column are estimated as one interval (not as independent filters)
+    for table in tables.values():
+        if table is None:
+            continue
+        for column, (histogram, ops, low, high) in table["bounds"].items():
+            selectivity = range_selectivity(histogram, low, high)
+            table["predicates"].append({
+                "column": column, "op": " and ".join(ops), "selectivity": round(selectivity, 6), "method": "histogram"
+            })
+            table["selectivities"].append((None, selectivity))
+            if column in _leading_columns(table["meta"]):
+                table["seek_selectivities"].append(selectivity)
+
+    # Filtrelenmiş satırlar ve erişim yolu
+    # Filtered rows and access path
+    for table in tables.values():
+        if table is None:
+            continue
+        # Kolonlar arası korelasyon yoğunluk vektöründen gelir; kalanlar geri çekilme ile birleşir
+        # Cross-column correlation comes from the density vector; the rest is combined with backoff
+        equality_columns = {column for column, _ in table["selectivities"] if column}
+        multi = _multi_column_density(column_stats, table["table"], equality_columns)
+        if multi is None:
+            table["selectivity"] = combine_selectivities([sel for _, sel in table["selectivities"]])
+        else:
+            rest = [sel for column, sel in table["selectivities"] if column not in multi[0]]
+            table["selectivity"] = multi[1] * combine_selectivities(rest)
+        table["filtered_rows"] = table["row_count"] * table["selectivity"]
+        if table["seek_selectivities"]:
+            table["access"] = "seek"
+            table["rows_scanned"] = table["row_count"] * min(table["seek_selectivities"])
+        else:
+            table["access"] = "scan"
+            table["rows_scanned"] = table["row_count"]
+        if table["guessed"] and table["row_count"] >= SMALL_TABLE_ROWS:
+            # Tahmin (sabit oran) hem satır hem okuma sayısını belirler; pahalı da denemez
+            # A guess (fixed ratio) decides both rows and reads; it cannot be called expensive either
+            unjudged.append(f"no statistics for a predicate on large table '{table['table']}'")
+
+    # Join kardinalitesi: |A| x |B| / max(farklı A, farklı B) (kapsama varsayımı)
+    # Join cardinality: |A| x |B| / max(distinct A, distinct B) (containment assumption)
+    join_kinds = {join.table.name: join.kind for join in parsed.joins}
+    order = [name for name, table in tables.items() if table is not None]
+    cardinality = tables[order[0]]["filtered_rows"] if order else 0.0
+    joined = set(order[:1])
+    for name in order[1:]:
+        table = tables[name]
+        links = [p for p in join_predicates
+                 if (p[0] == name and p[2] in joined) or (p[2] == name and p[0] in joined)]
+        if not links:
+            if "cross" not in join_kinds.get(name, ""):
+                reasons.append(f"no join predicate for '{table['table']}'")
+            cardinality *= table["filtered_rows"]
+        else:
+            best = None
+            for left, left_column, right, right_column in links:
+                this_column, other, other_column = (left_column, right, right_column) if left == name else \
+                    (right_column, left, left_column)
+                other_table = tables[other]
+                this_distinct = _distinct(column_stats, table["table"], this_column)
+                other_distinct = _distinct(column_stats, other_table["table"], other_column)
+                # İstatistik yoksa büyük taraf anahtar kabul edilir (FK -> PK)
+                # Without statistics the larger side is assumed to be the key (FK -> PK)
+                distinct = max(this_distinct or table["row_count"], other_distinct or other_table["row_count"], 1)
+                best = distinct if best is None else max(best, distinct)
+                if this_column in _leading_columns(table["meta"]) and table["access"] == "scan":
+                    # Join kolonunda index: iç tarafta seek
+                    # Index on the join column: seeks on the inner side
+                    table["access"] = "seek (join)"
+                    table["rows_scanned"] = min(table["row_count"], cardinality * table["row_count"] / distinct)
+            estimated = cardinality * table["filtered_rows"] / best
+            if join_kinds.get(name, "").startswith(("left", "right", "full")):
+                estimated = max(estimated, cardinality)
+            cardinality = estimated
+        joined.add(name)
+
+    # TOP: ORDER BY yoksa (veya sırayı sürücü tablonun indeksi veriyorsa) okuma n satır bulununca durur;
+    # aksi halde tüm girdi okunup sıralanır ve maliyet sıralamaya bağlıdır
+    # TOP: without ORDER BY (or when an index of the driving table supplies the order) reading stops after n rows;
+    # otherwise the whole input is read and sorted and the cost depends on the sort
+    top = parsed.top if isinstance(parsed.top, (int, float)) and not isinstance(parsed.top, bool) else None
+    top_sort = False
+    if top is not None and order:
+        if parsed.order_by and not _order_supported(parsed, order[0], tables[order[0]]):
+            top_sort = True
+        elif cardinality > top:
+            fraction = top / cardinality
+            for position, name in enumerate(order):
+                table = tables[name]
+                if position == 0 or table["access"] != "scan":
+                    table["rows_scanned"] = min(table["rows_scanned"], max(table["rows_scanned"] * fraction, top))
+        cardinality = min(cardinality, top)
+
+    # Toplama sorgusu girdiden çok daha az satır döndürür: GROUP BY yoksa tek satır,
+    # varsa grup kolonlarının farklı değer sayılarının çarpımı (bilinmiyorsa karar sayfalara dayanır)
+    # An aggregate returns far fewer rows than it reads: one row without GROUP BY, otherwise
+    # the product of the distinct counts of the group columns (when unknown the verdict rests on pages)
+    aggregate = _is_aggregate(parsed, tokens)
+    if aggregate and order:
+        groups = 1.0
+        for column in parsed.group_by:
+            name = parsed.table_for(column.qualifier)
+            distinct = _distinct(column_stats, tables[name]["table"], column.column) if tables.get(name) else None
+            if distinct is None:
+                groups = None
+                break
+            groups *= distinct
+        if groups is not None:
+            cardinality = min(cardinality, groups)
+
+    table_rows = []
+    rows_scanned = pages_scanned = 0.0
+    for table in tables.values():
+        if table is None:
+            continue
+        pages = estimated_pages(table["meta"]) * (table["rows_scanned"] / table["row_count"] if table["row_count"] else 0)
+        rows_scanned += table["rows_scanned"]
+        pages_scanned += pages
+        table_rows.append({
+            "table": table["table"], "row_count": table["row_count"],
+            "selectivity": round(table["selectivity"], 6), "filtered_rows": round(table["filtered_rows"]),
+            "access": table["access"], "rows_scanned": round(table["rows_scanned"]),
+            "pages_scanned": round(pages), "predicates": table["predicates"]
+        })
+
+    findings = []
+    if unjudged:
+        verdict = UNKNOWN
+        findings.append("🧮 The estimator cannot judge this query (" + "; ".join(dict.fromkeys(unjudged)) +
+                        "). Execute it to measure.")
+    elif top_sort and pages_scanned > EXPENSIVE_PAGES:
+        verdict = UNKNOWN
+        findings.append(f"🧮 TOP {top:,} with ORDER BY reads and sorts ~{pages_scanned:,.0f} pages unless an index "
+                        f"supplies the order: execute it to measure.")
+    elif pages_scanned > EXPENSIVE_PAGES or (cardinality > EXPENSIVE_ROWS and not aggregate):
+        verdict = EXPENSIVE
+        findings.append(f"🧮 Estimated {pages_scanned:,.0f} pages ({rows_scanned:,.0f} rows) read and "
+                        f"{cardinality:,.0f} rows returned: likely expensive, execution not needed to tell.")
+        for table in table_rows:
+            if table["access"] == "scan" and table["pages_scanned"] > EXPENSIVE_PAGES / 10:
+                findings.append(f"🧮 Full scan of {table['table']} (~{table['pages_scanned']:,} pages).")
+    elif reasons:
+        verdict = UNKNOWN
+        findings.append("🧮 The estimator cannot judge this query (" + "; ".join(dict.fromkeys(reasons)) +
+                        "). Execute it to measure.")
+    elif pages_scanned < CHEAP_PAGES:
+        verdict = CHEAP
+        findings.append(f"🧮 Estimated {pages_scanned:,.0f} pages read, {cardinality:,.0f} rows returned: cheap.")
+    else:
+        verdict = UNKNOWN
+        findings.append(f"🧮 Estimated {pages_scanned:,.0f} pages read: borderline, execute it to measure.")
+
+    return {
+        "status": "success",
+        "verdict": verdict,
+        "estimated_rows": round(cardinality),
+        "rows_scanned": round(rows_scanned),
+        "pages_scanned": round(pages_scanned),
+        "tables": table_rows,
+        "reasons": list(dict.fromkeys(unjudged + reasons)),
+        "findings": findings
+    }
@@ -0,0 +1,788 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# ---------------------------------------------------------------------------
+# Tokenizer (tek geçiş / single pass)
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<string>[Nn]?'(?:[^']|'')*'?)
+  | (?P<bracket>\[(?:[^\]]|\]\])*\]?)
+  | (?P<quoted>"(?:[^"]|"")*"?)
+  | (?P<number>0[xX][0-9a-fA-F]*|(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<variable>@@?[\w@$\#]*)
+  | (?P<name>[^\W\d][\w@$\#]*|\#{1,2}[\w@$\#]*)
+  | (?P<op><>|!=|>=|<=|!<|!>|\|\||[-+*/%=<>(),.;~&|^!:])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_BLOCK_COMMENT_RE = re.compile(r"/\*|\*/")
+
+# Token türleri / token kinds
+NAME = "name"            # kelime veya anahtar kelime / identifier or keyword
+QUOTED_NAME = "qname"    # [ad] veya "ad" / [name] or "name"
+STRING = "string"
+NUMBER = "number"
+VARIABLE = "variable"
+OP = "op"
+OTHER = "other"
+
+NAME_KINDS = (NAME, QUOTED_NAME)
+
+Token = namedtuple("Token", ["kind", "value"])
+
+
+def _skip_block_comment(query, pos):
+    # T-SQL blok yorumları iç içe olabilir
+    # T-SQL block comments can be nested
+    depth = 1
+    pos += 2
+    while depth:
+        match = _BLOCK_COMMENT_RE.search(query, pos)
+        if match is None:
+            return len(query)
+        depth += 1 if match.group() == "/*" else -1
+        pos = match.end()
+    return pos
+
+
+# Yorumları ve boşlukları atar; isimler küçük harfe, literaller çözülmüş değere çevrilir.
+# Drops comments and whitespace; names are lower-cased, literals unescaped.
+# raw_literals=True: string literalleri olduğu gibi (N öneki ve tırnaklarla) kalır
+# raw_literals=True: string literals are kept verbatim (with N prefix and quotes)
+# keep_case=True: isimler küçük harfe çevrilmez (token dizisi aynı kalır)
+# keep_case=True: names are not lower-cased (the token sequence stays the same)
+def tokenize(query, raw_literals=False, keep_case=False):
+    fold = (lambda text: text) if keep_case else str.lower
+    tokens = []
+    append = tokens.append
+    match = _TOKEN_RE.match
+    pos = 0
+    length = len(query)
+    while pos < length:
+        m = match(query, pos)
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "block_comment":
+            pos = _skip_block_comment(query, pos)
+            continue
+        pos = m.end()
+        if kind == "ws" or kind == "line_comment":
+            continue
+        if kind == "name":
+            append(Token(NAME, fold(text)))
+        elif kind == "bracket":
+            append(Token(QUOTED_NAME, fold(text[1:-1 if text.endswith("]") else None].replace("]]", "]"))))
+        elif kind == "quoted":
+            append(Token(QUOTED_NAME, fold(text[1:-1 if len(text) > 1 and text.endswith('"') else None].replace('""', '"'))))
+        elif kind == "string" and raw_literals:
+            append(Token(STRING, text))
+        elif kind == "string":
+            start = 2 if text[0] in "Nn" else 1
+            end = -1 if len(text) > start and text.endswith("'") else None
+            append(Token(STRING, text[start:end].replace("''", "'")))
+        elif kind == "number":
+            append(Token(NUMBER, text))
+        elif kind == "variable":
+            append(Token(VARIABLE, text.lower()))
+        elif kind == "op":
+            append(Token(OP, text))
+        else:
+            append(Token(OTHER, text))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# Hafif AST / lightweight AST
+# ---------------------------------------------------------------------------
+
+# kind: table, function, temp, variable, cte, derived
+# clause: from, join, apply, target
+TableRef = namedtuple("TableRef", ["name", "alias", "kind", "clause"])
+ColumnRef = namedtuple("ColumnRef", ["qualifier", "column"])
+# op: =, <>, <, >, <=, >=, like, not like, in, not in, between, not between, is null, is not null
+# values: literal değerler (bilinmeyen: None) / literal values (unknown: None)
+# right: sütun=sütun karşılaştırmalarında sağ taraf / right side of column=column comparisons
+# negated: önek NOT altında (NOT x = 1, NOT (a = 1 AND b = 2)); op tek başına anlamı vermez
+# negated: under a prefix NOT (NOT x = 1, NOT (a = 1 AND b = 2)); op alone does not give the meaning
+Predicate = namedtuple("Predicate", ["clause", "column", "op", "values", "right", "negated"], defaults=(False,))
+# kind: JOIN/APPLY önündeki sözcükler ("left outer", "cross apply"); table: tablo, TVF veya türetilmiş tablo
+# kind: the words before JOIN/APPLY ("left outer", "cross apply"); table: a table, TVF or derived table
+Join = namedtuple("Join", ["kind", "table"])
+
+KEYWORDS = frozenset("""
+    add all alter and any apply as asc authorization backup begin between break browse bulk by cascade case
+    check checkpoint close clustered coalesce collate column commit compute constraint contains containstable
+    continue convert create cross current current_date current_time current_timestamp current_user cursor
+    database dbcc deallocate declare default delete deny desc distinct distributed double drop dump else end
+    errlvl escape except exec execute exists exit external fetch file fillfactor for foreign freetext
+    freetexttable from full function go goto grant group hash having holdlock identity identity_insert
+    identitycol if in index inner insert intersect into is join key kill left like lineno load loop merge
+    national nocheck nolock nonclustered not null nullif of off offset offsets on open opendatasource
+    openquery openrowset openxml option or order outer over percent pivot plan primary print proc procedure
+    public raiserror read readtext reconfigure references remote replication restore restrict return revert
+    revoke right rollback rowcount rowguidcol rule save schema select semantickeyphrasetable
+    semanticsimilaritydetailstable semanticsimilaritytable session_user set setuser shutdown some statistics
+    system_user table tablesample textsize then ties to top tran transaction trigger truncate try_convert
+    tsequal union unique unpivot update updatetext use user using values varying view waitfor when where
+    while with within writetext fetch next rows only
+""".split())
+
+JOIN_MODIFIERS = frozenset(["inner", "left", "right", "full", "outer", "cross", "loop", "hash", "merge", "remote"])
+CLAUSE_ENDERS = frozenset([
+    "where", "group", "having", "order", "union", "except", "intersect", "option", "for", "on",
+    "join", "inner", "left", "right", "full", "cross", "outer", "select", "set", "output", "when", "offset"
+])
+COMPARISON_OPS = frozenset(["=", "<>", "!=", "<", ">", "<=", ">=", "!<", "!>"])
+PREDICATE_CLAUSES = frozenset(["where", "on", "having"])
+
+
+def _literal_value(token):
+    if token.kind == NUMBER:
+        text = token.value
+        if text[:2].lower() == "0x":
+            return text
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    if token.kind == STRING:
+        return token.value
+    return None
+
+
+def _is_literal(token):
+    return token.kind in (NUMBER, STRING, VARIABLE) or (token.kind == NAME and token.value == "null")
+
+
+def _is_identifier(token):
+    return token.kind == QUOTED_NAME or (token.kind == NAME and token.value not in KEYWORDS)
+
+
+class ParsedQuery:
+    __slots__ = (
+        "tables", "ctes", "aliases", "predicates", "joins", "top", "order_by", "group_by",
+        "select_columns", "select_star", "has_where", "statement_count", "token_count"
+    )
+
+    def __init__(self):
+        self.tables = []
+        self.ctes = set()
+        self.aliases = {}
+        self.predicates = []
+        self.joins = []
+        self.top = None
+        self.order_by = []
+        self.group_by = []
+        # SELECT listesindeki düz kolon başvuruları (ifade ve fonksiyon argümanları hariç)
+        # Plain column references of the SELECT list (no expressions or function arguments)
+        self.select_columns = []
+        self.select_star = False
+        self.has_where = False
+        self.statement_count = 0
+        self.token_count = 0
+
+    # Metadata kontrolleri için kalıcı tablo adları (CTE, geçici tablo ve fonksiyon hariç, tekil)
+    # Permanent table names for metadata checks (no CTEs, temp tables or functions, unique)
+    def table_names(self):
+        seen = OrderedDict()
+        for table in self.tables:
+            if table.kind == "table":
+                seen.setdefault(table.name, None)
+        return list(seen)
+
+    # Sütun niteleyicisini (alias veya tablo adı) tablo adına çözer
+    # Resolves a column qualifier (alias or table name) to a table name
+    def table_for(self, qualifier):
+        if qualifier is None:
+            names = self.table_names()
+            return names[0] if len(names) == 1 else None
+        table = self.aliases.get(qualifier)
+        if table is not None:
+            return table.name if table.kind == "table" else None
+        for table in self.tables:
+            if table.kind == "table" and table.name.rsplit(".", 1)[-1] == qualifier:
+                return table.name
+        return None
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.n = len(tokens)
+        self.result = ParsedQuery()
+        self.result.token_count = self.n
+        # Her parantez derinliği için aktif clause
+        # Active clause for every parenthesis depth
+        self.clauses = ["none"]
+        # Kapanışta alias okunacak derinlikler (türetilmiş tablo, TVF) ve JOIN/APPLY türü (yoksa None)
+        # Depths whose closing parenthesis is followed by an alias (derived table, TVF) and the JOIN/APPLY kind (or None)
+        self.alias_after_close = []
+        self.join_modifiers = []
+        # Önek NOT: sıradaki tek predicate veya NOT ( ... ) grubunun parantez derinlikleri
+        # Prefix NOT: the next single predicate, or the parenthesis depths of NOT ( ... ) groups
+        self.pending_not = False
+        self.not_depths = []
+
+    # -- yardımcılar / helpers ------------------------------------------------
+
+    def _tok(self, i):
+        return self.tokens[i] if i < self.n else Token(OTHER, "")
+
+    def _is_kw(self, i, *words):
+        token = self._tok(i)
+        return token.kind == NAME and token.value in words
+
+    def _is_op(self, i, value):
+        token = self._tok(i)
+        return token.kind == OP and token.value == value
+
+    def _read_name(self, i):
+        if self._tok(i).kind not in NAME_KINDS and self._tok(i).kind != VARIABLE:
+            return None, i
+        parts = [self.tokens[i].value]
+        i += 1
+        while self._is_op(i, "."):
+            i += 1
+            if self._tok(i).kind in NAME_KINDS:
+                parts.append(self.tokens[i].value)
+                i += 1
+            else:
+                parts.append("")
+        return parts, i
+
+    def _skip_parens(self, i):
+        # i '(' üzerinde; eşleşen ')' sonrasını döndürür
+        # i is on '('; returns the index after the matching ')'
+        depth = 0
+        while i < self.n:
+            token = self.tokens[i]
+            if token.kind == OP and token.value == "(":
+                depth += 1
+            elif token.kind == OP and token.value == ")":
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return i
+
+    def _read_alias(self, i):
+        if self._is_kw(i, "as"):
+            i += 1
+            token = self._tok(i)
+            if token.kind in NAME_KINDS or token.kind == STRING:
+                return token.value, i + 1
+            return None, i
+        if _is_identifier(self._tok(i)):
+            return self.tokens[i].value, i + 1
+        return None, i
+
+    def _skip_table_hints(self, i):
+        if self._is_kw(i, "with") and self._is_op(i + 1, "("):
+            return self._skip_parens(i + 1)
+        return i
+
+    # -- tablo kaynakları / table sources --------------------------------------
+
+    def _join_kind(self, clause):
+        return (" ".join(self.join_modifiers) or "inner") if clause in ("join", "apply") else None
+
+    def _table_source(self, i, clause):
+        token = self._tok(i)
+        if token.kind == OP and token.value == "(":
+            # Türetilmiş tablo: alias (ve join kaydı) kapanış parantezinden sonra gelir
+            # Derived table: the alias (and the join record) follows the closing parenthesis
+            self.alias_after_close.append((len(self.clauses), self._join_kind(clause)))
+            return i
+
+        parts, j = self._read_name(i)
+        if parts is None or (token.kind == NAME and token.value in KEYWORDS):
+            return i
+
+        name = ".".join(parts)
+        if token.kind == VARIABLE:
+            kind = "variable"
+        elif parts[-1].startswith("#"):
+            kind = "temp"
+        elif self._is_op(j, "(") and clause != "target":
+            kind = "function"
+        elif len(parts) == 1 and name in self.result.ctes:
+            kind = "cte"
+        else:
+            kind = "table"
+
+        if kind == "function":
+            table = TableRef(name, None, kind, clause)
+            self.result.tables.append(table)
+            join_kind = self._join_kind(clause)
+            if join_kind is not None:
+                self.result.joins.append(Join(join_kind, table))
+            self.alias_after_close.append((len(self.clauses), None))
+            return j
+
+        if clause == "target" and self._is_op(j, "("):
+            # INSERT INTO t (kolonlar) / INSERT INTO t (columns)
+            self.result.tables.append(TableRef(name, None, kind, clause))
+            return self._skip_parens(j)
+        j = self._skip_table_hints(j)
+        alias, j = self._read_alias(j)
+        j = self._skip_table_hints(j)
+        table = TableRef(name, alias, kind, clause)
+        self.result.tables.append(table)
+        if alias:
+            self.result.aliases[alias] = table
+        join_kind = self._join_kind(clause)
+        if join_kind is not None:
+            self.result.joins.append(Join(join_kind, table))
+        return j
+
+    def _close_alias(self, i, join_kind):
+        # ')' sonrası türetilmiş tablo / TVF alias'ı
+        # Alias of a derived table / TVF after ')'
+        alias, j = self._read_alias(i)
+        if alias:
+            result = self.result
+            previous = result.tables[-1] if result.tables else None
+            if previous is not None and previous.kind == "function" and previous.alias is None:
+                table = previous._replace(alias=alias)
+                result.tables[-1] = table
+                # TVF join kaydı alias'lı tabloyu göstermeli / the TVF join record must point at the aliased table
+                if result.joins and result.joins[-1].table is previous:
+                    result.joins[-1] = result.joins[-1]._replace(table=table)
+            else:
+                table = TableRef(alias, alias, "derived", self.clauses[-1])
+                if join_kind is not None:
+                    result.joins.append(Join(join_kind, table))
+            result.aliases[alias] = table
+            # Kolon alias listesi: AS x(a, b)
+            # Column alias list: AS x(a, b)
+            if self._is_op(j, "("):
+                j = self._skip_parens(j)
+        return j
+
+    # -- predicate'ler / predicates ---------------------------------------------
+
+    def _predicate(self, i, clause):
+        parts, j = self._read_name(i)
+        if self._is_op(j, "("):
+            # Fonksiyon çağrısı, sütun değil
+            # Function call, not a column
+            return j
+        column = ColumnRef(".".join(parts[:-1]) or None, parts[-1])
+        token = self._tok(j)
+        op = None
+        values = ()
+        right = None
+
+        if token.kind == OP and token.value in COMPARISON_OPS:
+            op = "<>" if token.value == "!=" else token.value
+            j += 1
+            rhs = self._tok(j)
+            if rhs.kind == OP and rhs.value in "-+" and self._tok(j + 1).kind == NUMBER:
+                value = _literal_value(self.tokens[j + 1])
+                values = (-value if rhs.value == "-" and not isinstance(value, str) else value,)
+                j += 2
+            elif _is_literal(rhs):
+                values = (_literal_value(rhs),)
+                j += 1
+            elif _is_identifier(rhs):
+                rparts, k = self._read_name(j)
+                if not self._is_op(k, "("):
+                    right = ColumnRef(".".join(rparts[:-1]) or None, rparts[-1])
+                    j = k
+                else:
+                    values = (None,)
+            else:
+                values = (None,)
+        elif token.kind == NAME:
+            negate = token.value == "not"
+            k = j + 1 if negate else j
+            word = self._tok(k)
+            if word.kind == NAME and word.value == "like":
+                op = "not like" if negate else "like"
+                rhs = self._tok(k + 1)
+                values = (_literal_value(rhs) if _is_literal(rhs) else None,)
+                j = k + 2
+            elif word.kind == NAME and word.value == "in" and self._is_op(k + 1, "("):
+                op = "not in" if negate else "in"
+                if self._is_kw(k + 2, "select"):
+                    values = (None,)
+                    j = k + 1
+                else:
+                    end = self._skip_parens(k + 1)
+                    values = tuple(
+                        _literal_value(t) for t in self.tokens[k + 2:end - 1]
+                        if _is_literal(t)
+                    )
+                    j = end
+            elif word.kind == NAME and word.value == "between":
+                op = "not between" if negate else "between"
+                low, high = self._tok(k + 1), self._tok(k + 3)
+                if self._is_kw(k + 2, "and"):
+                    values = (
+                        _literal_value(low) if _is_literal(low) else None,
+                        _literal_value(high) if _is_literal(high) else None
+                    )
+                    j = k + 4
+                else:
+                    values = (None, None)
+                    j = k + 1
+            elif not negate and word.kind == NAME and word.value == "is":
+                if self._is_kw(k + 1, "not") and self._is_kw(k + 2, "null"):
+                    op, j = "is not null", k + 3
+                elif self._is_kw(k + 1, "null"):
+                    op, j = "is null", k + 2
+
+        negated = self.pending_not or bool(self.not_depths)
+        self.pending_not = False
+        if op is not None:
+            self.result.predicates.append(Predicate(clause, column, op, values, right, negated))
+        return j
+
+    # -- ana döngü / main loop ---------------------------------------------------
+
+    def parse(self):
+        tokens = self.tokens
+        result = self.result
+        i = 0
+        statement_open = False
+
+        while i < self.n:
+            token = tokens[i]
+            kind, value = token
+            clause = self.clauses[-1]
+
+            if kind == OP:
+                if value == "(":
+                    self.clauses.append(clause)
+                    i += 1
+                    continue
+                if value == ")":
+                    if len(self.clauses) > 1:
+                        self.clauses.pop()
+                    while self.not_depths and self.not_depths[-1] > len(self.clauses):
+                        self.not_depths.pop()
+                    i += 1
+                    if self.alias_after_close and self.alias_after_close[-1][0] == len(self.clauses):
+                        _, join_kind = self.alias_after_close.pop()
+                        i = self._close_alias(i, join_kind)
+                    continue
+                if value == ";":
+                    self.clauses[-1] = "none"
+                    self.pending_not = False
+                    statement_open = False
+                    i += 1
+                    continue
+                if value == "," and len(self.clauses) >= 1:
+                    if clause == "from":
+                        i = self._table_source(i + 1, "from")
+                        continue
+                    if clause == "cte":
+                        i = self._cte(i + 1)
+                        continue
+                if value == "*" and clause == "select":
+                    previous = tokens[i - 1] if i else None
+                    if previous is not None and (
+                        (previous.kind == NAME and previous.value in ("select", "distinct", "all"))
+                        or (previous.kind == OP and previous.value in (",", "."))
+                        or (previous.kind == NUMBER and self._is_kw(i - 2, "top"))
+                        or (previous.kind == OP and previous.value == ")" and self._top_before_paren(i - 1))
+                    ):
+                        result.select_star = True
+                i += 1
+                continue
+
+            if kind == NAME and value in KEYWORDS:
+                if not statement_open and value not in ("go",):
+                    result.statement_count += 1
+                    statement_open = True
+                i = self._keyword(i, value, clause)
+                continue
+
+            if kind in NAME_KINDS:
+                if clause in PREDICATE_CLAUSES:
+                    i = self._predicate(i, clause)
+                    continue
+                if clause == "select":
+                    i = self._select_column(i)
+                    continue
+                if clause in ("order_by", "group_by"):
+                    parts, j = self._read_name(i)
+                    if not self._is_op(j, "("):
+                        column = ColumnRef(".".join(parts[:-1]) or None, parts[-1])
+                        (result.order_by if clause == "order_by" else result.group_by).append(column)
+                    i = j
+                    continue
+            i += 1
+
+        return result
+
+    def _select_column(self, i):
+        # Yalnızca liste öğesinin tamamı olan kolon: "a", "t.a", "t.a AS x", "t.a x"
+        # Only a column that is a whole list item: "a", "t.a", "t.a AS x", "t.a x"
+        parts, j = self._read_name(i)
+        previous = self.tokens[i - 1] if i else None
+        starts_item = previous is not None and (
+            (previous.kind == NAME and previous.value in ("select", "distinct", "all"))
+            or (previous.kind == OP and previous.value == ",")
+            or (previous.kind == NUMBER and self._is_kw(i - 2, "top"))
+            or (previous.kind == OP and previous.value == ")" and self._top_before_paren(i - 1))
+        )
+        following = self._tok(j)
+        ends_item = (
+            following.kind == OTHER or (following.kind == OP and following.value in (",", ";"))
+            or (following.kind == NAME and following.value in ("from", "into", "as"))
+            or _is_identifier(following)
+        )
+        if starts_item and ends_item and parts[-1]:
+            self.result.select_columns.append(ColumnRef(".".join(parts[:-1]) or None, parts[-1]))
+        # Kolondan sonraki alias kolon sayılmaz / the alias after the column is not a column
+        if self._is_kw(j, "as") or (starts_item and ends_item and _is_identifier(following)):
+            _, j = self._read_alias(j)
+        return j
+
+    def _top_before_paren(self, close_index):
+        # "TOP (10) *" kalıbı / the "TOP (10) *" pattern
+        depth = 0
+        j = close_index
+        while j >= 0:
+            token = self.tokens[j]
+            if token.kind == OP and token.value == ")":
+                depth += 1
+            elif token.kind == OP and token.value == "(":
+                depth -= 1
+                if depth == 0:
+                    return self._is_kw(j - 1, "top")
+            j -= 1
+        return False
+
+    def _cte(self, i):
+        # ad [(kolonlar)] AS ( ... )
+        # name [(columns)] AS ( ... )
+        if not _is_identifier(self._tok(i)):
+            return i
+        name = self.tokens[i].value
+        j = i + 1
+        if self._is_op(j, "("):
+            j = self._skip_parens(j)
+        if self._is_kw(j, "as") and self._is_op(j + 1, "("):
+            self.result.ctes.add(name)
+            self.clauses[-1] = "cte"
+            return j + 1
+        return i + 1
+
+    def _keyword(self, i, value, clause):
+        result = self.result
+        if value == "select":
+            # EXISTS (SELECT * ...) kalıbı SELECT * uyarısı üretmez
+            # The EXISTS (SELECT * ...) idiom does not count as SELECT *
+            if self._is_op(i - 1, "(") and self._is_kw(i - 2, "exists"):
+                self.clauses[-1] = "exists_select"
+                return i + 1
+            self.clauses[-1] = "select"
+            j = i + 1
+            if self._is_kw(j, "distinct", "all"):
+                j += 1
+            if self._is_kw(j, "top"):
+                if self._is_op(j + 1, "("):
+                    inner = self._tok(j + 2)
+                    if result.top is None and inner.kind == NUMBER:
+                        result.top = _literal_value(inner)
+                elif self._tok(j + 1).kind == NUMBER and result.top is None:
+                    result.top = _literal_value(self.tokens[j + 1])
+            return i + 1
+        if value == "from":
+            self.clauses[-1] = "from"
+            self.join_modifiers = []
+            return self._table_source(i + 1, "from")
+        if value in JOIN_MODIFIERS and clause in ("from", "join", "apply", "on", "where"):
+            # JOIN'den önceki INNER/LEFT/CROSS/HASH vb.
+            # INNER/LEFT/CROSS/HASH etc. before JOIN
+            modifiers = []
+            j = i
+            while self._is_kw(j, *JOIN_MODIFIERS):
+                modifiers.append(self.tokens[j].value)
+                j += 1
+            if self._is_kw(j, "join"):
+                self.join_modifiers = modifiers
+                self.clauses[-1] = "join"
+                return self._table_source(j + 1, "join")
+            if self._is_kw(j, "apply"):
+                self.join_modifiers = modifiers + ["apply"]
+                self.clauses[-1] = "apply"
+                return self._table_source(j + 1, "apply")
+            return j
+        if value == "join":
+            self.join_modifiers = []
+            self.clauses[-1] = "join"
+            return self._table_source(i + 1, "join")
+        if value == "on":
+            self.clauses[-1] = "on"
+            return i + 1
+        if value == "where":
+            result.has_where = True
+            self.clauses[-1] = "where"
+            return i + 1
+        if value == "having":
+            self.clauses[-1] = "having"
+            return i + 1
+        if value in ("group", "order") and self._is_kw(i + 1, "by"):
+            self.clauses[-1] = "group_by" if value == "group" else "order_by"
+            return i + 2
+        if value in ("union", "except", "intersect", "option", "offset", "for"):
+            self.clauses[-1] = "none"
+            return i + 1
+        if value in ("update", "into", "using") or (value == "merge" and not self._is_kw(i + 1, "into")):
+            self.clauses[-1] = "target" if value != "using" else "from"
+            j = self._table_source(i + 1, "target" if value != "using" else "from")
+            return j
+        if value == "set" and clause == "target":
+            self.clauses[-1] = "none"
+            return i + 1
+        if value == "with" and clause in ("none", "cte"):
+            if self._is_kw(i + 1, "xmlnamespaces"):
+                return i + 1
+            return self._cte(i + 1)
+        if value == "not" and clause in PREDICATE_CLAUSES:
+            if self._is_op(i + 1, "("):
+                self.not_depths.append(len(self.clauses) + 1)
+            elif _is_identifier(self._tok(i + 1)):
+                self.pending_not = True
+            return i + 1
+        if value in ("and", "or", "not", "exists"):
+            return i + 1
+        if value == "go":
+            self.clauses = ["none"]
+            self.not_depths = []
+            self.pending_not = False
+            return i + 1
+        if value in CLAUSE_ENDERS:
+            return i + 1
+        return i + 1
+
+
+# ---------------------------------------------------------------------------
+# LRU parse cache (sorgu hash'i ile / keyed by query hash)
+# ---------------------------------------------------------------------------
+
+PARSE_CACHE_SIZE = 256
+
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+
+def query_hash(query):
+    return hashlib.blake2b(query.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+# Aynı metin tekrar parse edilmez; dönen nesne paylaşılır, değiştirilmemelidir.
+# The same text is never parsed twice; the returned object is shared and must not be mutated.
+def parse_query(query):
+    key = query_hash(query)
+    with _parse_cache_lock:
+        parsed = _parse_cache.get(key)
+        if parsed is not None:
+            _parse_cache.move_to_end(key)
+            return parsed
+
+    parsed = _Parser(tokenize(query)).parse()
+
+    with _parse_cache_lock:
+        _parse_cache[key] = parsed
+        _parse_cache.move_to_end(key)
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return parsed
+
+
+def clear_parse_cache():
+    with _parse_cache_lock:
+        _parse_cache.clear()
+
+
+def extract_tables_from_query(query):
+    return parse_query(query).table_names()
+
+
+# Parser'ın küçük harfli adları için sorgudaki yazılışları (ilk geçiş): {"dbo.orders": ["dbo", "Orders"]}
+# Büyük/küçük harf duyarlı harmanlamalarda sunucuya bu parçalar gönderilmelidir.
+# The spelling in the query of the parser's lower-cased names (first occurrence): {"dbo.orders": ["dbo", "Orders"]}
+# Under case-sensitive collations these parts must be sent to the server.
+def original_name_parts(query, names):
+    wanted = set(names)
+    folded = tokenize(query)
+    original = tokenize(query, keep_case=True)
+    found = {}
+    i = 0
+    while i < len(folded) and len(found) < len(wanted):
+        if folded[i].kind not in NAME_KINDS:
+            i += 1
+            continue
+        positions = [i]
+        j = i + 1
+        while j < len(folded) and folded[j] == (OP, "."):
+            j += 1
+            if j < len(folded) and folded[j].kind in NAME_KINDS:
+                positions.append(j)
+                j += 1
+            else:
+                positions.append(None)
+        name = ".".join(folded[k].value if k is not None else "" for k in positions)
+        if name in wanted and name not in found:
+            found[name] = [original[k].value if k is not None else "" for k in positions]
+        i = j
+    return found
+
+
+# Sorgudaki tanımlayıcıların yazılışı (ilk geçiş): {"orders": "Orders"}
+# Spelling of the identifiers in the query (first occurrence): {"orders": "Orders"}
+def identifier_spellings(query):
+    spellings = {}
+    for folded, original in zip(tokenize(query), tokenize(query, keep_case=True)):
+        if folded.kind in NAME_KINDS:
+            spellings.setdefault(folded.value, original.value)
+    return spellings
+
+
+# ---------------------------------------------------------------------------
+# Sorgu parmak izi / query fingerprint
+# ---------------------------------------------------------------------------
+
+# Yorum, boşluk ve büyük/küçük harf farklarını yok eder; keep_literals=False ise
+# literaller "?" olur ve IN listeleri tek "?" ye indirgenir.
+# Removes comment, whitespace and case differences; with keep_literals=False
+# literals become "?" and IN lists collapse to a single "?".
+# keep_literals=True plan önbelleği içindir: literal değer ve tipi plana etki eder
+# keep_literals=True is meant for plan caching: literal values and types affect the plan
+def fingerprint_query(query, keep_literals=False):
+    parts = []
+    append = parts.append
+    for kind, value in tokenize(query, raw_literals=keep_literals):
+        if kind == STRING or kind == NUMBER:
+            if keep_literals:
+                append(value)
+            elif len(parts) >= 2 and parts[-1] == "," and parts[-2] == "?":
+                parts.pop()
+            else:
+                append("?")
+        else:
+            append(value)
+    return " ".join(parts)
+
+
+def fingerprint_hash(query, keep_literals=False):
+    return query_hash(fingerprint_query(query, keep_literals)).hex()
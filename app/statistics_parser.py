@@ -0,0 +1,213 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import re
+
+from metadata_catalog import as_catalog, estimated_pages
+
+# Tüm desenler modül yüklenirken bir kez derlenir
+# All patterns are compiled once at import time
+_TABLE_RE = re.compile(r"Table '((?:[^']|'')*)'\.")
+_COUNTER_RE = re.compile(r"([A-Za-z][A-Za-z\- ]*?) (\d+)(?=[,.]|\s*$)")
+_PARSE_COMPILE_RE = re.compile(r"parse and compile time", re.IGNORECASE)
+_EXECUTION_TIMES_RE = re.compile(r"Execution Times", re.IGNORECASE)
+_TIME_RE = re.compile(r"CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+_ROWS_AFFECTED_RE = re.compile(r"\((\d+) rows? affected\)")
+# #temp______________0000000000A1 -> #temp
+_TEMP_SUFFIX_RE = re.compile(r"_{3,}[0-9A-Fa-f]+$")
+
+IO_COUNTERS = (
+    "scan_count", "logical_reads", "physical_reads", "page_server_reads", "read_ahead_reads",
+    "page_server_read_ahead_reads", "lob_logical_reads", "lob_physical_reads", "lob_page_server_reads",
+    "lob_read_ahead_reads", "lob_page_server_read_ahead_reads", "segment_reads", "segment_skipped"
+)
+WORK_TABLES = ("worktable", "workfile")
+
+# Metadata'da olmayan tablolar için mutlak eşikler (eski davranış)
+# Absolute thresholds for tables that are not in the metadata (previous behaviour)
+DEFAULT_READS_THRESHOLD = 1000
+CPU_THRESHOLD_MS = 500
+COMPILE_THRESHOLD_MS = 1000
+SCAN_COUNT_THRESHOLD = 1000
+# Okumalar tahmini tablo boyutunun bu oranını aşarsa tam tarama kabul edilir
+# Reads above this share of the estimated table size are treated as a full scan
+FULL_SCAN_RATIO = 0.5
+
+
+def _counter_key(label):
+    return label.strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def _clean_table_name(name):
+    name = name.replace("''", "'")
+    if name.startswith("#"):
+        name = _TEMP_SUFFIX_RE.sub("", name)
+    return name
+
+
+def _new_statement(index):
+    return {"index": index, "parse_cpu_ms": 0, "parse_elapsed_ms": 0, "cpu_ms": 0, "elapsed_ms": 0,
+            "rows_affected": None, "tables": []}
+
+
+# STATISTICS IO/TIME mesajlarını yapısal kayıtlara çevirir.
+# Turns STATISTICS IO/TIME messages into structured records.
+# Bir ifade "Execution Times" satırıyla kapanır; öncesindeki IO satırları o ifadeye aittir.
+# A statement is closed by its "Execution Times" line; the IO lines before it belong to it.
+def parse_statistics_messages(messages):
+    statements = []
+    current = _new_statement(0)
+    pending = None
+
+    for message in messages:
+        # Tek mesajda başlık ve süre satırı birlikte veya ayrı gelebilir
+        # Header and time line may come in one message or in separate ones
+        for line in message.splitlines():
+            table = _TABLE_RE.search(line)
+            if table:
+                name = _clean_table_name(table.group(1))
+                record = {"table": name, "temp": name.startswith("#"),
+                          "worktable": name.lower() in WORK_TABLES}
+                for label, value in _COUNTER_RE.findall(line[table.end():]):
+                    record[_counter_key(label)] = int(value)
+                for counter in IO_COUNTERS:
+                    record.setdefault(counter, 0)
+                current["tables"].append(record)
+                continue
+
+            if _PARSE_COMPILE_RE.search(line):
+                pending = "parse"
+            elif _EXECUTION_TIMES_RE.search(line):
+                pending = "execution"
+
+            times = _TIME_RE.search(line)
+            if times:
+                # Başlıksız süre satırı yürütme süresi sayılır
+                # A time line without a header counts as execution time
+                cpu_ms, elapsed_ms = int(times.group(1)), int(times.group(2))
+                if pending == "parse":
+                    current["parse_cpu_ms"] += cpu_ms
+                    current["parse_elapsed_ms"] += elapsed_ms
+                else:
+                    current["cpu_ms"] += cpu_ms
+                    current["elapsed_ms"] += elapsed_ms
+                    statements.append(current)
+                    current = _new_statement(len(statements))
+                pending = None
+                continue
+
+            affected = _ROWS_AFFECTED_RE.search(line)
+            if affected:
+                current["rows_affected"] = (current["rows_affected"] or 0) + int(affected.group(1))
+
+    # Süre satırı gelmeden kalan IO kayıtları (ör. iptal edilen sorgu)
+    # IO records left without a time line (e.g. a cancelled query)
+    if current["tables"] or current["parse_cpu_ms"] or current["parse_elapsed_ms"]:
+        statements.append(current)
+
+    tables = {}
+    for statement in statements:
+        for record in statement["tables"]:
+            aggregate = tables.get(record["table"])
+            if aggregate is None:
+                aggregate = {key: value for key, value in record.items()}
+                aggregate["statements"] = 0
+                tables[record["table"]] = aggregate
+            else:
+                for key, value in record.items():
+                    if isinstance(value, int) and not isinstance(value, bool):
+                        aggregate[key] = aggregate.get(key, 0) + value
+            aggregate["statements"] += 1
+
+    totals = {key: sum(s[key] for s in statements)
+              for key in ("parse_cpu_ms", "parse_elapsed_ms", "cpu_ms", "elapsed_ms")}
+    for counter in IO_COUNTERS:
+        totals[counter] = sum(t[counter] for t in tables.values())
+
+    return {"statements": statements, "tables": tables, "totals": totals}
+
+
+def _table_size(catalog, name, default_db):
+    if catalog is None or name.startswith("#") or name.lower() in WORK_TABLES:
+        return None
+    # STATISTICS IO şema yazmaz; belirsiz adda varsayılan veritabanı tercih edilir
+    # STATISTICS IO prints no schema; ambiguous names prefer the default database
+    row = catalog.resolve_row(name, default_db)
+    if row is None:
+        return None
+    meta = catalog.record(row)
+    return {"row_count": meta["row_count"], "estimated_pages": estimated_pages(meta)}
+
+
+def _finding(severity, kind, message, table=None, value=None, threshold=None):
+    return {"severity": severity, "kind": kind, "table": table, "value": value, "threshold": threshold,
+            "message": message}
+
+
+# Ayrıştırılmış istatistikleri değerlendirir; eşikler metadata'daki tablo boyutuna göredir.
+# Evaluates the parsed statistics; thresholds are relative to the table size in the metadata.
+def evaluate_statistics(parsed, metadata=None, default_db=None):
+    catalog = as_catalog(metadata) if metadata is not None else None
+    findings = []
+
+    for name, io in parsed["tables"].items():
+        size = _table_size(catalog, name, default_db)
+        reads = io["logical_reads"]
+        if io["worktable"]:
+            if reads:
+                findings.append(_finding("warning", "worktable", f" {name}: {reads} logical reads in tempdb "
+                                         f"(spool, sort or hash spill)", name, reads))
+            continue
+
+        if size is None:
+            if reads > DEFAULT_READS_THRESHOLD:
+                findings.append(_finding("warning", "logical_reads",
+                                         f" {name} high logical read in table: {reads}",
+                                         name, reads, DEFAULT_READS_THRESHOLD))
+        else:
+            full_scan_reads = size["estimated_pages"] * FULL_SCAN_RATIO
+            if reads > size["estimated_pages"] * 2 and reads > DEFAULT_READS_THRESHOLD:
+                findings.append(_finding("warning", "logical_reads",
+                                         f" {name} high logical read in table: {reads} "
+                                         f"(~{size['estimated_pages']} pages for {size['row_count']:,} rows; "
+                                         f"repeated access)", name, reads, size["estimated_pages"] * 2))
+            elif reads > full_scan_reads and reads > DEFAULT_READS_THRESHOLD:
+                findings.append(_finding("warning", "logical_reads",
+                                         f" {name} high logical read in table: {reads} "
+                                         f"(likely a full scan of ~{size['estimated_pages']} pages)",
+                                         name, reads, full_scan_reads))
+
+        if io["scan_count"] > SCAN_COUNT_THRESHOLD:
+            findings.append(_finding("warning", "scan_count", f" {name}: scanned {io['scan_count']} times "
+                                     f"(nested loop / repeated lookups)", name, io["scan_count"],
+                                     SCAN_COUNT_THRESHOLD))
+        disk_reads = io["physical_reads"] + io["read_ahead_reads"] + io["page_server_reads"]
+        if disk_reads > DEFAULT_READS_THRESHOLD:
+            findings.append(_finding("info", "physical_reads", f" {name}: {disk_reads} pages read from disk "
+                                     f"(cold cache or memory pressure)", name, disk_reads, DEFAULT_READS_THRESHOLD))
+        lob_reads = io["lob_logical_reads"]
+        if lob_reads > DEFAULT_READS_THRESHOLD:
+            findings.append(_finding("info", "lob_reads", f" {name}: {lob_reads} LOB logical reads "
+                                     f"(MAX/XML columns)", name, lob_reads, DEFAULT_READS_THRESHOLD))
+
+    for statement in parsed["statements"]:
+        if statement["cpu_ms"] > CPU_THRESHOLD_MS:
+            findings.append(_finding("warning", "cpu", f" High CPU time: {statement['cpu_ms']} ms",
+                                     value=statement["cpu_ms"], threshold=CPU_THRESHOLD_MS))
+        if statement["parse_cpu_ms"] > COMPILE_THRESHOLD_MS or \
+                (statement["parse_elapsed_ms"] > CPU_THRESHOLD_MS and
+                 statement["parse_elapsed_ms"] > statement["elapsed_ms"]):
+            findings.append(_finding("warning", "compile", f" High parse/compile time: "
+                                     f"{statement['parse_elapsed_ms']} ms (execution {statement['elapsed_ms']} ms)",
+                                     value=statement["parse_elapsed_ms"], threshold=COMPILE_THRESHOLD_MS))
+        if statement["elapsed_ms"] > CPU_THRESHOLD_MS and statement["elapsed_ms"] > 2 * statement["cpu_ms"]:
+            findings.append(_finding("info", "waits", f" Elapsed {statement['elapsed_ms']} ms vs CPU "
+                                     f"{statement['cpu_ms']} ms: the statement mostly waited (I/O, locks, network)",
+                                     value=statement["elapsed_ms"]))
+    return findings
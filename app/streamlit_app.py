@@ -10,38 +10,46 @@ Description:
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+import hashlib
+import io
+import json
+import math
 import os
+import tempfile
+import uuid
 
-def connect_to_sql_server(server, db_name, username=None, password=None):
-    import pyodbc
-    if username and password:
-        conn_str = (
-            f"DRIVER={{ODBC Driver 18 for SQL Server}};"
-            f"SERVER={server};"
-            f"DATABASE={db_name};"
-            f"UID={username};"
-            f"PWD={password};"
-            f"Encrypt=yes;"
-            f"TrustServerCertificate=yes;"
-        )
-    else:
-        conn_str = (
-            f"DRIVER={{ODBC Driver 18 for SQL Server}};"
-            f"SERVER={server};"
-            f"DATABASE={db_name};"
-            f"Trusted_Connection=yes;"
-            f"Encrypt=yes;"
-            f"TrustServerCertificate=yes;"
-        )
-    try:
-        return pyodbc.connect(conn_str)
-    except Exception as e:
-        print("Connection failed:", e)
-        return None
+from connection_pool import get_pool
+from query_analyzer import analyze_query
+from plan_cache import get_execution_plan_cached
+from query_history import get_query_history
+from log_ingester import ingest_performance_log
+from workload_scan import scan_workload
+from metadata_collector import collect_metadata, DEFAULT_MAX_WORKERS
+from table_stats_cache import get_cached_table_info
+from metadata_store import (
+    default_store_path, export_metadata_excel, is_store_path, load_metadata_excel,
+    load_metadata_columns, save_metadata_store
+)
+from metadata_catalog import MetadataCatalog
+from graphviz_execution_plan import (
+    DEFAULT_VIEW_MAX_NODES, DEFAULT_VIEW_MIN_COST_PCT, compare_execution_plans_for_graphviz, plan_diff_to_dot,
+    plan_view, render_svg
+)
+from plan_diff import diff_plans
+from background_jobs import JobManager, DONE, FAILED
+import instrumentation
+from instrumentation import span
 
-from query_analyzer import analyze_query, analyze_execution_plan
-from table_info import get_table_info
-from graphviz_execution_plan import parse_execution_plan_for_graphviz
+# Çalışan işler bu aralıkla yoklanır; yalnızca ilerleme parçası yeniden çizilir
+# Running jobs are polled at this interval; only the progress fragment is redrawn
+JOB_POLL_INTERVAL_S = 1.0
+# Bu operatör sayısının üstündeki plan farkları grafik olarak çizilmez, DOT olarak indirilir
+# Plan diffs above this operator count are not drawn, the DOT is offered as a download instead
+DIFF_CHART_MAX_OPERATORS = 2000
+# Plan XML'i sayfa sayfa gösterilir / the plan XML is shown page by page
+PLAN_XML_PAGE_CHARS = 20000
+# Odaklanılabilecek en pahalı alt ağaç sayısı / number of most expensive subtrees offered for focusing
+FOCUS_CHOICES = 50
 
 st.set_page_config(page_title="SQL Query Analysis Tool", layout="wide")
 
@@ -92,10 +100,536 @@ if "conn" not in st.session_state:
     st.session_state.conn = None
 if "metadata" not in st.session_state:
     st.session_state.metadata = None
-if "metadata_excel_path" not in st.session_state:
-    st.session_state.metadata_excel_path = None
-if "query_log" not in st.session_state:
-    st.session_state.query_log = []
+if "metadata_store_path" not in st.session_state:
+    st.session_state.metadata_store_path = None
+if "metadata_key" not in st.session_state:
+    st.session_state.metadata_key = None
+if "session_key" not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex
+# Bölüm -> iş kimliği; sonuçlar işte durur, rerun'lar yeniden hesaplamaz sadece çizer
+# Section -> job id; results stay on the job, reruns only redraw them instead of recomputing
+if "jobs" not in st.session_state:
+    st.session_state.jobs = {}
+if "applied_jobs" not in st.session_state:
+    st.session_state.applied_jobs = {}
+# Sorgu geçmişi oturumdan bağımsız, yerel SQLite dosyasında tutulur
+# Query history lives in a local SQLite file, independent of the browser session
+query_history = get_query_history()
+
+
+# ---------------------------------------------------------------------------
+# Paylaşılan kaynaklar (süreç başına bir kez oluşturulur)
+# Shared resources (created once per process)
+# ---------------------------------------------------------------------------
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+
+# Yüklenen dosya içerik özetiyle önbelleğe alınır: rerun'larda yeniden ayrıştırılmaz, geçici dosya tekrar yazılmaz;
+# aynı dosyayı yükleyen oturumlar tek kataloğu paylaşır
+# The uploaded file is cached by content digest: reruns do not parse it again or rewrite the temp file,
+# and sessions uploading the same file share one catalog
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_uploaded_catalog(digest, file_name, _data):
+    if is_store_path(file_name):
+        path = os.path.join(tempfile.gettempdir(), f"sql_analyzer_metadata_{digest}.sqlite")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(_data)
+        return MetadataCatalog.from_columns(load_metadata_columns(path)), path
+    return MetadataCatalog.from_dict(load_metadata_excel(io.BytesIO(_data))), None
+
+
+# SVG diskte de önbelleklidir; bu katman aynı süreçte dosya okumayı da atlar
+# The SVG is cached on disk too; this layer also skips the file read within the process
+@st.cache_data(max_entries=64, show_spinner="Rendering plan...")
+def plan_svg(dot):
+    return render_svg(dot)
+
+
+@st.cache_data(max_entries=8, show_spinner="Comparing plans...")
+def cached_plan_comparison(old_plan_xml, new_plan_xml):
+    return compare_execution_plans_for_graphviz(old_plan_xml, new_plan_xml)
+
+
+@st.cache_data(max_entries=4, show_spinner="Building Excel file...")
+def metadata_excel_bytes(metadata_key, _catalog):
+    excel_buffer = io.BytesIO()
+    export_metadata_excel(_catalog.values(), excel_buffer)
+    return excel_buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Arka plan işleri: st.* çağırmazlar, ilerlemeyi job üzerinden bildirirler
+# Background jobs: they never call st.*, progress is reported through the job
+# ---------------------------------------------------------------------------
+
+def create_metadata_job(job, server, db_names, username, password, max_workers, use_cache):
+    with span("ui.create_metadata"):
+        job.report(0.0, f"Collecting metadata: 0/{len(db_names)} databases")
+
+        # İptal her veritabanı bittiğinde yoklanır; başlamamış veritabanları atlanır
+        # Cancellation is polled as each database finishes; databases that have not started are skipped
+        def report_progress(done, total, item):
+            job.check_cancelled()
+            if item["status"] == "success":
+                job.append_log(f"✅ {item['database']}: {len(item['metadata'])} tables ({item['elapsed_s']:.1f} s)")
+            else:
+                job.append_log(f"❌ Metadata collection failed for {item['database']}: {item['error']}")
+            job.report(done / total, f"Collecting metadata: {done}/{total} databases")
+
+        all_metadata, errors = collect_metadata(
+            lambda db: get_pool(server, db, username, password),
+            db_names,
+            max_workers=max_workers,
+            on_progress=report_progress,
+            harvest=(lambda conn: get_cached_table_info(conn, server)[0]) if use_cache else None
+        )
+        job.report(1.0, "Saving metadata store")
+        store_path = save_metadata_store(all_metadata, default_store_path())
+        return {"catalog": MetadataCatalog.from_items(all_metadata), "store_path": store_path, "errors": errors}
+
+
+# Varsayılan görünüm iş içinde SVG'ye çevrilir; arayüz aynı DOT için disk önbelleğinden okur
+# The default view is rendered to SVG inside the job; the UI reads the same DOT from the disk cache
+def prerender_plan(plan):
+    return render_svg(plan_view(plan)["dot"])
+
+
+def execution_plan_job(job, pool, query):
+    with span("ui.execution_plan"):
+        job.report(None, "Compiling execution plan")
+        plan_result = get_execution_plan_cached(pool, query)
+        if plan_result.get("plan_diff", {}).get("status") == "success":
+            plan_result["plan_diff_dot"] = plan_diff_to_dot(plan_result["plan_diff"])
+        if plan_result["status"] == "success":
+            job.report(None, "Rendering plan")
+            prerender_plan(plan_result["plan_analysis"]["plan"])
+        return plan_result
+
+
+def analyze_job(job, pool, query, catalog, server, database, options):
+    with span("ui.analyze"):
+        job.report(None, "Running analysis")
+        result = analyze_query(pool, query, catalog, **options)
+        regression = plan_diff_result = None
+        if result["performance"]["status"] == "success":
+            job.report(None, "Comparing with query history")
+            perf = result["performance"]
+            # Parmak izi literal ve boşluk farklarını yok sayar
+            # The fingerprint ignores literal and whitespace differences
+            plan_hash = result.get("plan_analysis", {}).get("plan_hash")
+            recorded = query_history.record_run(
+                query, perf, server, database,
+                plan_hash=plan_hash, source="benchmark" if "server_ms" in perf else "analyze"
+            )
+            regression = query_history.detect_regression(
+                recorded["query_id"], perf["duration_ms"], plan_hash, before_run_id=recorded["run_id"]
+            )
+            # Plan her analizde önceki saklanan planla otomatik karşılaştırılır
+            # The plan is compared with the previously stored plan on every analysis
+            if plan_hash and perf.get("plan_xml"):
+                job.report(None, "Comparing with the previous plan")
+                previous = query_history.record_plan(recorded["query_id"], plan_hash, perf["plan_xml"])
+                if previous is not None:
+                    plan_diff = diff_plans(previous["plan_xml"], result["plan_analysis"]["plan"])
+                    if plan_diff["status"] == "success":
+                        plan_diff_result = {"diff": plan_diff, "dot": plan_diff_to_dot(plan_diff),
+                                            "previous_seen": previous["last_seen"]}
+        if "plan_analysis" in result:
+            job.report(None, "Rendering actual plan")
+            prerender_plan(result["plan_analysis"]["plan"])
+        return {"result": result, "regression": regression, "plan_diff": plan_diff_result}
+
+
+def scan_workload_job(job, pool, catalog, top_n, source, default_db, hours):
+    with span("ui.scan_workload"):
+        job.report(0.0, "Reading top queries")
+        report = scan_workload(
+            pool, catalog, top_n=top_n, source=source, default_db=default_db, hours=hours,
+            on_progress=lambda done, total: job.report(done / total, f"{done}/{total} queries analyzed"),
+            cancelled=lambda: job.cancel_requested
+        )
+        job.check_cancelled()
+        return report
+
+
+def import_log_job(job, pool, server):
+    with span("ui.import_log"):
+        job.report(None, "Importing RunAndMeasure log")
+        # İptalde kaydedilmiş partiler geçmişte kalır; sonraki aktarım filigrandan devam eder
+        # On cancellation the saved batches stay in the history; the next import resumes at the watermark
+        summary = ingest_performance_log(
+            pool, query_history, server=server,
+            on_progress=lambda summary: job.report(None, f"{summary['ingested']} runs imported"),
+            cancelled=lambda: job.cancel_requested
+        )
+        job.check_cancelled()
+        return summary
+
+
+# ---------------------------------------------------------------------------
+# İş takibi / job tracking
+# ---------------------------------------------------------------------------
+
+# key verilen işler paylaşılır: aynı metadata/workload işi için ikinci bir çalıştırma açılmaz
+# Jobs with a key are shared: a second run of the same metadata/workload job is not started
+def start_job(section, func, *args, key=None, label=None, cancellable=True, **kwargs):
+    job = get_job_manager().submit(section, func, *args, key=key, owner=st.session_state.session_key,
+                                   label=label, cancellable=cancellable, **kwargs)
+    st.session_state.jobs[section] = job.job_id
+    return job
+
+
+# Paylaşılan iş anahtarlarında bağlantı kimliği: farklı kullanıcı/parola başka birinin işini ve sonucunu almaz
+# Connection identity in shared job keys: a different user/password never gets someone else's job and result
+def connection_identity():
+    conn = st.session_state.conn
+    return getattr(conn, "key", None) or id(conn)
+
+
+def current_job(section):
+    job_id = st.session_state.jobs.get(section)
+    return get_job_manager().get(job_id) if job_id else None
+
+
+# Sadece bu parça yoklanır; iş bitince tüm sayfa bir kez yeniden çalışır ve sonucu çizer
+# Only this fragment is polled; when the job finishes the page reruns once and draws the result
+@st.fragment(run_every=JOB_POLL_INTERVAL_S)
+def job_progress(section):
+    job = current_job(section)
+    if job is None:
+        return
+    if job.is_finished:
+        st.rerun()
+    text = f"⏳ {job.label}: {job.message or job.status} ({job.elapsed_s:.0f} s)"
+    if job.progress is None:
+        st.info(text)
+    else:
+        st.progress(job.progress, text=text)
+    for line in list(job.log)[-5:]:
+        st.write(line)
+    if job.cancellable and st.button("✖️ Cancel", key=f"cancel_{section}"):
+        get_job_manager().cancel(job.job_id)
+
+
+# Çalışıyorsa ilerleme, bittiyse sonuç; sonuç rerun'lar boyunca iş nesnesinden tekrar çizilir
+# Progress while running, the result once finished; the result is redrawn from the job across reruns
+def show_job(section, render_result):
+    job = current_job(section)
+    if job is None:
+        return
+    if not job.is_finished:
+        job_progress(section)
+    elif job.status == DONE:
+        render_result(job.result)
+    elif job.status == FAILED:
+        st.error(f"❌ {job.label} failed: {job.error}")
+    else:
+        st.info(f"✖️ {job.label} cancelled.")
+
+
+def set_metadata(catalog, store_path, metadata_key):
+    st.session_state.metadata = catalog
+    st.session_state.metadata_store_path = store_path
+    st.session_state.metadata_key = metadata_key
+
+
+# ---------------------------------------------------------------------------
+# Sonuç görünümleri / result views
+# ---------------------------------------------------------------------------
+
+# Plan analizinin özetini, sıcak operatörleri ve uyarıları gösterir
+# Shows the plan analysis summary, the hot operators and the warnings
+def show_plan_analysis(plan_analysis):
+    if plan_analysis["status"] != "success":
+        st.error(f"❌ Plan analysis error: {plan_analysis['error']}")
+        return
+    st.write(f"{plan_analysis['operator_count']} operators, total estimated cost "
+             f"{plan_analysis['total_cost']:.4f}{' (actual plan)' if plan_analysis['is_actual'] else ''}")
+    st.dataframe(pd.DataFrame(plan_analysis["hot_operators"]).drop(columns=["node", "weight"]))
+    for warning in plan_analysis["warnings"]:
+        st.write("-", warning)
+
+
+# Index önerilerini fayda sırasıyla ve CREATE INDEX komutlarıyla gösterir
+# Shows the index suggestions by benefit together with their CREATE INDEX statements
+def show_index_recommendations(recommendations):
+    st.dataframe(pd.DataFrame([{
+        "table": r["table"], "keys": ", ".join(r["key_columns"]), "include": ", ".join(r["include_columns"]),
+        "benefit": r["benefit"], "impact %": r["impact"], "hits": r["hits"], "sources": ", ".join(r["sources"]),
+        "extends": r["extends_index"]
+    } for r in recommendations]))
+    st.code("\n".join(r["ddl"] for r in recommendations), language="sql")
+
+
+# Plan farkı: özet, değişen operatörler ve yan yana renkli grafik (önceki solda, şimdiki sağda)
+# Plan diff: summary, changed operators and a colored side-by-side graph (previous left, current right)
+def show_plan_diff(diff, dot):
+    col_changed, col_added, col_removed, col_cost = st.columns(4)
+    col_changed.metric("Changed operators", diff["changed"])
+    col_added.metric("Added", diff["added"])
+    col_removed.metric("Removed", diff["removed"])
+    col_cost.metric("Total cost Δ", f"{diff['cost_delta_pct']:+.1f}%")
+    for message in diff["messages"]:
+        st.write("-", message)
+    if diff["identical"]:
+        return
+    st.dataframe(pd.DataFrame([{
+        "status": row["status"], "changes": ", ".join(row["changes"]),
+        "previous": row["old_operator"], "current": row["new_operator"],
+        "previous object": row["old_object"], "current object": row["new_object"],
+        "previous rows (est.)": row["old_estimate_rows"], "current rows (est.)": row["new_estimate_rows"],
+        "previous cost %": row["old_cost_pct"], "current cost %": row["new_cost_pct"],
+        "cost Δ pts": row["cost_pct_delta"]
+    } for row in diff["operators"]]))
+    if diff["old_operator_count"] + diff["new_operator_count"] <= DIFF_CHART_MAX_OPERATORS:
+        show_dot(dot)
+    else:
+        st.info("The plans are too large to draw here; download the diff graph instead.")
+    st.download_button("⬇️ Download diff graph (DOT)", data=dot, file_name="plan_diff.dot", mime="text/vnd.graphviz")
+
+
+# SVG sunucuda üretilir (Graphviz kurulu değilse tarayıcıda çizilir)
+# The SVG is produced on the server (drawn in the browser when Graphviz is not installed)
+def show_dot(dot):
+    svg_result = plan_svg(dot)
+    if svg_result["status"] == "success":
+        svg = svg_result["svg"]
+        st.html(f'<div style="overflow: auto; max-height: 900px;">{svg[svg.find("<svg"):]}</div>')
+    else:
+        st.graphviz_chart(dot)
+
+
+# Büyük planlarda ucuz alt ağaçlar katlanır; katlanmış operatörler açılabilir veya bir alt ağaca odaklanılabilir
+# Cheap subtrees of large plans are collapsed; collapsed operators can be expanded or a subtree can be focused
+def show_plan_graph(plan, section, full_dot=None):
+    operators = plan.operators
+    # Görünüm durumu plana bağlıdır: başka bir planın operatör indeksleri bu planda geçersizdir
+    # The view state belongs to the plan: operator indices of another plan are meaningless in this one
+    state = f"{section}_{plan.plan_hash()}"
+    col_nodes, col_cost, col_focus = st.columns(3)
+    max_nodes = col_nodes.slider("Visible operators", min_value=20, max_value=500, value=DEFAULT_VIEW_MAX_NODES,
+                                 step=10, key=f"{state}_max_nodes")
+    min_cost_pct = col_cost.number_input("Collapse subtrees below (% of cost)", min_value=0.0, max_value=100.0,
+                                         value=DEFAULT_VIEW_MIN_COST_PCT, step=0.5, key=f"{state}_min_cost")
+    focus_choices = [None] + sorted((op.index for op in operators if op.children),
+                                    key=lambda i: operators[i].subtree_cost, reverse=True)[:FOCUS_CHOICES]
+    focus = col_focus.selectbox(
+        "Focus on subtree", focus_choices, key=f"{state}_focus",
+        format_func=lambda i: "Whole plan" if i is None else
+        f"node {operators[i].node_id}: {operators[i].label} ({100 * operators[i].subtree_cost / (plan.total_cost() or 1.0):.1f}%)"
+    )
+    # Açılan operatörler widget'tan önce okunur: seçenekler görünüme, görünüm seçime bağlıdır
+    # The expanded operators are read before the widget: the options depend on the view and the view on the choice
+    expanded = [i for i in st.session_state.get(f"{state}_expanded", []) if i < len(operators)]
+    if f"{state}_expanded" in st.session_state:
+        st.session_state[f"{state}_expanded"] = expanded
+    view = plan_view(plan, expanded=expanded, focus=focus, max_nodes=max_nodes, min_cost_pct=min_cost_pct)
+    labels = {entry["node"]: f"node {entry['node_id']}: {entry['operator']}"
+                             f"{' on ' + entry['object'] if entry['object'] else ''} "
+                             f"({entry['hidden']} ops, {entry['cost_pct']:.1f}%)"
+              for entry in view["collapsed"]}
+    st.multiselect("Expand collapsed operators", list(dict.fromkeys(list(expanded) + list(labels))),
+                   key=f"{state}_expanded",
+                   format_func=lambda i: labels.get(i) or f"node {operators[i].node_id}: {operators[i].label}")
+    hidden_note = f", {view['hidden']} in collapsed subtrees" if view["hidden"] else ""
+    st.caption(f"Showing {view['shown']} of {view['total']} operators{hidden_note}. "
+               f"Color and size: share of the subtree cost.")
+    show_dot(view["dot"])
+    svg_result = plan_svg(view["dot"])
+    col_svg, col_dot = st.columns(2)
+    if svg_result["status"] == "success":
+        col_svg.download_button("⬇️ Download view (SVG)", data=svg_result["svg"], file_name="execution_plan.svg",
+                                mime="image/svg+xml", key=f"{state}_svg")
+    if full_dot is not None:
+        col_dot.download_button("⬇️ Download full plan (DOT)", data=full_dot, file_name="execution_plan.dot",
+                                mime="text/vnd.graphviz", key=f"{state}_full_dot")
+
+
+# Plan XML'i kesilmez: tamamı indirilebilir, ekranda sayfa sayfa gösterilir
+# The plan XML is not truncated: it can be downloaded whole and is shown page by page
+def show_plan_xml(plan_xml, section, file_name):
+    st.download_button("⬇️ Download Execution Plan XML", data=plan_xml, file_name=file_name,
+                       mime="application/xml", key=f"{section}_xml_download")
+    if st.checkbox(f"Show plan XML ({len(plan_xml):,} characters)", key=f"{section}_show_xml"):
+        pages = max(1, math.ceil(len(plan_xml) / PLAN_XML_PAGE_CHARS))
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{section}_xml_page")
+        st.code(plan_xml[(page - 1) * PLAN_XML_PAGE_CHARS:page * PLAN_XML_PAGE_CHARS], language="xml")
+
+
+def show_metadata_result(outcome):
+    if outcome["errors"]:
+        st.warning(f"⚠️ Metadata created with partial results. Failed databases: {', '.join(outcome['errors'])}")
+    else:
+        st.success("✅ Metadata successfully created.")
+
+
+def show_execution_plan(plan_result):
+    if plan_result["status"] == "success":
+        if plan_result["cache_hit"]:
+            saved = f", ~{plan_result['compile_ms']:.0f} ms compile saved" if plan_result["compile_ms"] else ""
+            st.success(f"✅ Execution plan served from cache (hit #{plan_result['hits']}{saved}).")
+        else:
+            st.success("✅ Execution plan retrieved successfully.")
+        show_plan_xml(plan_result["plan_xml"], "plan", "execution_plan.xml")
+        show_plan_analysis(plan_result["plan_analysis"])
+        show_plan_graph(plan_result["plan_analysis"]["plan"], "plan", full_dot=plan_result["dot"])
+        if "plan_diff_dot" in plan_result:
+            with st.expander("🔀 Changes vs the previously compiled plan", expanded=not plan_result["plan_diff"]["identical"]):
+                st.caption(f"Previous plan compiled {datetime.fromtimestamp(plan_result['previous_plan_created_at']):%Y-%m-%d %H:%M}")
+                show_plan_diff(plan_result["plan_diff"], plan_result["plan_diff_dot"])
+    elif "plan_xml" in plan_result:
+        st.error(f"❌ Graphviz rendering error: {plan_result['error']}")
+        st.download_button(
+            label="⬇️ Download Execution Plan XML",
+            data=plan_result["plan_xml"],
+            file_name="execution_plan.xml",
+            mime="application/xml"
+        )
+    else:
+        st.error(f"❌ Failed to retrieve execution plan: {plan_result['error']}")
+
+
+def show_analysis(outcome):
+    result = outcome["result"]
+    regression = outcome["regression"]
+    if regression is not None:
+        for message in regression["messages"]:
+            if regression["status"] == "regression" or regression["plan_changed"]:
+                st.warning(message)
+            else:
+                st.success(message)
+        if regression["status"] in ("ok", "insufficient_history") and regression["baseline_median_ms"] is not None:
+            st.info(f"⚖️ Baseline median of {regression['baseline_runs']} previous runs: "
+                    f"{regression['baseline_median_ms']:.2f} ms → Δ {regression['delta_ms']:+.2f} ms")
+
+    with st.expander("📂 Structural Analysis"):
+        st.write(result["structure_findings"] or "No problem detected.")
+
+    with st.expander("🕛 Performance Result"):
+        perf = result["performance"]
+        if perf["status"] == "success":
+            st.metric("Duration (ms)", perf["duration_ms"])
+            st.metric("Row Count", perf["row_count"])
+            if "cpu_ms" in perf:
+                st.metric("CPU (ms)", perf["cpu_ms"])
+                st.metric("Logical Reads", perf["logical_reads"])
+            if perf.get("statistics_parsed") and perf["statistics_parsed"]["tables"]:
+                st.dataframe(pd.DataFrame([
+                    {"table": name, "scans": io["scan_count"], "logical": io["logical_reads"],
+                     "physical": io["physical_reads"], "read-ahead": io["read_ahead_reads"],
+                     "lob logical": io["lob_logical_reads"]}
+                    for name, io in perf["statistics_parsed"]["tables"].items()
+                ]))
+            if perf.get("truncated"):
+                st.warning("Row cap reached: the query was cancelled, duration covers the transferred part only.")
+            if perf.get("result_sets"):
+                st.dataframe(pd.DataFrame([
+                    {"result set": i + 1, "columns": len(rs["columns"]), "rows": rs["rows"], "bytes (est.)": rs["bytes"]}
+                    for i, rs in enumerate(perf["result_sets"])
+                ]))
+            if "server_ms" in perf:
+                st.write(f"Benchmark: {perf['runs']} runs after {perf['warmup']} warm-up"
+                         f"{' (cold cache)' if perf['cold_cache'] else ''}")
+                st.dataframe(pd.DataFrame({"server (ms)": perf["server_ms"], "client (ms)": perf["client_ms"]}))
+        elif perf["status"] == "skipped":
+            st.info(perf["reason"])
+        else:
+            st.error(perf["error"])
+
+    if "estimate" in result:
+        with st.expander("🧮 Cost Estimate (histograms)"):
+            estimate = result["estimate"]
+            st.write(f"Verdict: **{estimate['verdict']}** | estimated rows {estimate['estimated_rows']:,} | "
+                     f"rows scanned {estimate['rows_scanned']:,} | pages {estimate['pages_scanned']:,}")
+            st.dataframe(pd.DataFrame(estimate["tables"]).drop(columns=["predicates"], errors="ignore"))
+            for reason in estimate["reasons"]:
+                st.write("-", reason)
+
+    # Tek çalıştırma modunda gerçek plan aynı çalıştırmadan gelir, tekrar derlenmez
+    # In single-execution mode the actual plan comes from the same run, no recompilation
+    if result["performance"].get("plan_xml"):
+        with st.expander("📉 Actual Execution Plan"):
+            if "plan_analysis" in result:
+                show_plan_analysis(result["plan_analysis"])
+                show_plan_graph(result["plan_analysis"]["plan"], "actual_plan")
+            show_plan_xml(result["performance"]["plan_xml"], "actual_plan", "actual_execution_plan.xml")
+
+    with st.expander("🔸 Tables and Metadata"):
+        st.dataframe(pd.DataFrame(result["table_metadata"]))
+
+    with st.expander("📊 Recommendations"):
+        for r in result["recommendations"]:
+            st.write("-", r)
+
+    if result.get("index_recommendations"):
+        with st.expander("🗂️ Index Recommendations"):
+            show_index_recommendations(result["index_recommendations"])
+
+    if outcome["plan_diff"] is not None:
+        with st.expander("🔀 Plan Changes vs Previous Run", expanded=not outcome["plan_diff"]["diff"]["identical"]):
+            st.caption(f"Previous plan seen {datetime.fromtimestamp(outcome['plan_diff']['previous_seen']):%Y-%m-%d %H:%M}")
+            show_plan_diff(outcome["plan_diff"]["diff"], outcome["plan_diff"]["dot"])
+
+
+def show_workload_report(report):
+    if report["status"] != "success":
+        st.error(f"❌ Workload scan failed: {report['error']}")
+        return
+    st.success(f"✅ {len(report['offenders'])} queries analyzed in {report['elapsed_s']:.1f} s.")
+    st.dataframe(pd.DataFrame([{
+        "rank": o["rank"], "score": o["score"], "database": o["database"],
+        "executions": o["executions"], "total_cpu_ms": o["total_cpu_ms"],
+        "total_reads": o["total_reads"], "total_elapsed_ms": o["total_elapsed_ms"],
+        "findings": len(o["structure_findings"]) + len(o["plan_warnings"]),
+        "query": " ".join(o["query"].split())[:200]
+    } for o in report["offenders"]]))
+    for o in report["offenders"][:10]:
+        with st.expander(f"#{o['rank']} score {o['score']} | {' '.join(o['query'].split())[:100]}"):
+            st.code(o["query"], language="sql")
+            for finding in o["structure_findings"] + o["plan_warnings"] + o["recommendations"]:
+                st.write("-", finding)
+            if o["hot_operators"]:
+                st.dataframe(pd.DataFrame(o["hot_operators"]).drop(columns=["node", "weight"]))
+    if report["index_recommendations"]:
+        st.write("Index recommendations across the workload:")
+        show_index_recommendations(report["index_recommendations"])
+    for error in report["errors"]:
+        st.error(error)
+
+
+def show_ingest_summary(ingest_summary):
+    if ingest_summary["status"] == "success":
+        st.success(f"✅ {ingest_summary['ingested']} runs imported "
+                   f"({ingest_summary['failed_runs']} failed runs and {ingest_summary['app_runs']} runs of this app "
+                   f"skipped), LogId {ingest_summary['watermark']}.")
+        if ingest_summary["missing_text"]:
+            st.warning(f"⚠️ Stopped before {ingest_summary['missing_text']} runs whose query text is not in "
+                       f"dbo.QueryText yet; they are retried on the next import.")
+    else:
+        st.error(f"❌ Log import failed: {ingest_summary['error']}")
+
+
+def toggle_metrics():
+    if st.session_state.metrics_on:
+        # Ortamdan gelen eşik ve profil klasörü korunur / the threshold and profile directory from the env are kept
+        instrumentation.enable(*instrumentation.profile_settings())
+    else:
+        instrumentation.disable()
+
+
+def change_profile_threshold():
+    instrumentation.set_profile_threshold(st.session_state.profile_slow_ms or None)
+
+
+# ---------------------------------------------------------------------------
+# Sayfa / page
+# ---------------------------------------------------------------------------
 
 with st.sidebar:
     st.header("🚀 Connection Informations")
@@ -111,11 +645,16 @@ with st.sidebar:
 
     if st.button("✔️ Connect"):
         if db_names:
-            conn = connect_to_sql_server(server, db_names[0], username, password)
-            if conn:
-                st.session_state.conn = conn
+            # Bağlantılar havuzdan gelir ve rerun'lar arasında yeniden kullanılır
+            # Connections come from a pool and are reused across reruns
+            pool = get_pool(server, db_names[0], username, password)
+            try:
+                with pool.connection():
+                    pass
+                st.session_state.conn = pool
                 st.success(f"✅ Successfully connected to the {db_names[0]} database.")
-            else:
+            except Exception as e:
+                print("Connection failed:", e)
                 st.error(f"❌ Unable to connect to the {db_names[0]} database.")
         else:
             st.warning("⚠️ Please enter at least one database.")
@@ -125,108 +664,192 @@ if st.session_state.conn:
     use_excel = st.sidebar.radio("Where would you like to get the metadata from?", ["Pull from Database", "Upload from Excel"])
 
     if use_excel == "Pull from Database":
+        max_workers = st.sidebar.number_input(
+            "Parallel databases", min_value=1, max_value=32,
+            value=min(DEFAULT_MAX_WORKERS, max(1, len(db_names)))
+        )
+        use_cache = st.sidebar.checkbox("Use local metadata cache (incremental refresh)", value=True)
         if st.sidebar.button("🔄 Create Metadata"):
-            all_metadata = []
-            for db in db_names:
-                conn = connect_to_sql_server(server, db, username, password)
-                if conn:
-                    with st.spinner(f"🛠 Collecting metadata: {db}..."):
-                        meta, _ = get_table_info(conn, export_excel=False)
-                        all_metadata.extend(meta)
-                else:
-                    st.error(f"❌ Connection failed for {db}.")
-            df = pd.DataFrame(all_metadata)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            export_path = f"table_info_output_{timestamp}_merged.xlsx"
-            df.to_excel(export_path, index=False)
-            st.session_state.metadata_excel_path = export_path
-            st.session_state.metadata = {
-                f"{item['database'].lower()}.{item['schema'].lower()}.{item['table'].lower()}": item
-                for item in all_metadata
-            }
-            st.success("✅ Metadata successfully created.")
+            start_job("metadata", create_metadata_job, server, db_names, username, password, max_workers, use_cache,
+                      key=("metadata", connection_identity(), tuple(db.lower() for db in db_names), use_cache),
+                      label="Metadata collection")
+        metadata_job = current_job("metadata")
+        # Biten işin kataloğu oturuma bir kez aktarılır
+        # The finished job's catalog is handed to the session once
+        if (metadata_job is not None and metadata_job.status == DONE
+                and st.session_state.applied_jobs.get("metadata") != metadata_job.job_id):
+            set_metadata(metadata_job.result["catalog"], metadata_job.result["store_path"], metadata_job.job_id)
+            st.session_state.applied_jobs["metadata"] = metadata_job.job_id
+        with st.sidebar:
+            show_job("metadata", show_metadata_result)
     else:
-        uploaded_file = st.sidebar.file_uploader("📤 Upload Excel Metadata File", type="xlsx")
+        uploaded_file = st.sidebar.file_uploader("📤 Upload Metadata File", type=["sqlite", "db", "xlsx"])
         if uploaded_file:
-            df = pd.read_excel(uploaded_file)
-            st.session_state.metadata = {
-                f"{row['database'].lower()}.{row['schema'].lower()}.{row['table'].lower()}": row
-                for _, row in df.iterrows()
-            }
-            st.success("✅ Excel metadata successfully uploaded.")
+            data = uploaded_file.getvalue()
+            digest = hashlib.sha1(data).hexdigest()
+            if st.session_state.metadata_key != digest:
+                catalog, store_path = load_uploaded_catalog(digest, uploaded_file.name, data)
+                set_metadata(catalog, store_path, digest)
+            st.sidebar.success("✅ Metadata successfully uploaded.")
 
 if st.session_state.metadata:
     st.subheader("📃 Query Input")
     user_query = st.text_area("Write your SQL query", height=200)
+    database = db_names[0] if db_names else ""
 
     if st.button("📉 Show Execution Plan"):
-        plan_result = analyze_execution_plan(st.session_state.conn, user_query)
-        if plan_result["status"] == "success":
-            st.success("✅ Execution plan retrieved successfully.")
-            st.code(plan_result["plan_xml"][:5000], language="xml")
-            graphviz_result = parse_execution_plan_for_graphviz(plan_result["plan_xml"])
-            if graphviz_result["status"] == "success":
-                st.graphviz_chart(graphviz_result["dot"])
-            else:
-                st.error(f"❌ Graphviz rendering error: {graphviz_result['error']}")
-                st.download_button(
-                    label="⬇️ Download Execution Plan XML",
-                    data=plan_result["plan_xml"],
-                    file_name="execution_plan.xml",
-                    mime="application/xml"
-                )
-        else:
-            st.error(f"❌ Failed to retrieve execution plan: {plan_result['error']}")
+        # Aynı sorgu/şema/istatistik için plan yeniden derlenmez, cache'ten gelir
+        # The plan is not recompiled for the same query/schema/statistics, it comes from the cache
+        start_job("plan", execution_plan_job, st.session_state.conn, user_query,
+                  key=("plan", connection_identity(), user_query.strip()), label="Execution plan", cancellable=False)
+    show_job("plan", show_execution_plan)
 
-    if st.button("🔍 Analyze"):
-        result = analyze_query(st.session_state.conn, user_query, st.session_state.metadata)
-        if result["performance"]["status"] == "success":
-            duration = result["performance"]["duration_ms"]
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            st.session_state.query_log.append({
-                "query": user_query.strip(),
-                "duration_ms": duration,
-                "timestamp": timestamp
-            })
-            previous_runs = [q for q in st.session_state.query_log if q["query"].strip() == user_query.strip()]
-            if len(previous_runs) > 1:
-                previous_duration = previous_runs[-2]["duration_ms"]
-                diff = duration - previous_duration
-                st.info(f"⚖️ Previous run duration: {previous_duration} ms → Δ {diff:+.2f} ms")
-
-        with st.expander("📂 Structural Analysis"):
-            st.write(result["structure_findings"] or "No problem detected.")
-
-        with st.expander("🕛 Performance Result"):
-            perf = result["performance"]
-            if perf["status"] == "success":
-                st.metric("Duration (ms)", perf["duration_ms"])
-                st.metric("Row Count", perf["row_count"])
-            else:
-                st.error(perf["error"])
+    measure_mode = st.radio(
+        "Measurement mode",
+        ["RunAndMeasure SP", "Single execution (statistics + actual plan)",
+         "Estimate only (no execution)", "Auto (execute only if the estimate is unsure)"],
+        horizontal=True
+    )
 
-        with st.expander("🔸 Tables and Metadata"):
-            st.dataframe(pd.DataFrame(result["table_metadata"]))
+    benchmark_runs = benchmark_warmup = 0
+    cold_cache = False
+    max_rows = None
+    if measure_mode.startswith("Single"):
+        # 0 = sınırsız; satırlar her durumda parça parça okunur
+        # 0 = unlimited; rows are read in batches either way
+        max_rows = st.number_input("Row cap (0 = drain all rows)", min_value=0, value=0, step=100000) or None
+    elif measure_mode.startswith("RunAndMeasure"):
+        col_runs, col_warmup, col_cold = st.columns(3)
+        benchmark_runs = col_runs.number_input("Benchmark runs", min_value=1, max_value=100, value=5)
+        benchmark_warmup = col_warmup.number_input("Warm-up runs", min_value=0, max_value=20, value=1)
+        cold_cache = col_cold.checkbox("Cold cache (DEV only: DROPCLEANBUFFERS)")
 
-        with st.expander("📊 Recommendations"):
-            for r in result["recommendations"]:
-                st.write("-", r)
+    if st.button("🔍 Analyze"):
+        # Oturum başına tek ölçüm: çift tıklama ikinci bir çalıştırma başlatmaz
+        # One measurement per session: a double click does not start a second run
+        start_job("analyze", analyze_job, st.session_state.conn, user_query.strip(), st.session_state.metadata,
+                  server or ".", database, {
+                      "measure_mode": {"Single": "single", "Estimate": "estimate", "Auto": "auto"}.get(
+                          measure_mode.split()[0], "sp"),
+                      "benchmark_runs": benchmark_runs, "benchmark_warmup": benchmark_warmup,
+                      "cold_cache": cold_cache, "max_rows": max_rows
+                  }, key=("analyze", st.session_state.session_key), label="Analysis", cancellable=False)
+    show_job("analyze", show_analysis)
+
+    if st.session_state.metadata_store_path:
+        file_name = os.path.basename(st.session_state.metadata_store_path)
+        with open(st.session_state.metadata_store_path, "rb") as f:
+            st.download_button("📄 Download Metadata (SQLite)", data=f, file_name=file_name)
 
-    if st.session_state.metadata_excel_path:
-        file_name = os.path.basename(st.session_state.metadata_excel_path)
-        with open(st.session_state.metadata_excel_path, "rb") as f:
-            st.download_button("📄 Download Metadata Excel", data=f, file_name=file_name)
+    # Excel sadece açıkça istendiğinde üretilir ve aynı metadata için tekrar üretilmez
+    # Excel is only produced when explicitly requested and not rebuilt for the same metadata
+    if st.button("📊 Export Metadata to Excel"):
+        st.download_button(
+            "📄 Download Metadata Excel",
+            data=metadata_excel_bytes(st.session_state.metadata_key, st.session_state.metadata),
+            file_name=f"table_info_output_{datetime.now().strftime('%Y%m%d_%H%M')}_merged.xlsx"
+        )
 
 else:
     st.info("Please establish a database connection and provide metadata first.")
 
+if st.session_state.conn:
+    with st.expander("🏭 Workload Top Offenders"):
+        # Sorgular tekrar çalıştırılmaz; plan önbelleği / Query Store istatistikleri okunur
+        # Queries are not re-executed; plan cache / Query Store statistics are read
+        col_source, col_top, col_hours = st.columns(3)
+        workload_source = col_source.radio("Source", ["dmv", "querystore"], horizontal=True,
+                                           format_func=lambda s: "Plan cache DMVs" if s == "dmv" else "Query Store")
+        workload_top_n = col_top.number_input("Top N per metric", min_value=1, max_value=500, value=20)
+        workload_hours = col_hours.number_input("Query Store window (hours)", min_value=1, value=24)
+        if st.button("🔎 Scan workload"):
+            default_db = db_names[0].lower() if db_names else None
+            start_job("workload", scan_workload_job, st.session_state.conn, st.session_state.metadata,
+                      workload_top_n, workload_source, default_db, workload_hours,
+                      key=("workload", connection_identity(), st.session_state.metadata_key, default_db,
+                           workload_source, workload_top_n, workload_hours),
+                      label="Workload scan")
+        show_job("workload", show_workload_report)
+
 with st.expander("🧾 Query History"):
-    if st.session_state.query_log:
-        df_log = pd.DataFrame(st.session_state.query_log)
-        st.dataframe(df_log)
+    if st.session_state.conn and st.button("📥 Import server-side RunAndMeasure log"):
+        start_job("import_log", import_log_job, st.session_state.conn, server or ".",
+                  key=("import_log", connection_identity()), label="Log import")
+    show_job("import_log", show_ingest_summary)
+    history_rows = query_history.list_queries(limit=200)
+    if history_rows:
+        df_log = pd.DataFrame(history_rows)
+        df_log["last_seen"] = pd.to_datetime(df_log["last_seen"], unit="s")
+        st.dataframe(df_log.drop(columns=["query_id", "fingerprint", "first_seen"]))
+        selected = st.selectbox(
+            "Runs of query", range(len(history_rows)),
+            format_func=lambda i: f"{history_rows[i]['runs']} runs | {history_rows[i]['query'][:80]}"
+        )
+        df_runs = pd.DataFrame(query_history.recent_runs(history_rows[selected]["query_id"], limit=500))
+        df_runs["ts"] = pd.to_datetime(df_runs["ts"], unit="s")
+        st.line_chart(df_runs.set_index("ts")["duration_ms"])
+        st.dataframe(df_runs)
+        stored_plans = query_history.list_plans(history_rows[selected]["query_id"])
+        if len(stored_plans) > 1 and st.checkbox("🔀 Compare stored plans of this query"):
+            col_old, col_new = st.columns(2)
+            plan_labels = {p["plan_hash"]: f"{p['plan_hash']} (last seen {datetime.fromtimestamp(p['last_seen']):%Y-%m-%d %H:%M})"
+                           for p in stored_plans}
+            old_hash = col_old.selectbox("Previous plan", list(plan_labels), index=1, format_func=plan_labels.get)
+            new_hash = col_new.selectbox("Current plan", list(plan_labels), index=0, format_func=plan_labels.get)
+            comparison = cached_plan_comparison(query_history.get_plan(history_rows[selected]["query_id"], old_hash),
+                                                query_history.get_plan(history_rows[selected]["query_id"], new_hash))
+            if comparison["status"] == "success":
+                show_plan_diff(comparison["diff"], comparison["dot"])
+            else:
+                st.error(f"❌ Plan comparison failed: {comparison['error']}")
     else:
         st.info("No queries logged yet.")
 
+# Farklı ortamlardan / sürümlerden alınmış iki plan dosyası karşılaştırılır
+# Compares two plan files taken from different environments / versions
+with st.expander("🔀 Compare Plan Files"):
+    col_old, col_new = st.columns(2)
+    old_plan_file = col_old.file_uploader("Previous / baseline plan", type=["sqlplan", "xml"], key="diff_old_plan")
+    new_plan_file = col_new.file_uploader("Current plan", type=["sqlplan", "xml"], key="diff_new_plan")
+    if old_plan_file and new_plan_file:
+        comparison = cached_plan_comparison(old_plan_file.getvalue(), new_plan_file.getvalue())
+        if comparison["status"] == "success":
+            show_plan_diff(comparison["diff"], comparison["dot"])
+        else:
+            st.error(f"❌ Plan comparison failed: {comparison['error']}")
+
+# Tüm oturumların paylaştığı iş kuyruğu; bu oturumun işleri ayrıca listelenir
+# The job queue shared by every session; this session's jobs are listed separately
+with st.sidebar.expander("🧵 Background Jobs"):
+    job_stats = get_job_manager().stats()
+    st.write(f"Running {job_stats['running']} | queued {job_stats['pending']} | finished {job_stats['finished']}")
+    session_jobs = get_job_manager().jobs(owner=st.session_state.session_key)
+    if session_jobs:
+        st.dataframe(pd.DataFrame([job.as_dict() for job in session_jobs]).drop(columns=["owner", "job_id"]))
+
+# Ölçüm süreç geneli açılır (tüm oturumlar); kapalıyken span'ler maliyetsizdir
+# Metrics are switched on process-wide (all sessions); spans cost nothing while off
+# Durum yalnızca kullanıcı değiştirdiğinde (on_change) değişir; her yeniden çizimde süreç durumu gösterilir
+# The state changes only when the user changes it (on_change); every rerun shows the process state
+with st.sidebar.expander("📈 Instrumentation"):
+    st.session_state.metrics_on = instrumentation.is_enabled()
+    st.session_state.profile_slow_ms = float(instrumentation.profile_settings()[0] or 0)
+    st.checkbox("Collect stage timings", key="metrics_on", on_change=toggle_metrics)
+    st.number_input("Keep cProfile of analyses slower than (ms, 0 = off)", min_value=0.0, step=500.0,
+                    key="profile_slow_ms", on_change=change_profile_threshold)
+    stage_rows = instrumentation.summary()
+    if stage_rows:
+        st.dataframe(pd.DataFrame(stage_rows))
+        st.download_button("⬇️ Prometheus metrics", data=instrumentation.prometheus_text(),
+                           file_name="sql_analyzer_metrics.prom", mime="text/plain")
+        st.download_button("⬇️ JSON snapshot", data=json.dumps(instrumentation.snapshot(), default=str),
+                           file_name="sql_analyzer_metrics.json", mime="application/json")
+        for slow_run in instrumentation.snapshot()["slow_runs"][-3:]:
+            st.text(f"{slow_run['stage']}: {slow_run['elapsed_ms']:.0f} ms")
+            st.code(slow_run["top"])
+        if st.button("Reset metrics"):
+            instrumentation.reset()
+
 st.markdown("""
     <hr style="margin-top: 50px;">
     <div style="text-align: center; font-size: 14px;">
@@ -11,7 +11,174 @@ import pandas as pd
 from datetime import datetime
 import pyodbc
 
-def get_table_info(connection, export_excel=False, export_version="v1"):
+from connection_pool import borrowed_connection
+from instrumentation import timed
+
+# Toplu (set-based) katalog sorguları. Şema filtresi opsiyoneldir.
+# Bulk (set-based) catalog queries. The schema filter is optional.
+BULK_TABLES_SQL = """
+    SELECT
+        t.object_id,
+        s.name AS schema_name,
+        t.name AS table_name,
+        SUM(p.rows) AS row_count
+    FROM sys.tables t
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    INNER JOIN sys.partitions p ON t.object_id = p.object_id
+    WHERE p.index_id IN (0,1) {schema_filter}
+    GROUP BY t.object_id, s.name, t.name
+    ORDER BY row_count DESC;
+"""
+
+BULK_COLUMN_COUNTS_SQL = """
+    SELECT c.object_id, COUNT(*) AS column_count
+    FROM sys.columns c
+    INNER JOIN sys.tables t ON c.object_id = t.object_id
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE 1 = 1 {schema_filter}
+    GROUP BY c.object_id;
+"""
+
+BULK_INDEXES_SQL = """
+    SELECT i.object_id, i.index_id, i.name, i.type_desc, i.is_primary_key, i.is_unique
+    FROM sys.indexes i
+    INNER JOIN sys.tables t ON i.object_id = t.object_id
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE i.name IS NOT NULL {schema_filter}
+    ORDER BY i.object_id, i.index_id;
+"""
+
+BULK_INDEX_COLUMNS_SQL = """
+    SELECT ic.object_id, ic.index_id, c.name, ic.is_included_column
+    FROM sys.index_columns ic
+    JOIN sys.indexes i ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+    JOIN sys.tables t ON t.object_id = i.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE i.name IS NOT NULL {schema_filter}
+    ORDER BY ic.object_id, ic.index_id, ic.key_ordinal, ic.index_column_id;
+"""
+
+# IN (...) listesi başına en fazla bu kadar object_id
+# At most this many object_ids per IN (...) list
+OBJECT_ID_CHUNK_SIZE = 1000
+
+
+def _run_bulk_query(cursor, sql, schema_name=None, object_ids=None):
+    if object_ids is not None:
+        # object_id'ler tamsayıdır, doğrudan SQL'e yazılabilir
+        # object_ids are integers, so they can be inlined safely
+        id_list = ",".join(str(int(object_id)) for object_id in object_ids)
+        cursor.execute(sql.format(schema_filter=f"AND t.object_id IN ({id_list})"))
+    elif schema_name is None:
+        cursor.execute(sql.format(schema_filter=""))
+    else:
+        cursor.execute(sql.format(schema_filter="AND s.name = ?"), schema_name)
+    return cursor.fetchall()
+
+
+# Tablolar, kolon sayıları, indexler ve index kolonları birkaç toplu sorgu ile alınır, Python'da birleştirilir.
+# Tables, column counts, indexes and index columns are fetched with a few set-based queries and joined in Python.
+# chunk_by_schema=True: sorgular şema başına çalışır / queries run once per schema.
+# object_ids: sadece bu tablolar taranır / only these tables are harvested (incremental refresh).
+def harvest_table_metadata(connection, chunk_by_schema=False, object_ids=None):
+    cursor = connection.cursor()
+
+    if object_ids is not None:
+        object_ids = list(object_ids)
+        chunks = [
+            {"object_ids": object_ids[i:i + OBJECT_ID_CHUNK_SIZE]}
+            for i in range(0, len(object_ids), OBJECT_ID_CHUNK_SIZE)
+        ]
+    elif chunk_by_schema:
+        cursor.execute("""
+            SELECT DISTINCT s.name
+            FROM sys.tables t
+            INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+            ORDER BY s.name;
+        """)
+        chunks = [{"schema_name": row[0]} for row in cursor.fetchall()]
+    else:
+        chunks = [{}]
+
+    harvested = []
+    for chunk in chunks:
+        tables = _run_bulk_query(cursor, BULK_TABLES_SQL, **chunk)
+
+        column_counts = {
+            row[0]: row[1]
+            for row in _run_bulk_query(cursor, BULK_COLUMN_COUNTS_SQL, **chunk)
+        }
+
+        indexes = {}
+        index_by_id = {}
+        for object_id, index_id, index_name, type_desc, is_primary_key, is_unique in _run_bulk_query(cursor, BULK_INDEXES_SQL, **chunk):
+            index_def = {
+                "name": index_name,
+                "type": type_desc,
+                "is_primary_key": bool(is_primary_key),
+                "is_unique": bool(is_unique),
+                "key_columns": [],
+                "included_columns": []
+            }
+            indexes.setdefault(object_id, []).append(index_def)
+            index_by_id[(object_id, index_id)] = index_def
+
+        for object_id, index_id, column_name, is_included in _run_bulk_query(cursor, BULK_INDEX_COLUMNS_SQL, **chunk):
+            index_def = index_by_id.get((object_id, index_id))
+            if index_def is not None:
+                index_def["included_columns" if is_included else "key_columns"].append(column_name)
+
+        for object_id, table_schema, table_name, row_count in tables:
+            table_indexes = indexes.get(object_id, [])
+            harvested.append({
+                "object_id": object_id,
+                "schema": table_schema,
+                "table": table_name,
+                "row_count": row_count,
+                "column_count": column_counts.get(object_id, 0),
+                "indexes": table_indexes,
+                # Eski çıktı ile aynı: primary key dışındaki index kolonları
+                # Same as the old output: columns of non primary key indexes
+                "index_columns": [
+                    column
+                    for index_def in table_indexes if not index_def["is_primary_key"]
+                    for column in index_def["key_columns"] + index_def["included_columns"]
+                ]
+            })
+
+    if len(chunks) > 1:
+        harvested.sort(key=lambda item: item["row_count"] or 0, reverse=True)
+
+    return harvested
+
+
+# Toplu tarama satırını get_table_info çıktı formatına çevirir
+# Converts a bulk harvest row into the get_table_info output shape
+def build_result_row(db_name, item):
+    return {
+        "database": db_name.lower(),
+        "schema": item["schema"].lower(),
+        "table": item["table"].lower(),
+        "row_count": item["row_count"],
+        "column_count": item["column_count"],
+        "has_index": bool(item["indexes"]),
+        "index_columns": item["index_columns"],
+        # Index önerileri için index başına anahtar/include kolonları
+        # Per-index key/included columns for the index advisor
+        "indexes": item["indexes"]
+    }
+
+
+@timed("get_table_info")
+def get_table_info(connection, export_excel=False, export_version="v1", bulk=True, chunk_by_schema=False):
+    # connection bir ConnectionPool da olabilir
+    # connection may also be a ConnectionPool
+    with borrowed_connection(connection) as conn:
+        return _get_table_info(conn, export_excel, export_version, bulk, chunk_by_schema)
+
+
+def _get_table_info(connection, export_excel, export_version, bulk, chunk_by_schema):
     cursor = connection.cursor()
     result_list = []
 
@@ -24,6 +191,26 @@ def get_table_info(connection, export_excel=False, export_version="v1"):
     # Get the name of the active database
     db_name = connection.getinfo(pyodbc.SQL_DATABASE_NAME)
 
+    if bulk:
+        # Toplu mod: tablo başına sorgu yok
+        # Bulk mode: no per-table round trips
+        for item in harvest_table_metadata(connection, chunk_by_schema=chunk_by_schema):
+            result_list.append(build_result_row(db_name, item))
+        print(f" {db_name}: {len(result_list)} tables harvested (bulk).")
+    else:
+        result_list = _get_table_info_per_table(cursor, db_name)
+
+    if export_excel:
+        df = pd.DataFrame(result_list)
+        df.to_excel(export_path, index=False)
+        print(f"\n📄 Excel output created: {export_path}")
+
+    return result_list, export_path
+
+
+def _get_table_info_per_table(cursor, db_name):
+    result_list = []
+
     # Tabloları al
     # Get the tables
     cursor.execute("""
@@ -96,9 +283,4 @@ def get_table_info(connection, export_excel=False, export_version="v1"):
             "index_columns": index_column_names
         })
 
-    if export_excel:
-        df = pd.DataFrame(result_list)
-        df.to_excel(export_path, index=False)
-        print(f"\n📄 Excel output created: {export_path}")
-
-    return result_list, export_path
+    return result_list
@@ -7,39 +7,431 @@ Description:
     This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
     Created using Python 3.x and Streamlit.
 """
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import pyodbc
+
+from table_info import harvest_table_metadata, build_result_row, OBJECT_ID_CHUNK_SIZE
+from instrumentation import count, timed
+
 # tablo adı -> row count, index bilgisi şeklinde dict
 # table name -> row count, index information in the form of a dict
 
 def get_table_stats_dict(connection):
-    cursor = connection.cursor()
     stats_dict = {}
 
-    cursor.execute("""
-        SELECT 
-            t.name AS table_name,
-            SUM(p.rows) AS row_count
-        FROM sys.tables t
-        INNER JOIN sys.partitions p ON t.object_id = p.object_id
-        WHERE p.index_id IN (0,1)
-        GROUP BY t.name;
-    """)
-    tables = cursor.fetchall()
-
-    for table in tables:
-        table_name = table[0]
-        row_count = table[1]
-
-        cursor.execute(f"""
-            SELECT COUNT(*) 
-            FROM sys.indexes i
-            INNER JOIN sys.tables t ON i.object_id = t.object_id
-            WHERE t.name = '{table_name}' AND i.name IS NOT NULL
-        """)
-        index_count = cursor.fetchone()[0]
-
-        stats_dict[table_name.lower()] = {
-            "row_count": row_count,
-            "has_index": index_count > 0
-        }
+    # table_info ile aynı toplu sorgular (tablo başına sorgu yok)
+    # Same set-based queries as table_info (no per-table queries)
+    for item in harvest_table_metadata(connection):
+        stats = stats_dict.setdefault(item["table"].lower(), {"row_count": 0, "has_index": False})
+        stats["row_count"] += item["row_count"] or 0
+        stats["has_index"] = stats["has_index"] or bool(item["indexes"])
 
     return stats_dict
+
+
+# ---------------------------------------------------------------------------
+# Kalıcı, artımlı metadata cache (server/veritabanı bazında, yerel dosya)
+# Persistent, incremental metadata cache (per server/database, local files)
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".sql_performance_analyzer", "metadata_cache")
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+CACHE_FORMAT_VERSION = 1
+
+# Değişiklik tespiti için tek sorgu: modify_date, satır sayısı, index checksum
+# Single change-detection query: modify_date, row count, index checksum
+TABLE_STAMPS_SQL = """
+    SELECT
+        t.object_id,
+        t.modify_date,
+        r.row_count,
+        ix.index_checksum
+    FROM sys.tables t
+    CROSS APPLY (
+        SELECT SUM(p.rows) AS row_count
+        FROM sys.partitions p
+        WHERE p.object_id = t.object_id AND p.index_id IN (0,1)
+    ) r
+    OUTER APPLY (
+        SELECT CHECKSUM_AGG(CHECKSUM(i.index_id, i.name, i.type, i.is_disabled)) AS index_checksum
+        FROM sys.indexes i
+        WHERE i.object_id = t.object_id
+    ) ix;
+"""
+
+
+def _cache_path(cache_dir, server, database, kind=""):
+    digest = hashlib.sha1(f"{server.lower()}|{database.lower()}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}{kind}.json.gz")
+
+
+def _fetch_table_stamps(connection):
+    cursor = connection.cursor()
+    cursor.execute(TABLE_STAMPS_SQL)
+    return {
+        str(object_id): {
+            "modify_date": modify_date.isoformat() if modify_date is not None else None,
+            "row_count": row_count or 0,
+            "index_checksum": index_checksum
+        }
+        for object_id, modify_date, row_count, index_checksum in cursor.fetchall()
+    }
+
+
+def load_metadata_cache(server, database, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, kind=""):
+    path = _cache_path(cache_dir, server, database, kind)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Süresi dolmuş veya eski formatlı kayıt kullanılmaz
+    # Expired or old-format entries are ignored
+    if entry.get("version") != (STATS_CACHE_FORMAT_VERSION if kind else CACHE_FORMAT_VERSION):
+        return None
+    if ttl_seconds is not None and time.time() - entry.get("created_at", 0) > ttl_seconds:
+        return None
+
+    # LRU tahliyesi için erişim zamanını güncelle
+    # Touch the file so size-based eviction is least-recently-used
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry
+
+
+def save_metadata_cache(entry, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, entry["server"], entry["database"], entry.get("kind", ""))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=5) as f:
+        json.dump(entry, f, default=str)
+    os.replace(tmp_path, path)
+    evict_metadata_cache(cache_dir, max_bytes, keep=path)
+    return path
+
+
+# Cache dizini max_bytes'ı aşarsa en uzun süredir kullanılmayan dosyalar silinir
+# When the cache directory exceeds max_bytes, the least recently used files are removed
+def evict_metadata_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES, keep=None):
+    if max_bytes is None or not os.path.isdir(cache_dir):
+        return []
+
+    files = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json.gz"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    evicted = []
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted.append(path)
+    return evicted
+
+
+# get_table_info ile aynı çıktı; değişmeyen tablolar cache'ten gelir.
+# Same output as get_table_info; unchanged tables come from the cache.
+# Şema/index değişen ve yeni tablolar yeniden taranır, sadece satır sayısı değişenler yerinde güncellenir.
+# Tables with schema/index changes and new tables are re-harvested; row-count-only changes are updated in place.
+@timed("get_cached_table_info")
+def get_cached_table_info(connection, server=None, cache_dir=DEFAULT_CACHE_DIR,
+                          ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    database = connection.getinfo(pyodbc.SQL_DATABASE_NAME)
+    if server is None:
+        server = connection.getinfo(pyodbc.SQL_SERVER_NAME)
+
+    stamps = _fetch_table_stamps(connection)
+    entry = load_metadata_cache(server, database, cache_dir, ttl_seconds)
+
+    if entry is None:
+        tables = {}
+        created_at = time.time()
+        to_harvest = []
+        mode = "full"
+    else:
+        tables = entry["tables"]
+        created_at = entry["created_at"]
+        mode = "incremental"
+        to_harvest = []
+        for object_id, stamp in stamps.items():
+            cached = tables.get(object_id)
+            if cached is None:
+                to_harvest.append(object_id)
+            elif (cached["stamp"]["modify_date"] != stamp["modify_date"]
+                  or cached["stamp"]["index_checksum"] != stamp["index_checksum"]):
+                to_harvest.append(object_id)
+            elif cached["stamp"]["row_count"] != stamp["row_count"]:
+                cached["stamp"] = stamp
+                cached["row"]["row_count"] = stamp["row_count"]
+
+    removed = [object_id for object_id in tables if object_id not in stamps]
+    for object_id in removed:
+        del tables[object_id]
+
+    if mode == "full":
+        harvested = harvest_table_metadata(connection)
+    elif to_harvest:
+        harvested = harvest_table_metadata(connection, object_ids=[int(object_id) for object_id in to_harvest])
+    else:
+        harvested = []
+
+    for item in harvested:
+        object_id = str(item["object_id"])
+        if object_id in stamps:
+            tables[object_id] = {"stamp": stamps[object_id], "row": item}
+
+    save_metadata_cache({
+        "version": CACHE_FORMAT_VERSION,
+        "server": server,
+        "database": database,
+        "created_at": created_at,
+        "refreshed_at": time.time(),
+        "tables": tables
+    }, cache_dir, max_bytes)
+
+    count("metadata_cache.harvested_tables", len(harvested))
+    rows = sorted((cached["row"] for cached in tables.values()), key=lambda item: item["row_count"] or 0, reverse=True)
+    result_list = [build_result_row(database, item) for item in rows]
+    refresh_info = {
+        "mode": mode,
+        "harvested": len(harvested),
+        "removed": len(removed),
+        "tables": len(result_list)
+    }
+    print(f" {database}: metadata cache {mode} refresh, {len(harvested)} tables re-harvested, {len(removed)} removed.")
+    return result_list, refresh_info
+
+
+# ---------------------------------------------------------------------------
+# Kolon istatistikleri: histogram ve yoğunluk (tahmin modu için)
+# Column statistics: histograms and densities (for the estimate-only mode)
+# ---------------------------------------------------------------------------
+
+STATS_CACHE_KIND = ".stats"
+STATS_CACHE_FORMAT_VERSION = 1
+
+# Histogram sadece istatistik güncellenince değişir; damga son güncelleme ve istatistik sayısıdır
+# A histogram only changes when statistics are updated; the stamp is the last update and the stats count
+STATS_STAMPS_SQL = """
+    SELECT s.object_id, MAX(sp.last_updated) AS last_updated, COUNT(*) AS stats_count
+    FROM sys.stats s
+    INNER JOIN sys.tables t ON t.object_id = s.object_id
+    CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) sp
+    GROUP BY s.object_id;
+"""
+
+# Aynı kolonda birden fazla istatistik varsa en yeni ve en çok örneklenen kullanılır
+# When a column has several statistics, the newest and best sampled one is used
+STATS_HISTOGRAM_SQL = """
+    SELECT
+        s.object_id, s.stats_id, sch.name AS schema_name, t.name AS table_name, c.name AS column_name,
+        sp.last_updated, sp.rows, sp.rows_sampled, sp.modification_counter,
+        h.step_number, h.range_high_key, h.range_rows, h.equal_rows, h.distinct_range_rows
+    FROM sys.stats s
+    INNER JOIN sys.tables t ON t.object_id = s.object_id
+    INNER JOIN sys.schemas sch ON sch.schema_id = t.schema_id
+    INNER JOIN sys.stats_columns sc ON sc.object_id = s.object_id AND sc.stats_id = s.stats_id AND sc.stats_column_id = 1
+    INNER JOIN sys.columns c ON c.object_id = sc.object_id AND c.column_id = sc.column_id
+    CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) sp
+    CROSS APPLY sys.dm_db_stats_histogram(s.object_id, s.stats_id) h
+    WHERE 1 = 1 {object_filter}
+    ORDER BY s.object_id, s.stats_id, h.step_number;
+"""
+
+# Çok kolonlu istatistikler; yoğunluk vektörü için DBCC tek tek çalıştırılır
+# Multi-column statistics; DBCC runs one by one for their density vectors
+MULTI_COLUMN_STATS_SQL = """
+    SELECT s.object_id, sch.name, t.name, s.name,
+           STRING_AGG(c.name, ',') WITHIN GROUP (ORDER BY sc.stats_column_id) AS columns
+    FROM sys.stats s
+    INNER JOIN sys.tables t ON t.object_id = s.object_id
+    INNER JOIN sys.schemas sch ON sch.schema_id = t.schema_id
+    INNER JOIN sys.stats_columns sc ON sc.object_id = s.object_id AND sc.stats_id = s.stats_id
+    INNER JOIN sys.columns c ON c.object_id = sc.object_id AND c.column_id = sc.column_id
+    WHERE 1 = 1 {object_filter}
+    GROUP BY s.object_id, sch.name, t.name, s.name
+    HAVING COUNT(*) > 1;
+"""
+
+
+def _quote_name(name):
+    return "[" + name.replace("]", "]]") + "]"
+
+
+# sql_variant anahtarları JSON'a uygun (tür, değer) çiftine çevrilir: n sayı, s metin, d tarih
+# sql_variant keys become JSON-friendly (kind, value) pairs: n number, s text, d date/time
+def _histogram_key(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) or hasattr(value, "as_tuple"):
+        return ["n", float(value)]
+    if hasattr(value, "isoformat"):
+        return ["d", value.isoformat()]
+    if isinstance(value, (bytes, bytearray)):
+        return ["s", bytes(value).hex()]
+    return ["s", str(value)]
+
+
+# Histogramları tablo başına {kolon: istatistik} olarak toplar.
+# Collects histograms per table as {column: statistics}.
+# Adım: [anahtar, range_rows, equal_rows, distinct_range_rows]
+# Step: [key, range_rows, equal_rows, distinct_range_rows]
+def harvest_column_statistics(connection, object_ids=None, density_vectors=False):
+    cursor = connection.cursor()
+    object_filter = ""
+    if object_ids is not None:
+        object_filter = f"AND s.object_id IN ({','.join(str(int(object_id)) for object_id in object_ids)})"
+    cursor.execute(STATS_HISTOGRAM_SQL.format(object_filter=object_filter))
+
+    tables = {}
+    current = None
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        for (object_id, stats_id, schema_name, table_name, column_name, last_updated, rows_total, rows_sampled,
+             modification_counter, step_number, high_key, range_rows, equal_rows, distinct_range_rows) in rows:
+            table = tables.setdefault(str(object_id), {
+                "schema": schema_name.lower(), "table": table_name.lower(), "columns": {}, "densities": {}
+            })
+            if current is None or current[0] != (object_id, stats_id):
+                stats = {
+                    "last_updated": last_updated.isoformat() if last_updated is not None else None,
+                    "rows": float(rows_total or 0),
+                    "rows_sampled": float(rows_sampled or 0),
+                    "modification_counter": int(modification_counter or 0),
+                    "steps": []
+                }
+                current = ((object_id, stats_id), column_name.lower(), stats)
+                previous = table["columns"].get(column_name.lower())
+                if previous is None or (stats["last_updated"] or "", stats["rows_sampled"]) > \
+                        (previous["last_updated"] or "", previous["rows_sampled"]):
+                    table["columns"][column_name.lower()] = stats
+            current[2]["steps"].append([
+                _histogram_key(high_key), float(range_rows or 0), float(equal_rows or 0), float(distinct_range_rows or 0)
+            ])
+
+    if density_vectors:
+        cursor.execute(MULTI_COLUMN_STATS_SQL.format(object_filter=object_filter))
+        for object_id, schema_name, table_name, stats_name, columns in cursor.fetchall():
+            table = tables.get(str(object_id))
+            if table is None:
+                continue
+            try:
+                object_name = f"{_quote_name(schema_name)}.{_quote_name(table_name)}".replace("'", "''")
+                cursor.execute(f"DBCC SHOW_STATISTICS ('{object_name}', {_quote_name(stats_name)}) "
+                               f"WITH DENSITY_VECTOR, NO_INFOMSGS;")
+                # Her satır: All density, Average Length, Columns ("a, b")
+                # Each row: All density, Average Length, Columns ("a, b")
+                for all_density, _, density_columns in cursor.fetchall():
+                    key = ",".join(part.strip().lower() for part in density_columns.split(","))
+                    table["densities"][key] = float(all_density)
+            except Exception:
+                continue
+    return tables
+
+
+def _fetch_stats_stamps(connection):
+    cursor = connection.cursor()
+    cursor.execute(STATS_STAMPS_SQL)
+    return {
+        str(object_id): [last_updated.isoformat() if last_updated is not None else None, stats_count]
+        for object_id, last_updated, stats_count in cursor.fetchall()
+    }
+
+
+# Cache anahtarı olan (sunucu, veritabanı) adları; verilmeyenler bağlantıdan okunur
+# The (server, database) names the cache is keyed by; missing ones are read from the connection
+def connection_source(connection, server=None):
+    if server is None:
+        server = connection.getinfo(pyodbc.SQL_SERVER_NAME)
+    return server, connection.getinfo(pyodbc.SQL_DATABASE_NAME)
+
+
+# Kolon istatistiklerini cache'ten döndürür; istatistiği güncellenen tablolar yeniden okunur.
+# Returns the column statistics from the cache; tables whose statistics were updated are re-read.
+# Dönüş / returns: {db.schema.table: {"columns": {kolon: histogram}, "densities": {"a,b": yoğunluk}}}
+@timed("get_cached_column_statistics")
+def get_cached_column_statistics(connection, server=None, cache_dir=DEFAULT_CACHE_DIR,
+                                 ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_CACHE_BYTES,
+                                 density_vectors=False):
+    server, database = connection_source(connection, server)
+
+    stamps = _fetch_stats_stamps(connection)
+    entry = load_metadata_cache(server, database, cache_dir, ttl_seconds, kind=STATS_CACHE_KIND)
+    tables = entry["tables"] if entry is not None else {}
+    created_at = entry["created_at"] if entry is not None else time.time()
+
+    for object_id in [object_id for object_id in tables if object_id not in stamps]:
+        del tables[object_id]
+    if entry is None:
+        stale = None
+    else:
+        stale = [object_id for object_id, stamp in stamps.items()
+                 if object_id not in tables or tables[object_id]["stamp"] != stamp]
+
+    if stale is None or stale:
+        if stale is None:
+            chunks = [None]
+        else:
+            chunks = [[int(object_id) for object_id in stale[i:i + OBJECT_ID_CHUNK_SIZE]]
+                      for i in range(0, len(stale), OBJECT_ID_CHUNK_SIZE)]
+        for object_ids in chunks:
+            harvested = harvest_column_statistics(connection, object_ids, density_vectors)
+            for object_id, table in harvested.items():
+                table["stamp"] = stamps.get(object_id)
+                tables[object_id] = table
+        # Histogramı olmayan tablolar (ör. boş) her seferinde yeniden okunmasın
+        # Tables without a histogram (e.g. empty ones) are not re-read every time
+        for object_id, stamp in stamps.items():
+            if object_id not in tables or tables[object_id]["stamp"] != stamp:
+                tables[object_id] = {"schema": None, "table": None, "columns": {}, "densities": {}, "stamp": stamp}
+
+        save_metadata_cache({
+            "version": STATS_CACHE_FORMAT_VERSION,
+            "kind": STATS_CACHE_KIND,
+            "server": server,
+            "database": database,
+            "created_at": created_at,
+            "refreshed_at": time.time(),
+            "tables": tables
+        }, cache_dir, max_bytes)
+
+    return column_statistics_from_entry({"database": database, "tables": tables})
+
+
+# Cache kaydını {db.schema.table: istatistik} sözlüğüne çevirir
+# Turns a cache entry into a {db.schema.table: statistics} dict
+def column_statistics_from_entry(entry):
+    prefix = entry["database"].lower()
+    return {f"{prefix}.{table['schema']}.{table['table']}": table for table in entry["tables"].values() if table["table"]}
+
+
+# Bağlantı olmadan (ör. batch işçileri) son kaydedilmiş kolon istatistiklerini okur
+# Reads the last saved column statistics without a connection (e.g. in batch workers)
+def load_column_statistics(server, database, cache_dir=DEFAULT_CACHE_DIR):
+    entry = load_metadata_cache(server, database, cache_dir, ttl_seconds=None, kind=STATS_CACHE_KIND)
+    return column_statistics_from_entry(entry) if entry is not None else {}
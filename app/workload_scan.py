@@ -0,0 +1,280 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from connection_pool import borrowed_connection
+from index_advisor import IndexAdvisor, fetch_missing_index_details
+from metadata_catalog import as_catalog
+from plan_analyzer import analyze_plan
+from query_analyzer import analyze_query_offline
+
+DEFAULT_TOP_N = 20
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_QUERY_STORE_HOURS = 24
+SOURCES = ("dmv", "querystore")
+
+# Plan önbelleğindeki istatistikler query_hash ile gruplanır; her metrik için ilk N sorgu birleşimi döner.
+# Plan cache statistics are grouped by query_hash; the union of the top N queries per metric is returned.
+# Plan, ifade bazında dm_exec_text_query_plan'dan gelir (dm_exec_query_plan'ın XML tipi
+# 128 seviyeden derin planlarda NULL döner ve tüm batch'i kapsar).
+# The plan comes per statement from dm_exec_text_query_plan (the XML type of dm_exec_query_plan
+# is NULL for plans nested deeper than 128 levels and covers the whole batch).
+DMV_TOP_QUERIES_SQL = """
+    WITH stmt AS (
+        SELECT
+            qs.query_hash, qs.sql_handle, qs.plan_handle, qs.statement_start_offset, qs.statement_end_offset,
+            ROW_NUMBER() OVER (PARTITION BY qs.query_hash ORDER BY qs.total_worker_time DESC) AS rn,
+            SUM(qs.execution_count) OVER (PARTITION BY qs.query_hash) AS executions,
+            SUM(qs.total_worker_time) OVER (PARTITION BY qs.query_hash) / 1000.0 AS total_cpu_ms,
+            SUM(qs.total_logical_reads) OVER (PARTITION BY qs.query_hash) AS total_reads,
+            SUM(qs.total_elapsed_time) OVER (PARTITION BY qs.query_hash) / 1000.0 AS total_elapsed_ms,
+            MAX(qs.last_execution_time) OVER (PARTITION BY qs.query_hash) AS last_execution_time
+        FROM sys.dm_exec_query_stats qs
+    ),
+    ranked AS (
+        SELECT *,
+            ROW_NUMBER() OVER (ORDER BY total_cpu_ms DESC) AS cpu_rank,
+            ROW_NUMBER() OVER (ORDER BY total_reads DESC) AS reads_rank,
+            ROW_NUMBER() OVER (ORDER BY total_elapsed_ms DESC) AS duration_rank,
+            ROW_NUMBER() OVER (ORDER BY executions DESC) AS executions_rank
+        FROM stmt
+        WHERE rn = 1
+    )
+    SELECT
+        CONVERT(VARCHAR(18), r.query_hash, 1) AS query_hash,
+        COALESCE(DB_NAME(st.dbid), DB_NAME(CONVERT(INT, pa.value))) AS database_name,
+        SUBSTRING(st.text, r.statement_start_offset / 2 + 1,
+            (CASE r.statement_end_offset WHEN -1 THEN DATALENGTH(st.text) ELSE r.statement_end_offset END
+             - r.statement_start_offset) / 2 + 1) AS query_text,
+        r.executions, r.total_cpu_ms, r.total_reads, r.total_elapsed_ms, r.last_execution_time,
+        r.cpu_rank, r.reads_rank, r.duration_rank, r.executions_rank,
+        {plan_column} AS plan_xml
+    FROM ranked r
+    CROSS APPLY sys.dm_exec_sql_text(r.sql_handle) st
+    OUTER APPLY (
+        SELECT value FROM sys.dm_exec_plan_attributes(r.plan_handle) WHERE attribute = 'dbid'
+    ) pa
+    {plan_apply}
+    WHERE r.cpu_rank <= ? OR r.reads_rank <= ? OR r.duration_rank <= ? OR r.executions_rank <= ?
+    ORDER BY r.cpu_rank;
+"""
+
+DMV_PLAN_APPLY = ("OUTER APPLY sys.dm_exec_text_query_plan("
+                  "r.plan_handle, r.statement_start_offset, r.statement_end_offset) qp")
+
+# Query Store: bağlı veritabanı için son N saatin çalışma istatistikleri (süreler mikrosaniye)
+# Query Store: runtime statistics of the last N hours for the connected database (times in microseconds)
+QUERY_STORE_TOP_QUERIES_SQL = """
+    WITH agg AS (
+        SELECT
+            q.query_id, q.query_text_id,
+            MAX(p.plan_id) AS plan_id,
+            SUM(rs.count_executions) AS executions,
+            SUM(rs.avg_cpu_time * rs.count_executions) / 1000.0 AS total_cpu_ms,
+            SUM(rs.avg_logical_io_reads * rs.count_executions) AS total_reads,
+            SUM(rs.avg_duration * rs.count_executions) / 1000.0 AS total_elapsed_ms,
+            MAX(rs.last_execution_time) AS last_execution_time
+        FROM sys.query_store_runtime_stats rs
+        JOIN sys.query_store_runtime_stats_interval i ON i.runtime_stats_interval_id = rs.runtime_stats_interval_id
+        JOIN sys.query_store_plan p ON p.plan_id = rs.plan_id
+        JOIN sys.query_store_query q ON q.query_id = p.query_id
+        WHERE i.start_time >= DATEADD(HOUR, -?, SYSUTCDATETIME())
+        GROUP BY q.query_id, q.query_text_id
+    ),
+    ranked AS (
+        SELECT *,
+            ROW_NUMBER() OVER (ORDER BY total_cpu_ms DESC) AS cpu_rank,
+            ROW_NUMBER() OVER (ORDER BY total_reads DESC) AS reads_rank,
+            ROW_NUMBER() OVER (ORDER BY total_elapsed_ms DESC) AS duration_rank,
+            ROW_NUMBER() OVER (ORDER BY executions DESC) AS executions_rank
+        FROM agg
+    )
+    SELECT
+        CONVERT(VARCHAR(18), q.query_hash, 1) AS query_hash,
+        DB_NAME() AS database_name,
+        qt.query_sql_text AS query_text,
+        r.executions, r.total_cpu_ms, r.total_reads, r.total_elapsed_ms, r.last_execution_time,
+        r.cpu_rank, r.reads_rank, r.duration_rank, r.executions_rank,
+        {plan_column} AS plan_xml
+    FROM ranked r
+    JOIN sys.query_store_query q ON q.query_id = r.query_id
+    JOIN sys.query_store_query_text qt ON qt.query_text_id = r.query_text_id
+    {plan_apply}
+    WHERE r.cpu_rank <= ? OR r.reads_rank <= ? OR r.duration_rank <= ? OR r.executions_rank <= ?
+    ORDER BY r.cpu_rank;
+"""
+
+QUERY_STORE_PLAN_APPLY = "LEFT JOIN sys.query_store_plan qp ON qp.plan_id = r.plan_id"
+
+RESULT_COLUMNS = ("query_hash", "database", "query", "executions", "total_cpu_ms", "total_reads",
+                  "total_elapsed_ms", "last_execution_time", "cpu_rank", "reads_rank", "duration_rank",
+                  "executions_rank", "plan_xml")
+
+
+def _top_queries_sql(source, include_plans):
+    if source == "dmv":
+        return DMV_TOP_QUERIES_SQL.format(
+            plan_column="qp.query_plan" if include_plans else "NULL",
+            plan_apply=DMV_PLAN_APPLY if include_plans else ""
+        )
+    if source == "querystore":
+        return QUERY_STORE_TOP_QUERIES_SQL.format(
+            plan_column="qp.query_plan" if include_plans else "NULL",
+            plan_apply=QUERY_STORE_PLAN_APPLY if include_plans else ""
+        )
+    raise ValueError(f"Unknown workload source: {source}")
+
+
+# En pahalı sorguları akış halinde okur; büyük plan XML'leri satır satır gelir
+# Streams the most expensive queries; large plan XMLs arrive row by row
+def fetch_top_queries(connection, top_n=DEFAULT_TOP_N, source="dmv", include_plans=True,
+                      hours=DEFAULT_QUERY_STORE_HOURS):
+    with borrowed_connection(connection) as conn:
+        cursor = conn.cursor()
+        params = [top_n] * 4
+        if source == "querystore":
+            params.insert(0, hours)
+        cursor.execute(_top_queries_sql(source, include_plans), *params)
+        while True:
+            rows = cursor.fetchmany(10)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(RESULT_COLUMNS, row))
+                # NUMERIC sütunlar Decimal gelir / NUMERIC columns arrive as Decimal
+                for key in ("total_cpu_ms", "total_reads", "total_elapsed_ms"):
+                    record[key] = float(record[key] or 0)
+                record["source"] = source
+                yield record
+
+
+def _analyze_offender(record, catalog, default_db):
+    database = (record["database"] or default_db or "").lower() or None
+    offender = {key: value for key, value in record.items() if key != "plan_xml"}
+    executions = record["executions"] or 1
+    offender.update({
+        "avg_cpu_ms": record["total_cpu_ms"] / executions,
+        "avg_reads": record["total_reads"] / executions,
+        "avg_elapsed_ms": record["total_elapsed_ms"] / executions
+    })
+
+    # Sorgu tekrar çalıştırılmaz: yapı + metadata + önbellekteki plan
+    # Nothing is re-executed: structure + metadata + the cached plan
+    offline = analyze_query_offline(record["query"], catalog, database)
+    offender.update({
+        "tables": offline["tables"],
+        "table_metadata": offline["table_metadata"],
+        "structure_findings": [f for f in offline["structure_findings"] if not f.startswith("✅")],
+        "recommendations": offline["recommendations"],
+        "plan_warnings": [],
+        "hot_operators": [],
+        "missing_indexes": [],
+        "plan_hash": None
+    })
+
+    if record.get("plan_xml"):
+        plan_analysis = analyze_plan(record["plan_xml"], top=3)
+        if plan_analysis["status"] == "success":
+            offender.update({
+                "plan_warnings": plan_analysis["warnings"],
+                "hot_operators": plan_analysis["hot_operators"],
+                "missing_indexes": plan_analysis["missing_indexes"],
+                "plan_hash": plan_analysis["plan_hash"],
+                "estimated_cost": plan_analysis["total_cost"]
+            })
+        else:
+            offender["plan_warnings"] = [f"⚠️ {plan_analysis['error']}"]
+    return offender
+
+
+# Kaynak payı (toplam CPU/okuma/süre içindeki yüzde) ve bulgu sayısından sıralama puanı
+# Ranking score from resource share (percent of total CPU/reads/duration) and the number of findings
+def _score(offender, totals):
+    shares = [
+        offender["total_cpu_ms"] / totals["cpu"] if totals["cpu"] else 0,
+        offender["total_reads"] / totals["reads"] if totals["reads"] else 0,
+        offender["total_elapsed_ms"] / totals["duration"] if totals["duration"] else 0
+    ]
+    findings = len(offender["structure_findings"]) + len(offender["plan_warnings"])
+    missing_index_impact = max((index["impact"] or 0 for index in offender["missing_indexes"]), default=0)
+    return round(100 * max(shares) + 2 * findings + missing_index_impact / 10, 2)
+
+
+# DMV veya Query Store'dan en pahalı sorguları çeker, analizleri eşzamanlı yürütür ve sıralı rapor döndürür.
+# Pulls the most expensive queries from the DMVs or Query Store, runs the analyses concurrently
+# and returns a ranked report.
+# missing_index_dmv: sys.dm_db_missing_index_details da iş yükü geneli index önerilerine katılır
+# missing_index_dmv: sys.dm_db_missing_index_details also feeds the workload-wide index suggestions
+# cancelled: her analizden sonra sorulur; True dönerse kalan analizler atlanır ve {"status": "cancelled"} döner
+# cancelled: asked after every analysis; when it returns True the remaining analyses are skipped and
+# {"status": "cancelled"} is returned
+def scan_workload(connection, metadata_dict=None, top_n=DEFAULT_TOP_N, source="dmv", default_db=None,
+                  include_plans=True, hours=DEFAULT_QUERY_STORE_HOURS, max_workers=DEFAULT_MAX_WORKERS,
+                  on_progress=None, missing_index_dmv=True, cancelled=None):
+    started = time.perf_counter()
+    catalog = as_catalog(metadata_dict or {})
+    offenders = []
+    errors = []
+
+    try:
+        # Satırlar gelirken analiz başlar; ağ aktarımı ile ayrıştırma örtüşür
+        # Analysis starts while rows are still arriving, overlapping transfer and parsing
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="workload") as executor:
+            futures = [
+                executor.submit(_analyze_offender, record, catalog, default_db)
+                for record in fetch_top_queries(connection, top_n, source, include_plans, hours)
+            ]
+            for done, future in enumerate(futures, 1):
+                try:
+                    offenders.append(future.result())
+                except Exception as e:
+                    errors.append(str(e))
+                if on_progress:
+                    on_progress(done, len(futures))
+                if cancelled is not None and cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    return {"status": "cancelled", "source": source}
+    except Exception as e:
+        return {"status": "error", "error": str(e), "source": source}
+
+    totals = {
+        "cpu": sum(o["total_cpu_ms"] or 0 for o in offenders),
+        "reads": sum(o["total_reads"] or 0 for o in offenders),
+        "duration": sum(o["total_elapsed_ms"] or 0 for o in offenders)
+    }
+    for offender in offenders:
+        offender["score"] = _score(offender, totals)
+    offenders.sort(key=lambda o: o["score"], reverse=True)
+    for rank, offender in enumerate(offenders, 1):
+        offender["rank"] = rank
+
+    # Önerilerin ağırlığı sorgunun çalıştırma sayısıdır; aynı index birden çok sorgu için tek öneri olur
+    # Suggestions are weighted by execution count; one index serving several queries becomes one suggestion
+    advisor = IndexAdvisor(catalog, default_db)
+    for offender in offenders:
+        weight = offender["executions"] or 1
+        advisor.add_query(offender["query"], weight, offender["query_hash"])
+        advisor.add_missing_indexes(offender["missing_indexes"], weight, "plan", offender["query_hash"])
+    if missing_index_dmv:
+        try:
+            advisor.add_missing_indexes(fetch_missing_index_details(connection), source="dmv")
+        except Exception as e:
+            errors.append(f"Missing index DMV: {e}")
+
+    return {
+        "status": "success",
+        "source": source,
+        "offenders": offenders,
+        "index_recommendations": advisor.recommendations(),
+        "errors": errors,
+        "elapsed_s": time.perf_counter() - started
+    }
@@ -0,0 +1,489 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "app"))
+
+
+# pyodbc sunucu gerektirmez ama sistemde unixODBC olmadan yüklenemez. Ölçülen yollar sadece FakeConnection
+# kullanır ve pyodbc'den yalnız getinfo sabitlerini okur; bu durumda yerine bu sabitleri taşıyan bir modül konur.
+# pyodbc needs no server, but it cannot be imported without unixODBC on the system. The measured paths only use
+# FakeConnection and read nothing but the getinfo constants from pyodbc; in that case a module carrying them is used.
+def _ensure_pyodbc():
+    try:
+        import pyodbc  # noqa: F401
+    except ImportError:
+        module = types.ModuleType("pyodbc")
+        module.SQL_SERVER_NAME = 13
+        module.SQL_DATABASE_NAME = 16
+        module.Error = Exception
+
+        def connect(*args, **kwargs):
+            raise ImportError("pyodbc is not available; benchmarks only use fake connections")
+        module.connect = connect
+        sys.modules["pyodbc"] = module
+
+
+_ensure_pyodbc()
+
+from synthetic import (synthetic_catalog_columns, synthetic_query, synthetic_statistics_messages,
+                       synthetic_showplan, table_name, SCHEMAS)
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# quick: her commit için birkaç saniye; full: 1M tablo ve 100k operatör (dakikalar, birkaç GB bellek)
+# quick: a few seconds per commit; full: 1M tables and 100k operators (minutes, a few GB of memory)
+PROFILES = {
+    "quick": {"tables": [1_000, 100_000], "joins": [50, 500], "statements": [100, 5_000],
+              "operators": [10_000], "repeat": 5},
+    "full": {"tables": [1_000, 100_000, 1_000_000], "joins": [50, 500, 2_000], "statements": [100, 5_000, 50_000],
+             "operators": [10_000, 100_000], "repeat": 3}
+}
+# Sorgu aşamalarının çözümlediği katalog boyutu / catalog size used by the query stages
+QUERY_CATALOG_TABLES = 100_000
+RESOLVE_LOOKUPS = 10_000
+# analyze_query'deki sahte bağlantının döndürdüğü gerçek planın boyutu
+# Size of the actual plan returned by the fake connection in analyze_query
+FAKE_PLAN_OPERATORS = 2_000
+FAKE_RESULT_ROWS = 20_000
+
+# Gerileme: medyan süre baz değerin tolerans kadar üstünde VE mutlak fark eşiği aşmışsa
+# Regression: the median time is above the baseline by the tolerance AND by the absolute floor
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+MIN_TIME_REGRESSION_MS = 5.0
+MIN_MEMORY_REGRESSION_KB = 256
+
+
+# ---------------------------------------------------------------------------
+# SQL Server olmadan analyze_query: STATISTICS mesajları ve gerçek plan döndüren bağlantı
+# analyze_query without SQL Server: a connection returning STATISTICS messages and an actual plan
+# ---------------------------------------------------------------------------
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.messages = []
+        self.description = None
+        self.rowcount = -1
+        self._sets = []
+        self._rows = []
+
+    def execute(self, sql, *params):
+        if sql.lstrip().upper().startswith("SET "):
+            self._sets = [(None, [], [])]
+        else:
+            self._sets = list(self.connection.result_sets)
+        self.nextset()
+        return self
+
+    def nextset(self):
+        if not self._sets:
+            self.description, self._rows, self.messages = None, [], []
+            return False
+        self.description, rows, messages = self._sets.pop(0)
+        self._rows = list(rows)
+        self.messages = [("[01000] (0)", message) for message in messages]
+        return True
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def cancel(self):
+        self._sets = []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, database, messages, plan_xml, result_rows):
+        from performance_analyzer import SHOWPLAN_COLUMN
+
+        self.database = database
+        self.result_sets = [
+            ((("id", int), ("name", str)), [(i, f"row {i}") for i in range(result_rows)], messages),
+            (((SHOWPLAN_COLUMN, str),), [(plan_xml,)], [])
+        ]
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def getinfo(self, key):
+        return self.database
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Aşamalar: her biri (boyut, paylaşılan girdiler) alır ve ölçülecek çağrıyı döndürür.
+# Stages: each takes (size, shared inputs) and returns the call to be measured.
+# Hazırlık (girdi üretimi) ölçüme dahil değildir.
+# Preparation (input generation) is not part of the measurement.
+# ---------------------------------------------------------------------------
+
+class SharedInputs:
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, key, factory):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def catalog_columns(self, tables):
+        return self.get(("columns", tables), lambda: synthetic_catalog_columns(tables))
+
+    def catalog(self, tables):
+        from metadata_catalog import MetadataCatalog
+
+        return self.get(("catalog", tables), lambda: MetadataCatalog.from_columns(self.catalog_columns(tables)))
+
+
+def stage_catalog_build(size, inputs):
+    from metadata_catalog import MetadataCatalog
+
+    columns = inputs.catalog_columns(size)
+    return lambda: MetadataCatalog.from_columns(columns)
+
+
+def stage_catalog_resolve(size, inputs):
+    catalog = inputs.catalog(size)
+    names = []
+    for i in range(RESOLVE_LOOKUPS):
+        number = (i * 7919) % (size + size // 10)
+        form = i % 3
+        if form == 0:
+            names.append(table_name(number))
+        elif form == 1:
+            names.append(f"{SCHEMAS[number % len(SCHEMAS)]}.{table_name(number)}")
+        else:
+            names.append(f"[db0].[{SCHEMAS[number % len(SCHEMAS)]}].[{table_name(number)}]")
+
+    def run():
+        for name in names:
+            catalog.resolve_row(name, "db0")
+    return run
+
+
+def stage_extract_tables(size, inputs):
+    from sql_parser import extract_tables_from_query, clear_parse_cache
+
+    query = synthetic_query(size, QUERY_CATALOG_TABLES)
+
+    # Parse cache her turda boşaltılır; soğuk parse ölçülür
+    # The parse cache is emptied every round so a cold parse is measured
+    def run():
+        clear_parse_cache()
+        return extract_tables_from_query(query)
+    return run
+
+
+def stage_analyze_structure(size, inputs):
+    from query_optimizer_engine import analyze_structure
+    from sql_parser import clear_parse_cache
+
+    query = synthetic_query(size, QUERY_CATALOG_TABLES)
+    catalog = inputs.catalog(QUERY_CATALOG_TABLES)
+
+    def run():
+        clear_parse_cache()
+        return analyze_structure(query, catalog, "db0")
+    return run
+
+
+def stage_interpret_statistics(size, inputs):
+    from performance_analyzer import interpret_statistics_output
+
+    messages = synthetic_statistics_messages(size, table_count=QUERY_CATALOG_TABLES)
+    catalog = inputs.catalog(QUERY_CATALOG_TABLES)
+    return lambda: interpret_statistics_output(messages, catalog, "db0")
+
+
+def stage_graphviz_plan(size, inputs):
+    from graphviz_execution_plan import parse_execution_plan_for_graphviz
+
+    plan_xml = inputs.get(("plan", size, False), lambda: synthetic_showplan(size))
+
+    def run():
+        result = parse_execution_plan_for_graphviz(plan_xml)
+        if result["status"] != "success":
+            raise RuntimeError(result["error"])
+        return result
+    return run
+
+
+def stage_analyze_plan(size, inputs):
+    from plan_analyzer import analyze_plan
+
+    plan_xml = inputs.get(("plan", size, True), lambda: synthetic_showplan(size, actual=True))
+    return lambda: analyze_plan(plan_xml)
+
+
+def stage_analyze_query(size, inputs):
+    from query_analyzer import analyze_query
+    from sql_parser import clear_parse_cache
+
+    query = synthetic_query(size, QUERY_CATALOG_TABLES)
+    catalog = inputs.catalog(QUERY_CATALOG_TABLES)
+    connection = FakeConnection(
+        "db0",
+        synthetic_statistics_messages(size // 10 + 1, table_count=QUERY_CATALOG_TABLES),
+        inputs.get(("plan", FAKE_PLAN_OPERATORS, True), lambda: synthetic_showplan(FAKE_PLAN_OPERATORS, actual=True)),
+        FAKE_RESULT_ROWS
+    )
+
+    def run():
+        clear_parse_cache()
+        result = analyze_query(connection, query, catalog, measure_mode="single")
+        if result["performance"].get("status") != "success":
+            raise RuntimeError(result["performance"].get("error"))
+        return result
+    return run
+
+
+# Kayıt arşivindeki tüm analizleri (capture.py) sunucusuz tekrar çalıştırır
+# Re-runs every analysis in a capture archive (capture.py) without a server
+def stage_analyze_query_replay(replay, catalog):
+    from query_analyzer import analyze_query
+    from sql_parser import clear_parse_cache
+
+    analyses = replay.recorded_analyses()
+
+    def run():
+        clear_parse_cache()
+        for mode, query in analyses:
+            analyze_query(replay.connect(), query, catalog, measure_mode=mode)
+    return run, len(analyses)
+
+
+# Ayrıştırma ölçülmez: iki plan (birkaç join tipi değişmiş) önceden ayrıştırılır, sadece eşleme ve karşılaştırma ölçülür
+# Parsing is not measured: both plans (a few join types changed) are parsed up front, only matching and comparison are
+def stage_diff_plans(size, inputs):
+    from plan_analyzer import parse_showplan
+    from plan_diff import diff_plans
+
+    plan_xml = inputs.get(("plan", size, False), lambda: synthetic_showplan(size))
+    old_plan = parse_showplan(plan_xml)
+    new_plan = parse_showplan(plan_xml.replace('PhysicalOp="Hash Match"', 'PhysicalOp="Merge Join"', 5))
+    return lambda: diff_plans(old_plan, new_plan)
+
+
+# Arayüzdeki varsayılan katlanmış görünüm (DOT üretimi); plan önceden ayrıştırılır
+# The UI's default collapsed view (DOT generation); the plan is parsed up front
+def stage_plan_view(size, inputs):
+    from graphviz_execution_plan import plan_view
+    from plan_analyzer import parse_showplan
+
+    plan = parse_showplan(inputs.get(("plan", size, False), lambda: synthetic_showplan(size)))
+    return lambda: plan_view(plan)
+
+
+# (aşama adı, profil boyut anahtarı, hazırlık fonksiyonu)
+# (stage name, profile size key, preparation function)
+STAGES = [
+    ("catalog_build", "tables", stage_catalog_build),
+    ("catalog_resolve", "tables", stage_catalog_resolve),
+    ("extract_tables_from_query", "joins", stage_extract_tables),
+    ("analyze_structure", "joins", stage_analyze_structure),
+    ("interpret_statistics_output", "statements", stage_interpret_statistics),
+    ("parse_execution_plan_for_graphviz", "operators", stage_graphviz_plan),
+    ("analyze_plan", "operators", stage_analyze_plan),
+    ("diff_plans", "operators", stage_diff_plans),
+    ("plan_view", "operators", stage_plan_view),
+    ("analyze_query", "joins", stage_analyze_query),
+]
+
+
+# Süre tracemalloc kapalıyken ölçülür; tepe bellek ayrı bir turda tracemalloc ile ölçülür
+# Time is measured with tracemalloc off; peak memory is measured in a separate traced round
+def measure(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "repeat": repeat
+    }
+
+
+def run_benchmarks(profile="quick", only=None, repeat=None, on_result=None, replay_path=None, metadata_path=None):
+    settings = PROFILES[profile]
+    repeat = repeat or settings["repeat"]
+    inputs = SharedInputs()
+    results = {}
+
+    for name, size_key, prepare in STAGES:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        for size in settings[size_key]:
+            case = f"{name}[{size}]"
+            try:
+                result = measure(prepare(size, inputs), repeat)
+            except ImportError as e:
+                # Opsiyonel bir bağımlılık eksik / an optional dependency is missing
+                result = {"skipped": f"import failed: {e}"}
+            results[case] = result
+            if on_result:
+                on_result(case, result)
+
+    if replay_path:
+        from capture import CaptureReplay
+        from metadata_catalog import MetadataCatalog
+        from metadata_store import load_metadata_columns
+
+        catalog = MetadataCatalog.from_columns(load_metadata_columns(metadata_path)) if metadata_path \
+            else MetadataCatalog()
+        run, count = stage_analyze_query_replay(CaptureReplay(replay_path), catalog)
+        result = measure(run, repeat)
+        result["queries_per_s"] = round(count / (result["median_ms"] / 1000), 1) if result["median_ms"] else None
+        # Arşiv adı baz değer anahtarına girer; farklı arşivler karşılaştırılmaz
+        # The archive name is part of the baseline key; different archives are not compared
+        case = f"analyze_query_replay[{os.path.basename(replay_path)}:{count}]"
+        results[case] = result
+        if on_result:
+            on_result(case, result)
+    return results
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(path, profile, results):
+    # Aynı dosyada birden fazla profil tutulabilir / one file can hold several profiles
+    baseline = load_baseline(path) or {"profiles": {}}
+    baseline["profiles"][profile] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": {case: result for case, result in results.items() if "skipped" not in result}
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    return path
+
+
+# Baz değere göre gerilemeleri döndürür: [(case, metrik, baz, şimdiki)]
+# Returns the regressions against the baseline: [(case, metric, baseline, current)]
+def compare_with_baseline(results, baseline_results, time_tolerance=DEFAULT_TIME_TOLERANCE,
+                          memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    regressions = []
+    for case, result in results.items():
+        base = baseline_results.get(case)
+        if base is None or "skipped" in result:
+            continue
+        if result["median_ms"] > base["median_ms"] * (1 + time_tolerance) and \
+                result["median_ms"] - base["median_ms"] > MIN_TIME_REGRESSION_MS:
+            regressions.append((case, "median_ms", base["median_ms"], result["median_ms"]))
+        if result["peak_kb"] > base["peak_kb"] * (1 + memory_tolerance) and \
+                result["peak_kb"] - base["peak_kb"] > MIN_MEMORY_REGRESSION_KB:
+            regressions.append((case, "peak_kb", base["peak_kb"], result["peak_kb"]))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks for the analyzer hot paths (no SQL Server needed)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="Run only stages whose name contains one of these")
+    parser.add_argument("--repeat", type=int, help="Timed rounds per case (default depends on the profile)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE,
+                        help="Allowed relative slowdown of the median time")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help="Allowed relative growth of the peak memory")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--replay", metavar="ARCHIVE",
+                        help="Also replay every analysis recorded with main.py --record (no server needed)")
+    parser.add_argument("--metadata", help="Metadata store (.sqlite) used with --replay")
+    # CI'da baz değer yoksa kapı sessizce geçmemeli / in CI a missing baseline must not pass the gate silently
+    parser.add_argument("--require-baseline", action="store_true", default=bool(os.environ.get("CI")),
+                        help="Fail (exit 2) when there is no baseline for the profile (default when CI is set)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    baseline = load_baseline(args.baseline)
+    baseline_results = (baseline or {}).get("profiles", {}).get(args.profile, {}).get("results", {})
+
+    def report(case, result):
+        if "skipped" in result:
+            print(f" {case:<50} skipped: {result['skipped']}", flush=True)
+            return
+        base = baseline_results.get(case)
+        delta = f"  ({result['median_ms'] / base['median_ms'] - 1:+.0%} vs baseline)" \
+            if base and base["median_ms"] else ""
+        print(f" {case:<50} median {result['median_ms']:>10.1f} ms  min {result['min_ms']:>10.1f} ms  "
+              f"peak {result['peak_kb'] / 1024:>8.1f} MB{delta}"
+              f"{'  ' + str(result['queries_per_s']) + ' queries/s' if result.get('queries_per_s') else ''}", flush=True)
+
+    print(f" Profile: {args.profile}  Python {platform.python_version()}\n")
+    results = run_benchmarks(args.profile, args.only, args.repeat, on_result=report,
+                             replay_path=args.replay, metadata_path=args.metadata)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "results": results}, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        print(f"\n Baseline updated: {save_baseline(args.baseline, args.profile, results)}")
+        return 0
+    if not baseline_results:
+        print(f"\n No baseline for profile '{args.profile}' in {args.baseline}; run with --update-baseline to store one.")
+        return 2 if args.require_baseline else 0
+
+    regressions = compare_with_baseline(results, baseline_results, args.time_tolerance, args.memory_tolerance)
+    if not regressions:
+        print("\n No regressions against the baseline.")
+        return 0
+    print(f"\n {len(regressions)} regression(s):")
+    for case, metric, base, current in regressions:
+        print(f"  {case} {metric}: {base} -> {current}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
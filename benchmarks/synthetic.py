@@ -0,0 +1,215 @@
+"""
+Developed by Mikail Tipi
+mkltipi@gmail.com
+https://www.linkedin.com/in/mikailtipi/
+
+Description:
+    This module is part of the SQL Query Analyzer project. It provides the main Streamlit-based user interface for analyzing SQL Server queries.
+    Created using Python 3.x and Streamlit.
+"""
+import array
+import random
+from xml.sax.saxutils import quoteattr
+
+from metadata_store import LIST_SEPARATOR, encode_indexes
+
+# Tüm üreticiler seed ile deterministiktir; aynı boyut her makinede aynı girdiyi üretir
+# Every generator is deterministic for a seed; the same size yields the same input on every machine
+DEFAULT_SEED = 20240101
+
+SHOWPLAN_XMLNS = "http://schemas.microsoft.com/sqlserver/2004/07/showplan"
+SCHEMAS = ("dbo", "sales", "hr", "stage")
+LEAF_OPERATORS = (("Clustered Index Scan", "Clustered Index Scan"), ("Index Seek", "Index Seek"),
+                  ("Table Scan", "Table Scan"), ("Clustered Index Seek", "Clustered Index Seek"))
+INNER_OPERATORS = (("Nested Loops", "Inner Join", "NestedLoops"), ("Hash Match", "Inner Join", "Hash"),
+                   ("Merge Join", "Inner Join", "Merge"), ("Sort", "Sort", "Sort"),
+                   ("Compute Scalar", "Compute Scalar", "ComputeScalar"), ("Parallelism", "Gather Streams", "Parallelism"))
+
+
+def table_name(i):
+    return f"t{i:07d}"
+
+
+def column_name(i):
+    return f"c{i}"
+
+
+# load_metadata_columns çıktısıyla aynı biçimde kolon bazlı katalog verisi
+# Columnar catalog data in the same shape as the load_metadata_columns output
+# Tablo adlarının ~%5'i ikinci bir veritabanında tekrar eder (belirsiz ad çözümlemesi için)
+# ~5% of the table names repeat in a second database (for ambiguous name resolution)
+def synthetic_catalog_columns(table_count, databases=2, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    columns = {name: [] for name in ("database", "schema", "table", "index_columns", "indexes")}
+    row_counts = array.array("q")
+    column_counts = array.array("q")
+    has_index = bytearray()
+
+    for i in range(table_count):
+        duplicate = i > 0 and rng.random() < 0.05
+        number = rng.randrange(i) if duplicate else i
+        column_count = rng.randint(3, 60)
+        # Satır sayıları log-uniform: çoğu küçük, az sayıda çok büyük tablo
+        # Log-uniform row counts: mostly small tables, a few very large ones
+        rows = int(10 ** rng.uniform(0, 9))
+        indexes = []
+        if rng.random() < 0.8:
+            indexes.append({"name": f"pk_{table_name(number)}", "type": "CLUSTERED", "is_primary_key": True,
+                            "is_unique": True, "key_columns": ["id"], "included_columns": []})
+            for k in range(rng.randint(0, 3)):
+                indexes.append({"name": f"ix_{table_name(number)}_{k}", "type": "NONCLUSTERED",
+                                "is_primary_key": False, "is_unique": False,
+                                "key_columns": [column_name(rng.randint(1, column_count))],
+                                "included_columns": [column_name(rng.randint(1, column_count))]})
+        columns["database"].append(f"db{(1 if duplicate else 0) % databases}")
+        columns["schema"].append(SCHEMAS[number % len(SCHEMAS)])
+        columns["table"].append(table_name(number))
+        columns["index_columns"].append(LIST_SEPARATOR.join(c for index in indexes for c in index["key_columns"]))
+        columns["indexes"].append(encode_indexes(indexes))
+        row_counts.append(rows)
+        column_counts.append(column_count)
+        has_index.append(1 if indexes else 0)
+
+    columns["row_count"] = row_counts
+    columns["column_count"] = column_counts
+    columns["has_index"] = bytes(has_index)
+    columns["count"] = table_count
+    return columns
+
+
+# Büyük, gerçekçi bir sorgu: CTE, JOIN zinciri, alt sorgular, IN listeleri, yorumlar
+# A large, realistic query: CTEs, a JOIN chain, subqueries, IN lists and comments
+# table_count: katalogdaki tablo sayısı, adlar buradan seçilir (birkaçı bilerek eksik)
+# table_count: number of tables in the catalog the names are drawn from (a few are missing on purpose)
+def synthetic_query(join_count, table_count, seed=DEFAULT_SEED):
+    rng = random.Random(seed + join_count)
+
+    def pick():
+        number = rng.randrange(table_count + max(1, table_count // 50))
+        schema = SCHEMAS[number % len(SCHEMAS)]
+        return f"{schema}.{table_name(number)}" if rng.random() < 0.7 else table_name(number)
+
+    parts = [f"-- synthetic workload query with {join_count} joins", "WITH recent AS (",
+             f"    SELECT r.id, r.c1, r.c2 FROM {pick()} r /* inline comment */ WHERE r.c2 >= '2024-01-01'",
+             ")",
+             "SELECT t0.*, " + ", ".join(f"t{i}.c{1 + i % 5}" for i in range(1, min(join_count, 50) + 1)),
+             f"FROM {pick()} t0",
+             "INNER JOIN recent ON recent.id = t0.id"]
+    for i in range(1, join_count + 1):
+        join = rng.choice(("INNER JOIN", "LEFT JOIN", "LEFT OUTER JOIN", "INNER JOIN"))
+        hint = " WITH (NOLOCK)" if rng.random() < 0.1 else ""
+        parts.append(f"{join} {pick()} t{i}{hint} ON t{i}.id = t{rng.randrange(i)}.c{rng.randint(1, 9)}")
+
+    predicates = []
+    for i in range(join_count + 1):
+        kind = rng.random()
+        if kind < 0.4:
+            predicates.append(f"t{i}.c{rng.randint(1, 9)} = {rng.randint(1, 10_000)}")
+        elif kind < 0.6:
+            predicates.append(f"t{i}.c{rng.randint(1, 9)} BETWEEN @from{i} AND @to{i}")
+        elif kind < 0.75:
+            values = ", ".join(str(rng.randint(1, 10_000)) for _ in range(rng.randint(5, 40)))
+            predicates.append(f"t{i}.c{rng.randint(1, 9)} IN ({values})")
+        elif kind < 0.85:
+            predicates.append(f"t{i}.c{rng.randint(1, 9)} LIKE 'ab{i}%'")
+        else:
+            predicates.append(f"EXISTS (SELECT 1 FROM {pick()} x{i} WHERE x{i}.id = t{i}.id AND x{i}.c3 <> N'x')")
+    parts.append("WHERE " + "\n  AND ".join(predicates))
+    parts.append("ORDER BY t0.id DESC, t1.c2")
+    return "\n".join(parts)
+
+
+# STATISTICS IO/TIME mesaj akışı; pyodbc cursor.messages metinleriyle aynı biçim
+# A STATISTICS IO/TIME message stream in the same shape as the pyodbc cursor.messages texts
+def synthetic_statistics_messages(statement_count, tables_per_statement=8, table_count=1000, seed=DEFAULT_SEED):
+    rng = random.Random(seed + statement_count)
+    messages = []
+    for _ in range(statement_count):
+        messages.append("SQL Server parse and compile time: ")
+        messages.append(f"   CPU time = {rng.randint(0, 40)} ms, elapsed time = {rng.randint(0, 80)} ms.")
+        for _ in range(tables_per_statement):
+            name = rng.choice((table_name(rng.randrange(table_count)), "Worktable", "#temp________________0000000000A1"))
+            messages.append(
+                f"Table '{name}'. Scan count {rng.randint(0, 2000)}, logical reads {rng.randint(0, 5_000_000)}, "
+                f"physical reads {rng.randint(0, 5000)}, page server reads 0, read-ahead reads {rng.randint(0, 50_000)}, "
+                f"page server read-ahead reads 0, lob logical reads {rng.randint(0, 3000)}, lob physical reads 0, "
+                f"lob page server reads 0, lob read-ahead reads 0, lob page server read-ahead reads 0."
+            )
+        messages.append(f"({rng.randint(0, 100_000)} rows affected)")
+        messages.append(" SQL Server Execution Times:")
+        messages.append(f"   CPU time = {rng.randint(0, 3000)} ms,  elapsed time = {rng.randint(0, 6000)} ms.")
+    return messages
+
+
+# operator_count operatörlü showplan XML'i; ağaç derinliği karışık (zincir + dallanma).
+# Showplan XML with operator_count operators; the tree mixes chains and fan-out.
+# actual=True ise RunTimeCountersPerThread eklenir (gerçek plan)
+# With actual=True, RunTimeCountersPerThread elements are added (actual plan)
+def synthetic_showplan(operator_count, actual=False, seed=DEFAULT_SEED):
+    rng = random.Random(seed + operator_count)
+    children = [[] for _ in range(operator_count)]
+    for i in range(1, operator_count):
+        parent = i - 1 if rng.random() < 0.3 else (i - 1) // 3
+        children[parent].append(i)
+
+    own_costs = [rng.uniform(0.0001, 2.0) for _ in range(operator_count)]
+    subtree_costs = own_costs[:]
+    for i in range(operator_count - 1, -1, -1):
+        subtree_costs[i] += sum(subtree_costs[child] for child in children[i])
+
+    parts = [f'<?xml version="1.0" encoding="utf-16"?>'
+             f'<ShowPlanXML xmlns="{SHOWPLAN_XMLNS}" Version="1.564" Build="16.0.1000.6">'
+             '<BatchSequence><Batch><Statements>'
+             f'<StmtSimple StatementText={quoteattr(f"synthetic plan with {operator_count} operators")} '
+             f'StatementId="1" StatementType="SELECT" StatementSubTreeCost="{subtree_costs[0]:.6f}" '
+             f'StatementEstRows="{rng.randint(1, 10_000)}" QueryHash="0x{rng.getrandbits(64):016X}" '
+             f'QueryPlanHash="0x{rng.getrandbits(64):016X}">'
+             '<QueryPlan DegreeOfParallelism="8" CompileTime="120">'
+             '<MissingIndexes><MissingIndexGroup Impact="87.5">'
+             '<MissingIndex Database="[db0]" Schema="[dbo]" Table="[t0000001]">'
+             '<ColumnGroup Usage="EQUALITY"><Column Name="[c1]" ColumnId="2"/></ColumnGroup>'
+             '<ColumnGroup Usage="INCLUDE"><Column Name="[c2]" ColumnId="3"/></ColumnGroup>'
+             '</MissingIndex></MissingIndexGroup></MissingIndexes>'
+             '<MemoryGrantInfo SerialRequiredMemory="1024" GrantedMemory="512000" MaxUsedMemory="2048"/>']
+
+    # Derin planlar için özyineleme yerine açık yığın
+    # An explicit stack instead of recursion for deep plans
+    stack = [(0, False)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            parts.append(f"</{INNER_OPERATORS[node % len(INNER_OPERATORS)][2]}></RelOp>")
+            continue
+
+        leaf = not children[node]
+        physical, logical = rng.choice(LEAF_OPERATORS) if leaf else INNER_OPERATORS[node % len(INNER_OPERATORS)][:2]
+        rows = rng.randint(1, 2_000_000)
+        parts.append(f'<RelOp NodeId="{node}" PhysicalOp="{physical}" LogicalOp="{logical}" '
+                     f'EstimateRows="{rows}" EstimateRebinds="0" EstimateRewinds="0" '
+                     f'EstimatedTotalSubtreeCost="{subtree_costs[node]:.6f}" Parallel="{int(node % 7 == 0)}">'
+                     '<OutputList><ColumnReference Column="id"/></OutputList>')
+        if rng.random() < 0.02:
+            parts.append('<Warnings><SpillToTempDb SpillLevel="1"/></Warnings>')
+        if actual:
+            skew = rng.choice((1, 1, 1, 50))
+            parts.append('<RunTimeInformation>'
+                         f'<RunTimeCountersPerThread Thread="0" ActualRows="{rows * skew}" ActualExecutions="1" '
+                         f'ActualElapsedms="{rng.randint(0, 5000)}" ActualCPUms="{rng.randint(0, 5000)}" '
+                         f'ActualLogicalReads="{rng.randint(0, 100_000)}"/></RunTimeInformation>')
+        if leaf:
+            number = rng.randrange(10_000)
+            parts.append(f'<IndexScan Ordered="0"><Object Database="[db0]" Schema="[dbo]" '
+                         f'Table="[{table_name(number)}]" Index="[pk_{table_name(number)}]"/>')
+            if rng.random() < 0.05:
+                parts.append('<Predicate><ScalarOperator><Convert DataType="nvarchar" Implicit="1"/>'
+                             '</ScalarOperator></Predicate>')
+            parts.append('</IndexScan></RelOp>')
+            continue
+
+        parts.append(f"<{INNER_OPERATORS[node % len(INNER_OPERATORS)][2]}>")
+        stack.append((node, True))
+        for child in reversed(children[node]):
+            stack.append((child, False))
+
+    parts.append("</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>")
+    return "".join(parts)
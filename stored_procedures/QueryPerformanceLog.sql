@@ -0,0 +1,98 @@
+USE [YourDatabase]
+GO
+
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+
+-- Author: Mikail Tipi
+-- Description: Log schema used by RunAndMeasure.
+-- Query texts are stored once in dbo.QueryText, keyed by their SHA2_256 hash;
+-- every run adds one narrow row to dbo.QueryPerformanceLog with an identity
+-- LogId that the Python ingester (app/log_ingester.py) uses as its watermark.
+-- Run this script before (re)creating RunAndMeasure.
+
+IF OBJECT_ID('dbo.QueryText', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.QueryText (
+        QueryHash BINARY(32) NOT NULL,
+        QueryText NVARCHAR(MAX) NOT NULL,
+        FirstSeenUtc DATETIME2(7) NOT NULL CONSTRAINT DF_QueryText_FirstSeenUtc DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_QueryText PRIMARY KEY CLUSTERED (QueryHash)
+    );
+END
+GO
+
+-- Migrates the old log table (no hash, no index) to the new schema when present
+IF COL_LENGTH('dbo.QueryPerformanceLog', 'QueryText') IS NOT NULL
+BEGIN
+    EXEC sp_rename 'dbo.QueryPerformanceLog', 'QueryPerformanceLog_Legacy';
+END
+GO
+
+IF OBJECT_ID('dbo.QueryPerformanceLog', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.QueryPerformanceLog (
+        LogId BIGINT IDENTITY(1,1) NOT NULL,
+        QueryHash BINARY(32) NOT NULL,
+        DatabaseName SYSNAME NOT NULL,
+        SessionId SMALLINT NOT NULL CONSTRAINT DF_QueryPerformanceLog_SessionId DEFAULT @@SPID,
+        ProgramName NVARCHAR(128) NULL CONSTRAINT DF_QueryPerformanceLog_ProgramName DEFAULT APP_NAME(),
+        StartTimeUtc DATETIME2(7) NOT NULL,
+        DurationUs BIGINT NULL,
+        ExecutionTimeMs INT NOT NULL,
+        AffectedRows INT NOT NULL,
+        ErrorMessage NVARCHAR(4000) NULL,
+        RunDateUtc DATETIME2(7) NOT NULL CONSTRAINT DF_QueryPerformanceLog_RunDateUtc DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_QueryPerformanceLog PRIMARY KEY CLUSTERED (LogId)
+    );
+
+    -- per-query trend analysis
+    CREATE NONCLUSTERED INDEX IX_QueryPerformanceLog_QueryHash
+        ON dbo.QueryPerformanceLog (QueryHash, LogId)
+        INCLUDE (DurationUs, AffectedRows);
+
+    -- time-range queries and retention cleanup
+    CREATE NONCLUSTERED INDEX IX_QueryPerformanceLog_RunDateUtc
+        ON dbo.QueryPerformanceLog (RunDateUtc);
+END
+GO
+
+-- Tables created by an earlier version of this script get the ProgramName column.
+-- The Python app records its own runs in the local history already; the ingester skips rows
+-- whose ProgramName is the app's connection name (APP=SQL Query Analyzer).
+IF COL_LENGTH('dbo.QueryPerformanceLog', 'ProgramName') IS NULL
+BEGIN
+    ALTER TABLE dbo.QueryPerformanceLog
+        ADD ProgramName NVARCHAR(128) NULL CONSTRAINT DF_QueryPerformanceLog_ProgramName DEFAULT APP_NAME();
+END
+GO
+
+-- Migration only runs while the new table is empty; drop the legacy table manually once verified
+IF OBJECT_ID('dbo.QueryPerformanceLog_Legacy', 'U') IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM dbo.QueryPerformanceLog)
+BEGIN
+    INSERT INTO dbo.QueryText (QueryHash, QueryText)
+    SELECT DISTINCT HASHBYTES('SHA2_256', l.QueryText), l.QueryText
+    FROM dbo.QueryPerformanceLog_Legacy l
+    WHERE NOT EXISTS (
+        SELECT 1 FROM dbo.QueryText t WHERE t.QueryHash = HASHBYTES('SHA2_256', l.QueryText)
+    );
+
+    -- Legacy rows were in local time with millisecond resolution
+    INSERT INTO dbo.QueryPerformanceLog
+        (QueryHash, DatabaseName, StartTimeUtc, DurationUs, ExecutionTimeMs, AffectedRows, ErrorMessage, RunDateUtc)
+    SELECT
+        HASHBYTES('SHA2_256', l.QueryText),
+        DB_NAME(),
+        DATEADD(MINUTE, DATEDIFF(MINUTE, GETDATE(), GETUTCDATE()), l.RunDate),
+        CASE WHEN l.ExecutionTimeMs >= 0 THEN CAST(l.ExecutionTimeMs AS BIGINT) * 1000 END,
+        l.ExecutionTimeMs,
+        l.AffectedRows,
+        CASE WHEN l.ExecutionTimeMs < 0 THEN N'Legacy error row' END,
+        DATEADD(MINUTE, DATEDIFF(MINUTE, GETDATE(), GETUTCDATE()), l.RunDate)
+    FROM dbo.QueryPerformanceLog_Legacy l
+    ORDER BY l.RunDate;
+END
+GO
@@ -9,36 +9,68 @@ GO
 -- Author: Mikail Tipi
 -- Description: Runs any SQL query, measures execution time and affected rows.
 -- Stores logs in a generic logging table for performance diagnostics.
+-- Timing uses SYSDATETIME()/DATETIME2(7); DurationUs has microsecond resolution
+-- (GETDATE()/DATETIME was only accurate to ~3 ms).
+-- The query text is stored once per SHA2_256 hash in dbo.QueryText and each run
+-- adds a narrow row to dbo.QueryPerformanceLog (see QueryPerformanceLog.sql).
+-- ProgramName records APP_NAME() so the ingester can skip runs the app already recorded.
 
-CREATE PROCEDURE [dbo].[RunAndMeasure]
+CREATE OR ALTER PROCEDURE [dbo].[RunAndMeasure]
     @Query NVARCHAR(MAX)
 AS
 BEGIN
     SET NOCOUNT ON;
 
-    DECLARE @StartTime DATETIME = GETDATE();
+    DECLARE @QueryHash BINARY(32) = HASHBYTES('SHA2_256', @Query);
     DECLARE @RowCount INT = 0;
 
+    -- Text is inserted only the first time this hash is seen
+    IF NOT EXISTS (SELECT 1 FROM dbo.QueryText WHERE QueryHash = @QueryHash)
+    BEGIN
+        BEGIN TRY
+            INSERT INTO dbo.QueryText (QueryHash, QueryText)
+            VALUES (@QueryHash, @Query);
+        END TRY
+        BEGIN CATCH
+            -- A concurrent run inserted the same text first (PK violation)
+            IF ERROR_NUMBER() NOT IN (2601, 2627)
+                THROW;
+        END CATCH
+    END
+
+    -- Timing starts after the bookkeeping above
+    DECLARE @StartTimeUtc DATETIME2(7) = SYSUTCDATETIME();
+    DECLARE @StartTime DATETIME2(7) = SYSDATETIME();
+
     BEGIN TRY
         EXEC sp_executesql @Query;
         SET @RowCount = @@ROWCOUNT;
     END TRY
     BEGIN CATCH
-        INSERT INTO dbo.QueryPerformanceLog(QueryText, ExecutionTimeMs, AffectedRows, RunDate)
-        VALUES (@Query, -1, -1, GETDATE());
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+
+        INSERT INTO dbo.QueryPerformanceLog
+            (QueryHash, DatabaseName, ProgramName, StartTimeUtc, DurationUs, ExecutionTimeMs, AffectedRows, ErrorMessage)
+        VALUES
+            (@QueryHash, DB_NAME(), APP_NAME(), @StartTimeUtc, NULL, -1, -1, @ErrorMessage);
 
         SELECT 
             'ERROR' AS Label, 
-            ERROR_MESSAGE() AS Value;
+            @ErrorMessage AS Value;
         RETURN;
     END CATCH
 
-    DECLARE @ElapsedTimeMs INT = DATEDIFF(MILLISECOND, @StartTime, GETDATE());
+    DECLARE @EndTime DATETIME2(7) = SYSDATETIME();
+    DECLARE @ElapsedTimeUs BIGINT = DATEDIFF_BIG(MICROSECOND, @StartTime, @EndTime);
+    DECLARE @ElapsedTimeMs INT = CAST(@ElapsedTimeUs / 1000 AS INT);
 
-    INSERT INTO dbo.QueryPerformanceLog(QueryText, ExecutionTimeMs, AffectedRows, RunDate)
-    VALUES (@Query, @ElapsedTimeMs, @RowCount, GETDATE());
+    INSERT INTO dbo.QueryPerformanceLog
+        (QueryHash, DatabaseName, ProgramName, StartTimeUtc, DurationUs, ExecutionTimeMs, AffectedRows)
+    VALUES
+        (@QueryHash, DB_NAME(), APP_NAME(), @StartTimeUtc, @ElapsedTimeUs, @ElapsedTimeMs, @RowCount);
 
     SELECT 
         CAST(@ElapsedTimeMs AS INT) AS DurationMs,
-        CAST(@RowCount AS INT) AS AffectedRows;
+        CAST(@RowCount AS INT) AS AffectedRows,
+        @ElapsedTimeUs AS DurationUs;
 END